@@ -9,19 +9,23 @@ import time
 import coloredlogs
 
 from etl import (BGIETL, DOETL, ECOMAPETL, ETL, GOETL, MIETL, VEPETL,
-                 AffectedGenomicModelETL, AlleleETL, ClosureETL, ConstructETL,
+                 AffectedGenomicModelETL, AlleleETL, AssemblySequenceHelper, ClosureETL, ClosureHelper,
+                 ConstructETL, CrossReferenceIndex, DeltaLoadHelper,
                  DiseaseETL, ExpressionAtlasETL, ExpressionETL,
                  ExpressionRibbonETL, ExpressionRibbonOtherETL,
-                 GeneDescriptionsETL, GeneDiseaseOrthoETL, GenericOntologyETL,
-                 GeoXrefETL, GOAnnotETL, MolecularInteractionETL, Neo4jHelper,
-                 NodeCountETL, OrthologyETL, PhenoTypeETL,
+                 GeneDescriptionsETL, GeneDiseaseOrthoETL, GenericOntologyETL, GenomicIntervalIndex,
+                 GenomicOverlapETL,
+                 GeoXrefETL, GOAnnotETL, IdentifierRegistry, MolecularInteractionETL,
+                 Neo4jSchemaHelper, NodeCountETL, OrthologyETL, PhenoTypeETL, QueryProfileHelper,
                  SequenceTargetingReagentETL, SpeciesETL, TranscriptETL,
                  VariationETL, VEPTranscriptETL,
                 HTPMetaDatasetSampleETL, HTPMetaDatasetETL)
 from transactors import FileTransactor, Neo4jTransactor
 
 from data_manager import DataFileManager
+from execution_plan import ExecutionPlan
 from files import Download
+from run_metrics import RunMetrics
 from loader_common import ContextInfo  # Must be the last timeport othersize program fails
 
 
@@ -39,6 +43,20 @@ def main():
                         '--verbose',
                         help='Enable DEBUG mode for logging.',
                         action='store_true')
+    parser.add_argument('--profile',
+                        help='Capture a PROFILE plan of each distinct query template during the load.',
+                        action='store_true')
+    parser.add_argument('--defer-indexes',
+                        help='Only create the indexes the load uses up front, the API only ones after the load.',
+                        action='store_true')
+    parser.add_argument('--delta',
+                        help='Only load the BGI, Allele, Disease, Phenotype and Expression rows that changed '
+                             'since the last delta load.',
+                        action='store_true')
+    parser.add_argument('-p',
+                        '--plan',
+                        help='Report the execution plan and cost estimate without loading anything.',
+                        action='store_true')
     args = parser.parse_args()
 
     # set context info
@@ -46,6 +64,12 @@ def main():
     context_info.config_file_location = os.path.abspath('src/config/' + args.config)
     if args.verbose:
         context_info.env["DEBUG"] = True
+    if args.profile:
+        context_info.env["PROFILE_QUERIES"] = True
+    if args.defer_indexes:
+        context_info.env["DEFER_INDEXES"] = True
+    if args.delta:
+        context_info.env["DELTA_LOAD"] = True
 
     debug_level = logging.DEBUG if context_info.env["DEBUG"] else logging.INFO
 
@@ -62,7 +86,10 @@ def main():
     logger = logging.getLogger(__name__)
     logging.getLogger("ontobio").setLevel(logging.ERROR)
 
-    AggregateLoader(args, logger, context_info).run_loader()
+    if args.plan:
+        AggregateLoader(args, logger, context_info).run_plan()
+    else:
+        AggregateLoader(args, logger, context_info).run_loader()
 
 
 class AggregateLoader():
@@ -86,6 +113,7 @@ class AggregateLoader():
         'AGM': AffectedGenomicModelETL,
         'PHENOTYPE': PhenoTypeETL,
         'GFF': TranscriptETL,
+        'GenomicOverlap': GenomicOverlapETL,
         'GO': GOETL,
         'EXPRESSION': ExpressionETL,
         'ExpressionRibbon': ExpressionRibbonETL,
@@ -127,6 +155,7 @@ class AggregateLoader():
         ['ORTHO'],  # Locks Genes
         ['GeneDiseaseOrtho'],
         ['GFF'],
+        ['GenomicOverlap'],
         ['EXPRESSION'],
         ['ExpressionRibbon'],
         ['ExpressionRibbonOther'],
@@ -169,9 +198,14 @@ class AggregateLoader():
         self.logger.info("Finished getting files initially")
 
     @classmethod
-    def run_etl_groups(cls, logger, data_manager, neo_transactor):
-        """Run each of the ETLs in parallel."""
+    def run_etl_groups(cls, logger, data_manager, neo_transactor, delta_load=False):
+        """Run each of the ETLs in parallel.
+
+        A delta load only runs the ETLs with delta groups, the others would
+        load their data in full into the existing graph again.
+        """
         etl_time_tracker_list = []
+        etl_group_runtimes = []
         for etl_group in cls.etl_groups:
             etl_group_start_time = time.time()
             logger.info("Starting ETL group: %s" % etl_group)
@@ -179,8 +213,12 @@ class AggregateLoader():
             for etl_name in etl_group:
                 logger.info("ETL Name: %s" % etl_name)
                 config = data_manager.get_config(etl_name)
-                if config is not None:
+                if config is not None and delta_load and not cls.etl_dispatch[etl_name].delta_groups:
+                    logger.warning("Skipping %s, it does not support delta loads." % etl_name)
+                elif config is not None:
                     etl = cls.etl_dispatch[etl_name](config)
+                    # Inherited by the forked ETL process for its run metrics.
+                    RunMetrics.set_etl(etl_name)
                     process = multiprocessing.Process(target=etl.run_etl)
                     process.start()
                     thread_pool.append(process)
@@ -198,8 +236,18 @@ class AggregateLoader():
 
             logger.info(etl_time_message)
             etl_time_tracker_list.append(etl_time_message)
+            etl_group_runtimes.append({'group': etl_group, 'seconds': etl_elapsed_time})
+
+        return etl_time_tracker_list, etl_group_runtimes
 
-        return etl_time_tracker_list
+    def run_plan(self):
+        """Report what a load with this config would do, without touching Neo4j."""
+        data_manager = DataFileManager(self.context_info.config_file_location)
+
+        execution_plan = ExecutionPlan(self.etl_groups, self.etl_dispatch, data_manager)
+        execution_plan.build()
+        execution_plan.log_plan()
+        execution_plan.save()
 
     def run_loader(self):
         """Run the loader."""
@@ -207,6 +255,16 @@ class AggregateLoader():
             self.logger.warn('DEBUG mode enabled!')
             time.sleep(3)
 
+        RunMetrics.reset()
+        IdentifierRegistry.reset()
+        CrossReferenceIndex.reset()
+        ClosureHelper.reset()
+        GenomicIntervalIndex.reset()
+        if self.context_info.env["PROFILE_QUERIES"]:
+            QueryProfileHelper.reset()
+        if self.context_info.env["DELTA_LOAD"]:
+            DeltaLoadHelper.reset()
+
         data_manager = DataFileManager(self.context_info.config_file_location)
         file_transactor = FileTransactor()
 
@@ -222,19 +280,49 @@ class AggregateLoader():
         self.logger.debug("finished queues waiting for shutdown")
         file_transactor.shutdown()
 
+        if self.context_info.env["VALIDATE_FILES"]:
+            data_manager.validate_files()
+
         neo_transactor = Neo4jTransactor()
         neo_transactor.start_threads(data_manager.get_neo_transactor_thread_settings())
 
         self.logger.debug("finished starting neo threads ")
 
         if not self.context_info.env["USING_PICKLE"]:
-            self.logger.info("Creating indices.")
-            Neo4jHelper.create_indices()
+            self.logger.info("Creating constraints and indices.")
+            Neo4jSchemaHelper.create_schema(ETL, data_manager,
+                                            defer_api_indexes=self.context_info.env["DEFER_INDEXES"])
+
+        # Loaded here, once, so every forked ETL process inherits the lookups.
+        ETL.etlh.rdh2.get_data()
+        if data_manager.get_config('VARIATION') is not None:
+            AssemblySequenceHelper.prepare(data_manager.get_config('FASTA'))
 
-        etl_time_tracker_list = self.run_etl_groups(self.logger, data_manager, neo_transactor)
+        etl_time_tracker_list, etl_group_runtimes = self.run_etl_groups(self.logger,
+                                                                        data_manager,
+                                                                        neo_transactor,
+                                                                        self.context_info.env["DELTA_LOAD"])
 
         neo_transactor.shutdown()
 
+        if self.context_info.env["DELTA_LOAD"]:
+            DeltaLoadHelper.commit()
+
+        if self.context_info.env["DEFER_INDEXES"] and not self.context_info.env["USING_PICKLE"]:
+            self.logger.info("Creating deferred indices.")
+            Neo4jSchemaHelper.create_deferred_indexes(ETL, data_manager)
+
+        RunMetrics.save_report(etl_group_runtimes,
+                               ExecutionPlan.get_input_bytes([etl_name
+                                                              for etl_group in self.etl_groups
+                                                              for etl_name in etl_group],
+                                                             data_manager))
+        if self.context_info.env["PROFILE_QUERIES"]:
+            QueryProfileHelper.save_report()
+            Neo4jSchemaHelper.report_unused_indexes(ETL, data_manager, QueryProfileHelper.report_file)
+        else:
+            Neo4jSchemaHelper.report_unused_indexes(ETL, data_manager)
+
         elapsed_time = time.time() - self.start_time
 
         for time_item in etl_time_tracker_list:
@@ -1,6 +1,7 @@
 """Getting files from FMS"""
 
 import logging
+import multiprocessing
 import os
 import sys
 import json
@@ -12,6 +13,7 @@ from cerberus import Validator
 from files import JSONFile
 from loader_common import Singleton, ContextInfo
 from .data_type_config import DataTypeConfig
+from .sub_type_config import SubTypeConfig
 
 
 class DataFileManager(metaclass=Singleton):
@@ -19,6 +21,9 @@ class DataFileManager(metaclass=Singleton):
 
     logger = logging.getLogger(__name__)
 
+    # Keys of files that passed validation, see SubTypeConfig.get_validation_cache_key.
+    validation_cache_file = 'tmp/validation_cache.json'
+
     def __init__(self, config_file_loc):
 
         context_info = ContextInfo()
@@ -64,6 +69,13 @@ class DataFileManager(metaclass=Singleton):
 
         self.logger.debug(self.submission_system_data)
 
+        # Index the snapshot once so config lookups are O(1) per sub type.
+        self.submission_data_index = self.index_submission_data(
+            self.submission_system_data['snapShot']['dataFiles'])
+
+        # (dataType, subType) pairs in the config that have no file in the snapshot.
+        self.missing_sub_types = []
+
         # List used for MOD and data type objects.
         self.master_data_dictionary = {}
 
@@ -120,6 +132,47 @@ class DataFileManager(metaclass=Singleton):
                 self.master_data_dictionary[entry].get_data()
                 self.logger.debug('done with %s data.', entry)
 
+    def validate_files(self):
+        """Validate the downloaded JSON files against their schemas.
+
+        Files run through a process pool. Files that already passed validation
+        with the same content and schema version (see validation_cache_file)
+        are skipped. Must be called after all downloads have finished.
+        """
+
+        schema_version = self.config_data.get('schemaVersion')
+
+        validated_keys = set()
+        if os.path.isfile(self.validation_cache_file):
+            with open(self.validation_cache_file, 'r') as cache_file:
+                validated_keys = set(json.load(cache_file))
+
+        sub_types = []
+        for entry in self.master_data_dictionary.values():
+            if isinstance(entry, DataTypeConfig):
+                sub_types.extend(entry.get_sub_type_objects())
+
+        self.logger.info('Validating %s sub type files.', len(sub_types))
+        failed = []
+        with multiprocessing.Pool(self.file_transactor_threads) as pool:
+            results = pool.starmap(SubTypeConfig.validate_in_pool,
+                                   [(sub_type, schema_version, validated_keys)
+                                    for sub_type in sub_types])
+
+        for data_type, sub_type, cache_key, success in results:
+            if not success:
+                failed.append((data_type, sub_type))
+            elif cache_key is not None:
+                validated_keys.add(cache_key)
+
+        with open(self.validation_cache_file, 'w') as cache_file:
+            json.dump(sorted(validated_keys), cache_file)
+
+        if failed:
+            for data_type, sub_type in failed:
+                self.logger.critical('Validation failed for %s %s', data_type, sub_type)
+            sys.exit(-1)
+
     def process_config(self):
         """ This checks for the validity of the YAML file.
              See src/config/validation.yml for the layout of the schema."""
@@ -145,17 +198,34 @@ class DataFileManager(metaclass=Singleton):
         # Create our DataTypeConfig (which in turn create our SubTypeConfig) objects.
         self.dispatch_to_object()
 
+    @staticmethod
+    def index_submission_data(data_files):
+        """Index submission system data files by (dataType, subType).
+
+        If a pair is listed more than once the entry with the latest
+        uploadDate wins. On a tie the first entry seen is kept, so
+        submission system files take precedence over local_submission.json.
+        """
+
+        index = {}
+        for item in data_files:
+            key = (item['dataType'].get('name'), item['dataSubType'].get('name'))
+            current = index.get(key)
+            if current is None \
+                    or (item.get('uploadDate') or 0) > (current.get('uploadDate') or 0):
+                index[key] = item
+
+        return index
+
     def _search_submission_data(self, data_type, sub_type):
 
-        try:
-            returned_dict = next(item for item in self.submission_system_data['snapShot']['dataFiles']
-                                 if item['dataType'].get('name') == data_type
-                                 and item['dataSubType'].get('name') == sub_type)
-        except StopIteration:
+        returned_dict = self.submission_data_index.get((data_type, sub_type))
+        if returned_dict is None:
             self.logger.debug('dataType: %s subType: %s not found in submission system data.',
                               data_type,
                               sub_type)
             self.logger.debug('Creating entry with \'None\' path and extracted path.')
+            self.missing_sub_types.append((data_type, sub_type))
             returned_dict = {
                 'dataType': data_type,
                 'subType': sub_type,
@@ -164,6 +234,26 @@ class DataFileManager(metaclass=Singleton):
 
         return returned_dict
 
+    def get_missing_sub_types(self):
+        """Gets the (dataType, subType) pairs in the config with no submission system file"""
+
+        return self.missing_sub_types
+
+    def report_missing_sub_types(self):
+        """Log which configured sub types have no file in the submission system"""
+
+        if not self.missing_sub_types:
+            self.logger.info('All configured sub types have a submission system file.')
+            return
+
+        missing = {}
+        for data_type, sub_type in self.missing_sub_types:
+            missing.setdefault(data_type, []).append(sub_type)
+
+        self.logger.info('Configured sub types with no submission system file:')
+        for data_type, sub_types in missing.items():
+            self.logger.info('    %s: %s', data_type, ', '.join(str(sub_type) for sub_type in sub_types))
+
     def query_submission_system(self):
         """get file information from Submission System (FMS)"""
 
@@ -171,6 +261,8 @@ class DataFileManager(metaclass=Singleton):
         # system data against our config file.
         ontologies_to_transform = ('GO', 'DOID', 'MI', 'ECOMAP')  # These have non-generic loaders.
 
+        self.missing_sub_types = []
+
         self.transformed_submission_system_data['releaseVersion'] \
                 = self.submission_system_data['snapShot']['releaseVersion']['releaseVersion']
 
@@ -206,3 +298,4 @@ class DataFileManager(metaclass=Singleton):
                 self.logger.debug("Ignoring entry: %s", entry)
 
         self.logger.debug("Loaded Types: %s", self.transformed_submission_system_data)
+        self.report_missing_sub_types()
@@ -4,9 +4,12 @@ import logging
 import os
 import json
 import sys
+import hashlib
 
+from decimal import Decimal
 from pathlib import Path
 from urllib.parse import urljoin
+import ijson
 import jsonref
 import jsonschema
 
@@ -18,6 +21,21 @@ class SubTypeConfig():
 
     logger = logging.getLogger(__name__)
 
+    schema_lookup_dict = {
+        'Disease': 'schemas/disease/diseaseMetaDataDefinition.json',
+        'BGI': 'schemas/gene/geneMetaData.json',
+        'Orthology': 'schemas/orthology/orthologyMetaData.json',
+        'Allele': 'schemas/allele/alleleMetaData.json',
+        'Phenotype': 'schemas/phenotype/phenotypeMetaDataDefinition.json',
+        'Expression': 'schemas/expression/wildtypeExpressionMetaDataDefinition.json'
+    }
+
+    # Files larger than this are validated one data item at a time.
+    streaming_validation_threshold = 200 * 1024 * 1024
+
+    # Compiled validators keyed by schema file name, built once per process.
+    compiled_validators = {}
+
     def __init__(self, data_type, sub_data_type, file_to_download, filepath):
         self.data_type = data_type
         self.sub_data_type = sub_data_type
@@ -91,72 +109,114 @@ class SubTypeConfig():
         else:
             self.logger.debug("File Path is None not downloading")
 
-    def validate(self):
-        """validation of filepath"""
+    def get_schema_file_name(self):
+        """Get the JSON schema file for this data type, or None"""
 
-        if self.filepath is None:
-            self.logger.warning('No filepath found for sub type: %s from data type: %s ',
-                                self.sub_data_type,
-                                self.data_type)
-            self.logger.warning('Skipping validation.')
-            return
+        return self.schema_lookup_dict.get(self.data_type)
 
-        # TODO -- The method below can be reworked once we switch to the submission system.
+    def get_validation_cache_key(self, schema_version):
+        """Key for the validation cache: (file hash, schema file, schema version)"""
 
-        # Begin temporary validation skipping method.
-        # This method attempts to create a _temp_val_check file via "open"
-        # If the file exists, it means the validation has already run and we should skip it.
-        # If the file doesn't exist, we should create it and run the validation.
-        self.already_downloaded = False
+        sha = hashlib.sha256()
+        with open(self.filepath, 'rb') as data_file:
+            for chunk in iter(lambda: data_file.read(1024 * 1024), b''):
+                sha.update(chunk)
 
-        try:
-            open(self.filepath + '_temp_val_check', 'x')
-        except FileExistsError:
-            self.already_downloaded = True
-        except TypeError: # if self.filepath is "None".
-            pass
-        # End of temporary validation method.
-
-        # The code below can run "as is" for validation skipping using the Download
-        # / S3 methods to check for existing files.
-        # The submission system needs to be in place (files are downloaded as .json)
-        # for this to work.
-
-        if self.already_downloaded is True:
-            self.logger.debug('Found temp validation file flag for %s. Skipping validation.',
-                              self.filepath)
-            return
+        return "%s|%s|%s" % (sha.hexdigest(), self.get_schema_file_name(), schema_version)
 
-        self.logger.debug("Attempting to validate: %s", self.filepath)
+    @classmethod
+    def get_compiled_validator(cls, schema_file_name):
+        """Get the validator for a schema, resolving its $refs only once per process"""
+
+        if schema_file_name not in cls.compiled_validators:
+            # These variables are used to dynamically "fill out" all the references in the schema file.
+            base_dir_url = Path(os.path.realpath(os.getcwd())).as_uri() + '/'
+            base_file_url = urljoin(base_dir_url, schema_file_name)
+
+            with open(schema_file_name, encoding='utf-8') as schema_file:
+                # jsonref builds out our json #ref for the schema validation to work correctly.
+                expanded_schema_file = jsonref.load(schema_file, base_uri=base_file_url)
+
+            validator_class = jsonschema.validators.validator_for(expanded_schema_file)
+            validator_class.check_schema(expanded_schema_file)
+            cls.compiled_validators[schema_file_name] = validator_class(expanded_schema_file)
+
+        return cls.compiled_validators[schema_file_name]
+
+    @staticmethod
+    def _convert_decimals(item):
+        """ijson returns Decimals; convert them so integer/number checks behave like json.load"""
+
+        if isinstance(item, dict):
+            return {key: SubTypeConfig._convert_decimals(value) for key, value in item.items()}
+        if isinstance(item, list):
+            return [SubTypeConfig._convert_decimals(value) for value in item]
+        if isinstance(item, Decimal):
+            if item == item.to_integral_value():
+                return int(item)
+            return float(item)
+        return item
+
+    def _validate_streaming(self, validator):
+        """Validate metaData and then each data item without loading the whole file.
+
+        Only the metaData and data item sub schemas are checked here, top level
+        keywords (e.g. required) of the schema are not.
+        """
+
+        properties = validator.schema.get('properties', {})
+        validator_class = type(validator)
+        meta_data_validator = validator_class(properties.get('metaData', {}))
+        data_item_validator = validator_class(properties.get('data', {}).get('items', {}))
 
-        schema_lookup_dict = {
-            'Disease': 'schemas/disease/diseaseMetaDataDefinition.json',
-            'BGI': 'schemas/gene/geneMetaData.json',
-            'Orthology': 'schemas/orthology/orthologyMetaData.json',
-            'Allele': 'schemas/allele/alleleMetaData.json',
-            'Phenotype': 'schemas/phenotype/phenotypeMetaDataDefinition.json',
-            'Expression': 'schemas/expression/wildtypeExpressionMetaDataDefinition.json'
-        }
+        with open(self.filepath, 'rb') as data_file:
+            for meta_data in ijson.items(data_file, 'metaData'):
+                meta_data_validator.validate(self._convert_decimals(meta_data))
+                break
 
-        schema_file_name = schema_lookup_dict.get(self.data_type)
+        with open(self.filepath, 'rb') as data_file:
+            for data_item in ijson.items(data_file, 'data.item'):
+                data_item_validator.validate(self._convert_decimals(data_item))
+
+    def validate(self, schema_version=None, validated_keys=None):
+        """validation of filepath
+
+        validated_keys is a collection of cache keys (see get_validation_cache_key)
+        that have already passed validation. Returns the cache key of this file
+        if it validated successfully, None if validation was skipped.
+        """
+
+        if self.filepath is None:
+            self.logger.warning('No filepath found for sub type: %s from data type: %s ',
+                                self.sub_data_type,
+                                self.data_type)
+            self.logger.warning('Skipping validation.')
+            return None
+
+        schema_file_name = self.get_schema_file_name()
 
         if schema_file_name is None:
             self.logger.warning('No schema or method found. Skipping validation.')
-            return  # Exit validation.
-
-        with open(self.filepath, encoding='utf-8') as data_file:
-            data = json.load(data_file)
+            return None  # Exit validation.
 
-        # These variables are used to dynamically "fill out" all the references in the schema file.
-        base_dir_url = Path(os.path.realpath(os.getcwd())).as_uri() + '/'
-        base_file_url = urljoin(base_dir_url, schema_file_name)
+        cache_key = self.get_validation_cache_key(schema_version)
+        if validated_keys is not None and cache_key in validated_keys:
+            self.logger.debug('%s already validated against %s (schema version %s). Skipping validation.',
+                              self.filepath,
+                              schema_file_name,
+                              schema_version)
+            return cache_key
 
-        with open(schema_file_name, encoding='utf-8') as schema_file:
-            # jsonref builds out our json #ref for the schema validation to work correctly.
-            expanded_schema_file = jsonref.load(schema_file, base_uri=base_file_url)
+        self.logger.debug("Attempting to validate: %s", self.filepath)
 
         try:
-            jsonschema.validate(data, expanded_schema_file)
+            validator = self.get_compiled_validator(schema_file_name)
+            if os.path.getsize(self.filepath) > self.streaming_validation_threshold:
+                self._validate_streaming(validator)
+            else:
+                with open(self.filepath, encoding='utf-8') as data_file:
+                    data = json.load(data_file)
+                validator.validate(data)
             self.logger.debug("'%s' successfully validated against '%s'",
                               self.filepath,
                               schema_file_name)
@@ -168,3 +228,20 @@ class SubTypeConfig():
             self.logger.critical(error.message)
             self.logger.critical(error)
             raise SystemExit("FATAL ERROR in JSON validation.")
+
+        return cache_key
+
+    @staticmethod
+    def validate_in_pool(sub_type, schema_version, validated_keys):
+        """Run validate in a pool worker.
+
+        SystemExit would kill the worker without a result reaching the
+        pool, so failures are returned with a False status instead.
+        """
+
+        try:
+            cache_key = sub_type.validate(schema_version, validated_keys)
+        except SystemExit:
+            return sub_type.data_type, sub_type.sub_data_type, None, False
+
+        return sub_type.data_type, sub_type.sub_data_type, cache_key, True
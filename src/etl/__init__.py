@@ -18,6 +18,7 @@ from .geo_xref_etl import GeoXrefETL
 from .expression_ribbon_etl import ExpressionRibbonETL
 from .gene_disease_ortho_etl import GeneDiseaseOrthoETL
 from .closure_etl import ClosureETL
+from .genomic_overlap_etl import GenomicOverlapETL
 from .molecular_interaction_etl import MolecularInteractionETL
 from .gene_descriptions_etl import GeneDescriptionsETL
 from .expression_ribbon_other_etl import ExpressionRibbonOtherETL
@@ -5,6 +5,7 @@ import multiprocessing
 
 from etl import ETL
 from etl.helpers import TextProcessingHelper
+from etl.helpers import IdentifierRegistry
 from files import JSONFile
 from transactors import CSVTransactor, Neo4jTransactor
 
@@ -302,6 +303,7 @@ class AffectedGenomicModelETL(ETL):
             self.ppids_process(backgrounds, agm_record)
 
             if counter == batch_size:
+                IdentifierRegistry.add('AffectedGenomicModel', [agm['primaryId'] for agm in agms])
                 yield [agms, agm_secondary_ids, agm_synonyms, components, sqtrs, backgrounds]
                 agms = []
                 agm_secondary_ids = []
@@ -311,4 +313,5 @@ class AffectedGenomicModelETL(ETL):
                 counter = 0
 
         if counter > 0:
+            IdentifierRegistry.add('AffectedGenomicModel', [agm['primaryId'] for agm in agms])
             yield [agms, agm_secondary_ids, agm_synonyms, components, sqtrs, backgrounds]
@@ -2,11 +2,11 @@
 
 import logging
 import multiprocessing
-import uuid
 
 from etl import ETL
 from etl.helpers import ETLHelper
 from etl.helpers import TextProcessingHelper
+from etl.helpers import IdentifierRegistry
 from files import JSONFile
 from transactors import CSVTransactor, Neo4jTransactor
 
@@ -134,6 +134,50 @@ class AlleleETL(ETL):
         LOAD CSV WITH HEADERS FROM \'file:///%s\' AS row
             MATCH (o:Allele {primaryKey:row.dataId}) """ + ETLHelper.get_cypher_xref_text()
 
+    allele_update_query_template = """
+        USING PERIODIC COMMIT %s
+        LOAD CSV WITH HEADERS FROM \'file:///%s\' AS row
+            MATCH (o:Allele:Feature {primaryKey:row.primaryId})
+                SET o.symbol = row.symbol,
+                 o.taxonId = row.taxonId,
+                 o.dateProduced = row.dateProduced,
+                 o.release = row.release,
+                 o.localId = row.localId,
+                 o.globalId = row.globalId,
+                 o.uuid = row.uuid,
+                 o.symbolText = row.symbolText,
+                 o.modCrossRefCompleteUrl = row.modGlobalCrossRefId,
+                 o.dataProviders = row.dataProviders,
+                 o.dataProvider = row.dataProvider,
+                 o.symbolWithSpecies = row.symbolWithSpecies,
+                 o.symbolTextWithSpecies = row.symbolTextWithSpecies,
+                 o.description = row.alleleDescription
+
+            // The rows of the allele are loaded again next, drop what they merge.
+            WITH o
+            OPTIONAL MATCH (o)-[r:IS_ALLELE_OF|CONTAINS|ALSO_KNOWN_AS|CROSS_REFERENCE]-()
+            DELETE r """
+
+    allele_delete_query_template = """
+        USING PERIODIC COMMIT %s
+        LOAD CSV WITH HEADERS FROM \'file:///%s\' AS row
+            MATCH (o:Allele:Feature {primaryKey:row.primaryId})
+            DETACH DELETE o """
+
+    # An allele and the rows about it, whichever of the gene / construct files it is in.
+    delta_groups = [
+        {'files': {'allele_gene_no_construct_data': ['primaryId'],
+                   'allele_construct_gene_data': ['primaryId'],
+                   'allele_construct_no_gene_data': ['primaryId'],
+                   'allele_no_gene_no_construct_data': ['primaryId'],
+                   'allele_secondaryids': ['data_id'],
+                   'allele_synonyms': ['data_id'],
+                   'allele_xrefs': ['dataId']},
+         'ignore': ['loadKey', 'dateProduced', 'release'],
+         'update': allele_update_query_template,
+         'delete': allele_delete_query_template}
+    ]
+
     def __init__(self, config):
         """Initialise Object."""
         super().__init__()
@@ -188,6 +232,7 @@ class AlleleETL(ETL):
 
         query_and_file_list = self.process_query_params(query_list)
         CSVTransactor.save_file_static(generators, query_and_file_list)
+        query_and_file_list = self.get_delta_queries(sub_type, query_and_file_list, commit_size)
         Neo4jTransactor.execute_query_batch(query_and_file_list)
         self.error_messages("Allele-{}: ".format(sub_type.get_data_provider()))
         logger.info("Finished Loading Allele Data: %s" % sub_type.get_data_provider())
@@ -240,6 +285,13 @@ class AlleleETL(ETL):
                         xref['dataId'] = global_id
                         cross_reference_list.append(xref)
 
+    @staticmethod
+    def register_alleles(*allele_lists):
+        """Add the alleles of a batch to the identifier registry."""
+        IdentifierRegistry.add('Allele', [allele['primaryId']
+                                          for allele_list in allele_lists
+                                          for allele in allele_list])
+
     def get_generators(self, allele_data, batch_size):  # noqa
         """Get generators."""
         release = ""
@@ -305,7 +357,7 @@ class AlleleETL(ETL):
                         "symbolTextWithSpecies": symbol_text + " (" + short_species_abbreviation + ")",
                         "symbolText": symbol_text,
                         "primaryId": allele_record.get('primaryId'),
-                        "uuid": str(uuid.uuid4())
+                        "uuid": ETLHelper.get_uuid('Allele', allele_record.get('primaryId'))
                     }
                     association_type = relation.get('objectRelation').get('associationType')
                     if relation.get('objectRelation').get('gene') is not None:
@@ -350,7 +402,7 @@ class AlleleETL(ETL):
                     "symbolTextWithSpecies": symbol_text + " (" + short_species_abbreviation + ")",
                     "symbolText": symbol_text,
                     "primaryId": allele_record.get('primaryId'),
-                    "uuid": str(uuid.uuid4())
+                    "uuid": ETLHelper.get_uuid('Allele', allele_record.get('primaryId'))
                 }
                 alleles_no_constrcut_no_gene.append(common)
 
@@ -359,6 +411,8 @@ class AlleleETL(ETL):
             self.secondary_process(allele_secondary_ids, allele_record)
 
             if counter == batch_size:
+                self.register_alleles(alleles_no_construct, alleles_construct_gene,
+                                      alleles_no_gene, alleles_no_constrcut_no_gene)
                 yield [alleles_no_construct, alleles_construct_gene, alleles_no_gene, alleles_no_constrcut_no_gene,
                        allele_secondary_ids, allele_synonyms, cross_reference_list]
                 alleles_no_construct = []
@@ -372,5 +426,7 @@ class AlleleETL(ETL):
                 counter = 0
 
         if counter > 0:
+            self.register_alleles(alleles_no_construct, alleles_construct_gene,
+                                  alleles_no_gene, alleles_no_constrcut_no_gene)
             yield [alleles_no_construct, alleles_construct_gene, alleles_no_gene, alleles_no_constrcut_no_gene,
                    allele_secondary_ids, allele_synonyms, cross_reference_list]
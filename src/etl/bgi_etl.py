@@ -3,10 +3,9 @@
 import logging
 import sys
 
-import uuid
 import multiprocessing
 from etl import ETL
-from etl.helpers import ETLHelper
+from etl.helpers import ETLHelper, IdentifierRegistry, CrossReferenceIndex, GenomicIntervalIndex
 from transactors import CSVTransactor, Neo4jTransactor
 from files import JSONFile
 
@@ -161,7 +160,7 @@ class BGIETL(ETL):
         LOAD CSV WITH HEADERS FROM \'file:///%s\' AS row
 
         //Create the load node(s)
-        CREATE (l:Load:Entity {primaryKey:row.loadKey})
+        MERGE (l:Load:Entity {primaryKey:row.loadKey})
             SET l.dateProduced = row.dateProduced,
                 l.loadName = "BGI",
                 l.release = row.release,
@@ -169,6 +168,73 @@ class BGIETL(ETL):
                 l.dataProvider = row.dataProvider
         """
 
+    gene_update_query_template = """
+        USING PERIODIC COMMIT %s
+        LOAD CSV WITH HEADERS FROM \'file:///%s\' AS row
+
+            MATCH (o:Gene {primaryKey:row.primaryId})
+                SET o.symbol = row.symbol,
+                    o.taxonId = row.taxonId,
+                    o.name = row.name,
+                    o.description = row.description,
+                    o.geneSynopsisUrl = row.geneSynopsisUrl,
+                    o.geneSynopsis = row.geneSynopsis,
+                    o.geneLiteratureUrl = row.geneLiteratureUrl,
+                    o.geneticEntityExternalUrl = row.geneticEntityExternalUrl,
+                    o.dateProduced = row.dateProduced,
+                    o.modGlobalCrossRefId = row.modGlobalCrossRefId,
+                    o.modCrossRefCompleteUrl = row.modCrossRefCompleteUrl,
+                    o.modLocalId = row.localId,
+                    o.modGlobalId = row.modGlobalId,
+                    o.uuid = row.uuid,
+                    o.dataProvider = row.dataProvider,
+                    o.symbolWithSpecies = row.symbolWithSpecies
+
+            // The rows of the gene are loaded again next, drop what they merge.
+            WITH o
+            OPTIONAL MATCH (o)-[r:ALSO_KNOWN_AS|LOCATED_ON|LOCATED_IN]->()
+            DELETE r
+            WITH DISTINCT o
+            OPTIONAL MATCH (o)-[so:ANNOTATED_TO]->(:SOTerm)
+            DELETE so
+            WITH DISTINCT o
+            OPTIONAL MATCH (o)-[:ASSOCIATION]-(gchrm:GenomicLocation)
+            DETACH DELETE gchrm """
+
+    # Other data types link genes to cross references as well, only drop the ones BGI loaded.
+    gene_cross_references_drop_query_template = """
+        USING PERIODIC COMMIT %s
+        LOAD CSV WITH HEADERS FROM \'file:///%s\' AS row
+
+            MATCH (o:Gene {primaryKey:row.dataId})-[r:CROSS_REFERENCE]->(:CrossReference {primaryKey:row.primaryKey})
+            DELETE r """
+
+    gene_delete_query_template = """
+        USING PERIODIC COMMIT %s
+        LOAD CSV WITH HEADERS FROM \'file:///%s\' AS row
+
+            MATCH (o:Gene {primaryKey:row.primaryId})
+            OPTIONAL MATCH (o)-[:ASSOCIATION]-(gchrm:GenomicLocation)
+            DETACH DELETE gchrm, o """
+
+    # A gene and the rows about it. Load keys change with every submission.
+    delta_groups = [
+        {'files': {'gene_data': ['primaryId'],
+                   'gene_data_load': ['primaryId'],
+                   'gene_data_species': ['primaryId'],
+                   'gene_so_terms': ['primaryKey'],
+                   'gene_secondary_ids': ['primary_id'],
+                   'gene_genomic_locations': ['primaryId'],
+                   'gene_genomic_location_bins': ['genePrimaryId'],
+                   'gene_cross_references': ['dataId'],
+                   'gene_cross_references_relationships': ['dataId'],
+                   'gene_synonyms': ['primary_id']},
+         'ignore': ['loadKey', 'dateProduced'],
+         'drop': {'gene_cross_references_relationships': gene_cross_references_drop_query_template},
+         'update': gene_update_query_template,
+         'delete': gene_delete_query_template}
+    ]
+
     def __init__(self, config):
         """Initialise object."""
         self.metadata_is_loaded = {}  # Dictionary for optimizing metadata loading.
@@ -229,6 +295,8 @@ class BGIETL(ETL):
              "gene_secondary_ids_" + sub_type.get_data_provider() + ".csv"],
             [self.genomic_locations_query_template, commit_size,
              "gene_genomic_locations_" + sub_type.get_data_provider() + ".csv"],
+            [self.genomic_locations_bins_query_template, commit_size,
+             "gene_genomic_location_bins_" + sub_type.get_data_provider() + ".csv"],
             [self.xrefs_query_template, commit_size,
              "gene_cross_references_" + sub_type.get_data_provider() + ".csv"],
             [self.xrefs_relationships_query_template, commit_size,
@@ -242,6 +310,7 @@ class BGIETL(ETL):
 
         query_and_file_list = self.process_query_params(query_template_list)
         CSVTransactor.save_file_static(generators, query_and_file_list)
+        query_and_file_list = self.get_delta_queries(sub_type, query_and_file_list, commit_size)
 
         for item in query_and_file_list:
             query_tracking_list.append(item)
@@ -367,6 +436,23 @@ class BGIETL(ETL):
                 xref_map['dataId'] = primary_id
                 cross_references.append(xref_map)
 
+    @staticmethod
+    def get_location_bins(genomic_locations):
+        """Get the GenomicLocationBins of each gene location."""
+        location_bins = []
+        for location in genomic_locations:
+            if location['chromosome'] is None or location['start'] is None or location['end'] is None:
+                continue
+            for number in GenomicIntervalIndex.get_bins(location['start'], location['end']):
+                location_bins.append({"genePrimaryId": location['primaryId'],
+                                      "chromosome": location['chromosome'],
+                                      "assembly": location['assembly'],
+                                      "number": number,
+                                      "binPrimaryKey": "%s-%s-%s" % (location['assembly'],
+                                                                     location['chromosome'],
+                                                                     number)})
+        return location_bins
+
     def locations_process(self, basic_genetic_entity, chromosomes, genomic_locations):
         """Get chromosome and genomic location info."""
         primary_id = basic_genetic_entity.get('primaryId')
@@ -410,7 +496,8 @@ class BGIETL(ETL):
                                       "end": end,
                                       "strand": strand,
                                       "assembly": assembly,
-                                      "uuid": str(uuid.uuid4()),
+                                      "uuid": ETLHelper.get_uuid('GeneGenomicLocation', primary_id, chromosome,
+                                                                 start, end, strand, assembly),
                                       "dataProvider": self.data_provider})
 
     def get_generators(self, gene_data, data_provider, batch_size):
@@ -491,7 +578,7 @@ class BGIETL(ETL):
                 "primaryId": primary_id,
                 "category": "gene",
                 "href": None,
-                "uuid": str(uuid.uuid4()),
+                "uuid": ETLHelper.get_uuid('Gene', primary_id),
                 "modCrossRefCompleteUrl": urls['mod_cross_reference_complete_url'],
                 "localId": local_id,
                 "modGlobalCrossRefId": global_id,
@@ -511,6 +598,12 @@ class BGIETL(ETL):
             # Establishes the number of genes to yield (return) at a time.
             if counter == batch_size:  # only sending unique chromosomes, hense empty list here.
                 counter = 0
+                IdentifierRegistry.add('Gene', [gene['primaryId'] for gene in gene_dataset])
+                CrossReferenceIndex.add(cross_references,
+                                        {gene['primaryId']: gene['localId'] for gene in gene_dataset})
+                GenomicIntervalIndex.add('Gene', [(location['primaryId'], location['assembly'],
+                                                   location['chromosome'], location['start'], location['end'])
+                                                  for location in genomic_locations])
                 yield [gene_metadata,
                        gene_dataset,
                        gene_dataset,
@@ -519,6 +612,7 @@ class BGIETL(ETL):
                        [],
                        secondary_ids,
                        genomic_locations,
+                       self.get_location_bins(genomic_locations),
                        cross_references,
                        cross_references,
                        synonyms]
@@ -532,6 +626,12 @@ class BGIETL(ETL):
                 # xref_relations = []
 
         if counter > 0:
+            IdentifierRegistry.add('Gene', [gene['primaryId'] for gene in gene_dataset])
+            CrossReferenceIndex.add(cross_references,
+                                    {gene['primaryId']: gene['localId'] for gene in gene_dataset})
+            GenomicIntervalIndex.add('Gene', [(location['primaryId'], location['assembly'],
+                                               location['chromosome'], location['start'], location['end'])
+                                              for location in genomic_locations])
             yield [gene_metadata,
                    gene_dataset,
                    gene_dataset,
@@ -540,6 +640,7 @@ class BGIETL(ETL):
                    chromosomes.values(),
                    secondary_ids,
                    genomic_locations,
+                   self.get_location_bins(genomic_locations),
                    cross_references,
                    cross_references,
                    synonyms]
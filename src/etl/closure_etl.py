@@ -6,7 +6,7 @@ import multiprocessing
 from etl import ETL
 from transactors import CSVTransactor
 from transactors import Neo4jTransactor
-from .helpers import Neo4jHelper
+from .helpers import Neo4jHelper, ClosureHelper
 
 
 class ClosureETL(ETL):
@@ -21,6 +21,24 @@ class ClosureETL(ETL):
             MATCH (termParent:%sTerm {primaryKey:row.parent_id})
             CREATE (termChild)-[closure:IS_A_PART_OF_CLOSURE]->(termParent) """
 
+    delete_isa_partof_closure_query_template = """
+        USING PERIODIC COMMIT %s
+        LOAD CSV WITH HEADERS FROM \'file:///%s\' AS row
+            MATCH (termChild:%sTerm {primaryKey:row.child_id})-[closure:IS_A_PART_OF_CLOSURE]->(termParent:%sTerm {primaryKey:row.parent_id})
+            DELETE closure """
+
+    count_isa_partof_closure_query_template = """
+        MATCH (childTerm:%sTerm)-[closure:IS_A_PART_OF_CLOSURE]->(parentTerm:%sTerm)
+            WHERE childTerm <> parentTerm
+            RETURN count(closure) AS closure_count """
+
+    delete_all_isa_partof_closure_query_template = """
+        CALL apoc.periodic.iterate(
+            "MATCH (childTerm:%sTerm)-[closure:IS_A_PART_OF_CLOSURE]->(parentTerm:%sTerm)
+                WHERE childTerm <> parentTerm RETURN closure",
+            "DELETE closure",
+            {batchSize: 100000}) """
+
     retrieve_isa_partof_closure_query_template = """
         MATCH (childTerm:%sTerm)-[:PART_OF|IS_A*]->(parentTerm:%sTerm)
             RETURN DISTINCT childTerm.primaryKey, parentTerm.primaryKey """
@@ -52,6 +70,9 @@ class ClosureETL(ETL):
             [self.insert_isa_partof_closure_query_template, "100000",
              "isa_partof_closure_" + data_provider + ".csv",
              data_provider, data_provider],
+            [self.delete_isa_partof_closure_query_template, "100000",
+             "isa_partof_closure_removed_" + data_provider + ".csv",
+             data_provider, data_provider],
         ]
 
         generators = self.get_closure_terms(data_provider)
@@ -64,7 +85,78 @@ class ClosureETL(ETL):
         self.logger.debug("Finished isa_partof Closure for: %s", data_provider)
 
     def get_closure_terms(self, data_provider):
-        """Get Closure Terms."""
+        """Get Closure Terms to add and to remove.
+
+        Computed locally from the edges loaded by the ontology ETLs; falls back to
+        traversing the graph when the ontology was not loaded in this run.
+
+        The edge set is fingerprinted. When the graph still holds the closure saved
+        by the previous run, an unchanged ontology is skipped and a changed one
+        only gets the difference. Otherwise the closure is loaded in full.
+        """
+        label = data_provider + 'Term'
+        edges = ClosureHelper.get_edges(label)
+        if edges is None:
+            yield from self.query_closure_terms(data_provider)
+            return
+
+        fingerprint = ClosureHelper.get_fingerprint(edges)
+        state = ClosureHelper.load_state(label)
+        loaded_count = self.count_closure_relationships(data_provider)
+
+        if state is not None and state['pair_count'] == loaded_count:
+            if state['fingerprint'] == fingerprint:
+                self.logger.info("%s closure unchanged, skipping.", data_provider)
+                return
+            yield from self.get_closure_delta(label, edges, fingerprint)
+            return
+
+        if loaded_count > 0:
+            self.logger.warning("%s closure in the graph does not match the saved state, reloading it.",
+                                data_provider)
+            Neo4jHelper().run_single_query(self.delete_all_isa_partof_closure_query_template
+                                           % (data_provider, data_provider))
+
+        batch_size = self.data_type_config.get_generator_batch_size()
+        closure_data = []
+        for child_id, parent_id in ClosureHelper.record_closure(label,
+                                                                fingerprint,
+                                                                ClosureHelper.compute_closure(edges)):
+            closure_data.append(dict(child_id=child_id, parent_id=parent_id))
+            if len(closure_data) == batch_size:
+                yield [closure_data, []]
+                closure_data = []
+
+        if closure_data:
+            yield [closure_data, []]
+
+    def get_closure_delta(self, label, edges, fingerprint):
+        """Get the closure pairs added and removed since the previous run."""
+        old_pairs = ClosureHelper.load_pairs(label)
+        new_pairs = set(ClosureHelper.record_closure(label,
+                                                     fingerprint,
+                                                     ClosureHelper.compute_closure(edges)))
+
+        added = [dict(child_id=child_id, parent_id=parent_id)
+                 for child_id, parent_id in new_pairs - old_pairs]
+        # Term to itself relationships also come from the ontology ETLs, leave them be.
+        removed = [dict(child_id=child_id, parent_id=parent_id)
+                   for child_id, parent_id in old_pairs - new_pairs if child_id != parent_id]
+        self.logger.info("%s closure changed: %s pairs to add, %s to remove.",
+                         label, len(added), len(removed))
+
+        yield [added, removed]
+
+    def count_closure_relationships(self, data_provider):
+        """Count the closure relationships of an ontology in the graph, excluding term to itself ones."""
+        return_set = Neo4jHelper().run_single_query(self.count_isa_partof_closure_query_template
+                                                    % (data_provider, data_provider))
+        for record in return_set:
+            return record["closure_count"]
+        return 0
+
+    def query_closure_terms(self, data_provider):
+        """Get Closure Terms by traversing the graph."""
         query = self.retrieve_isa_partof_closure_query_template % (data_provider, data_provider)
         self.logger.debug("Query to Run: %s", query)
 
@@ -76,4 +168,4 @@ class ClosureETL(ETL):
                        parent_id=record["parentTerm.primaryKey"])
             closure_data.append(row)
 
-        yield [closure_data]
+        yield [closure_data, []]
@@ -2,10 +2,10 @@
 
 import logging
 import multiprocessing
-import uuid
 from etl import ETL
 from etl.helpers import ETLHelper
 from etl.helpers import TextProcessingHelper
+from etl.helpers import IdentifierRegistry
 from files import JSONFile
 from transactors import CSVTransactor
 from transactors import Neo4jTransactor
@@ -268,7 +268,7 @@ class ConstructETL(ETL):
                 "loadKey": load_key,
                 "release": release,
                 "modGlobalCrossRefId": mod_global_cross_ref_id,
-                "uuid": str(uuid.uuid4()),
+                "uuid": ETLHelper.get_uuid('Construct', construct_record.get('primaryId')),
                 "dataProvider": data_provider,
                 "nameText": name_text,
                 "name": construct_record.get('name')
@@ -281,6 +281,7 @@ class ConstructETL(ETL):
             self.comp_process(construct_record, component_details, non_bgi_components, component_no_gene_details)
 
             if counter == batch_size:
+                IdentifierRegistry.add('Construct', [construct['primaryId'] for construct in constructs])
                 yield [constructs,
                        construct_secondary_ids,
                        construct_synonyms,
@@ -298,6 +299,7 @@ class ConstructETL(ETL):
                 counter = 0
 
         if counter > 0:
+            IdentifierRegistry.add('Construct', [construct['primaryId'] for construct in constructs])
             yield [constructs,
                    construct_secondary_ids,
                    construct_synonyms,
@@ -2,12 +2,13 @@
 
 # TODO need to fix the difference between disaeseRecord and disease_record in original code
 
+import json
 import logging
 import multiprocessing
-import uuid
 from etl import ETL
 from etl.helpers import ETLHelper
 from etl.helpers import Neo4jHelper
+from etl.helpers import IdentifierRegistry
 from files import JSONFile
 from transactors import CSVTransactor
 from transactors import Neo4jTransactor
@@ -182,6 +183,40 @@ class DiseaseETL(ETL):
 
             MERGE (d)-[dgaw:PRIMARY_GENETIC_ENTITY]-(n)"""
 
+    execute_delete_query_template = """
+        USING PERIODIC COMMIT %s
+        LOAD CSV WITH HEADERS FROM \'file:///%s\' AS row
+
+            MATCH (pubEJ:PublicationJoin:Association {primaryKey:row.pecjPrimaryKey})
+            DETACH DELETE pubEJ
+
+            // The association goes too once none of its evidence is left.
+            WITH row
+            MATCH (dfa:Association:DiseaseEntityJoin {primaryKey:row.diseaseUniqueKey})
+                WHERE NOT (dfa)-[:EVIDENCE]->()
+            OPTIONAL MATCH (:DOTerm {primaryKey:row.doId})-[rel {uuid:row.diseaseUniqueKey}]->()
+            DELETE rel
+            DETACH DELETE dfa"""
+
+    # An annotation (one per disease record) and its evidence. Its key is derived
+    # from the whole record, so annotations are only ever added or removed; the
+    # URLs come from the resource descriptors instead.
+    delta_groups = [
+        {'files': {'disease_allele_data': ['pecjPrimaryKey'],
+                   'disease_gene_data': ['pecjPrimaryKey'],
+                   'disease_agms_data': ['pecjPrimaryKey'],
+                   'disease_pges_gene_data': ['pecjPrimaryKey'],
+                   'disease_pges_allele_data': ['pecjPrimaryKey'],
+                   'disease_pges_agms_data': ['pecjPrimaryKey'],
+                   'disease_evidence_code_data': ['pecjPrimaryKey']},
+         'ignore': ['pubMedUrl', 'pubModUrl'],
+         'delete': execute_delete_query_template}
+    ]
+
+    # Node label of each objectType, anything else is an AGM.
+    object_type_labels = {'gene': 'Gene',
+                          'allele': 'Allele'}
+
     def __init__(self, config):
         """Initialise object."""
         super().__init__()
@@ -254,6 +289,7 @@ class DiseaseETL(ETL):
 
         query_and_file_list = self.process_query_params(query_template_list)
         CSVTransactor.save_file_static(generators, query_and_file_list)
+        query_and_file_list = self.get_delta_queries(sub_type, query_and_file_list, commit_size)
         Neo4jTransactor.execute_query_batch(query_and_file_list)
         self.error_messages("Disease-{}: ".format(sub_type.get_data_provider()))
         self.logger.info("Finished Loading Disease Data: %s", sub_type.get_data_provider())
@@ -315,7 +351,7 @@ class DiseaseETL(ETL):
 
     def evidence_process(self, disease_record, pubs, evidence_code_list_to_yield):
         """Process evidence."""
-        pecj_primary_key = str(uuid.uuid4())
+        pecj_primary_key = ETLHelper.get_uuid('PublicationJoin', json.dumps(disease_record, sort_keys=True))
         if 'evidence' not in disease_record:
             self.logger.critical("No evidence but creating new pecj_primary_key anyway")
             return pecj_primary_key
@@ -412,6 +448,7 @@ class DiseaseETL(ETL):
 
         self.data_providers_process(disease_data)
 
+        unloaded_object_count = 0
         for disease_record in disease_data['data']:
 
             pubs = {'pub_med_url': None,
@@ -426,6 +463,13 @@ class DiseaseETL(ETL):
                 if is_it_test_entry is False:
                     continue
 
+            object_ids = IdentifierRegistry.get_identifiers(
+                self.object_type_labels.get(disease_record['objectRelation'].get("objectType"),
+                                            'AffectedGenomicModel'))
+            if object_ids is not None and disease_record.get('objectId') not in object_ids:
+                unloaded_object_count += 1
+                continue
+
             self.disease_unique_key = disease_record.get('objectId') + disease_record.get('DOid') + \
                 disease_record['objectRelation'].get("associationType").upper()
             self.disease_association_type = disease_record['objectRelation'].get("associationType").upper()
@@ -486,6 +530,9 @@ class DiseaseETL(ETL):
                 withs = []
                 counter = 0
 
+        if unloaded_object_count > 0:
+            self.logger.info("Skipped %s annotations to objects that were not loaded.", unloaded_object_count)
+
         if counter > 0:
             yield [allele_list_to_yield,
                    gene_list_to_yield,
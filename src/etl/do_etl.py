@@ -2,10 +2,9 @@
 
 import logging
 import re
-from ontobio import OntologyFactory
 
 from etl import ETL
-from etl.helpers import ETLHelper
+from etl.helpers import ETLHelper, IdentifierRegistry, ClosureHelper, OBOHelper, OntologyCache
 from transactors import CSVTransactor
 from transactors import Neo4jTransactor
 
@@ -106,8 +105,9 @@ class DOETL(ETL):
 
     def get_generators(self, filepath, batch_size):  # noqa TODO:Needs splitting up really
         """Get Generators."""
-        ont = OntologyFactory().create(filepath)
+        ont = OntologyCache.get_ontology(filepath)
         parsed_line = ont.graph.copy().node
+        parents_by_relation = OBOHelper.get_parents_by_relation(ont, relations=['subClassOf'])
 
         do_term_list = []
         do_isas_list = []
@@ -183,12 +183,7 @@ class DOETL(ETL):
                         converted_subsets.append(subset_str)
                     subset = converted_subsets
 
-            all_parents = ont.parents(key)
-            all_parents.append(key)
-
-            # Improves performance when traversing relations
-            all_parents_subont = ont.subontology(all_parents)
-            isas_without_names = all_parents_subont.parents(key, relations=['subClassOf'])
+            isas_without_names = parents_by_relation['subClassOf'].get(key, [])
 
             for item in isas_without_names:
                 dictionary = {
@@ -267,6 +262,9 @@ class DOETL(ETL):
             do_term_list.append(dict_to_append)
 
             if counter == batch_size:
+                IdentifierRegistry.add('DOTerm', [term['oid'] for term in do_term_list])
+                ClosureHelper.add_edges('DOTerm', [(edge['primary_id'], edge['primary_id2'])
+                                                   for edge in do_isas_list])
                 yield [do_term_list, do_isas_list, do_synonyms_list, xrefs, do_alt_ids_list]
                 do_term_list = []
                 do_isas_list = []
@@ -276,4 +274,7 @@ class DOETL(ETL):
                 counter = 0
 
         if counter > 0:
+            IdentifierRegistry.add('DOTerm', [term['oid'] for term in do_term_list])
+            ClosureHelper.add_edges('DOTerm', [(edge['primary_id'], edge['primary_id2'])
+                                               for edge in do_isas_list])
             yield [do_term_list, do_isas_list, do_synonyms_list, xrefs, do_alt_ids_list]
@@ -5,8 +5,9 @@ import sys
 import time
 
 from test import TestObject
-from etl.helpers import ETLHelper
+from etl.helpers import ETLHelper, DeltaLoadHelper
 from loader_common import ContextInfo
+from run_metrics import RunMetrics
 
 
 class ETL():
@@ -15,10 +16,14 @@ class ETL():
     logger = logging.getLogger(__name__)
     etlh = ETLHelper()
 
+    # Row groups of the CSV files of a sub type, for delta loads (see DeltaLoadHelper).
+    delta_groups = []
+
     def __init__(self):
         """Initialise objects."""
         context_info = ContextInfo()
         self.schema_branch = context_info.env["TEST_SCHEMA_BRANCH"]
+        self.delta_load = context_info.env["DELTA_LOAD"]
 
         if context_info.env["TEST_SET"]:
             self.logger.warning("WARNING: Test data load enabled.")
@@ -28,27 +33,33 @@ class ETL():
             self.test_object = TestObject(False)
 
     def error_messages(self, prefix=""):
-        """Print out error summary messages."""
-        for key in self.etlh.rdh2.missing_pages.keys():
-            self.logger.critical("%s Missing page %s seen %s times", prefix, key, self.etlh.rdh2.missing_pages[key])
-        self.etlh.rdh2.missing_pages = {}
-        for key in self.etlh.rdh2.missing_keys.keys():
-            self.logger.critical("%s Missing key %s seen %s times", prefix, key, self.etlh.rdh2.missing_keys[key])
-        self.etlh.rdh2.missing_keys = {}
-        for key in self.etlh.rdh2.deprecated_mess.keys():
-            self.logger.critical("%s Deprecated %s seen %s times", prefix, key, self.etlh.rdh2.deprecated_mess[key])
-        self.etlh.rdh2.deprecated_mess = {}
-        for key in self.etlh.rdh2.bad_pages.keys():
-            self.logger.critical("%s None matching urls %s seen %s times", prefix, key, self.etlh.rdh2.bad_pages[key])
-            self.etlh.rdh2.bad_pages = {}
-        for key in self.etlh.rdh2.bad_regex.keys():
-            self.logger.critical("%s None matching regex %s seen %s times", prefix, key, self.etlh.rdh2.bad_regex[key])
-        self.etlh.rdh2.bad_regex = {}
+        """Record the error counts of this process for the run report, and clear them.
+
+        The counts of every process are merged and logged once when the load finishes.
+        """
+        error_counts = self.etlh.rdh2.get_error_counts()
+        if error_counts:
+            RunMetrics.record('lookup_errors', source=prefix.strip(), counts=error_counts)
+        self.etlh.rdh2.reset_error_counts()
 
     def run_etl(self):
         """Run ETL."""
+        start_time = time.time()
         self._load_and_process_data()
         self.error_messages("ETL main:")
+        RunMetrics.record('runtime', seconds=time.time() - start_time)
+        RunMetrics.record_peak_rss()
+
+    def get_delta_queries(self, sub_type, query_and_file_list, commit_size):
+        """Get the queries to load a sub type with.
+
+        In a delta load only what changed since the last delta load is loaded,
+        otherwise query_and_file_list is returned as is.
+        """
+        if not self.delta_load:
+            return query_and_file_list
+
+        return DeltaLoadHelper.get_delta_queries(sub_type, query_and_file_list, self.delta_groups, commit_size)
 
     @staticmethod
     def wait_for_threads(thread_pool, queue=None):
@@ -5,7 +5,7 @@ import multiprocessing
 import xmltodict
 
 from etl import ETL
-from etl.helpers import ETLHelper, Neo4jHelper
+from etl.helpers import ETLHelper, Neo4jHelper, CrossReferenceIndex
 from transactors import CSVTransactor, Neo4jTransactor
 
 
@@ -60,6 +60,12 @@ class ExpressionAtlasETL(ETL):
 
     @staticmethod
     def _get_primary_gene_ids_to_ensembl_ids():
+        crossreference_index = CrossReferenceIndex.get_index()
+        if crossreference_index is not None:
+            return {key.split(':', 1)[1]: gene_primary_key
+                    for key, gene_primary_key, _ in crossreference_index.items()
+                    if key.startswith('ensembl:')}
+
         return_set = Neo4jHelper.run_single_query(ExpressionAtlasETL.get_all_gene_primary_to_ensmbl_ids_query)
         return {record["c.localId"].lower(): record["g.primaryKey"] for record in return_set}
 
@@ -2,12 +2,11 @@
 
 import logging
 import codecs
-import uuid
 import multiprocessing
 import ijson
 
 from etl import ETL
-from etl.helpers import ETLHelper, Neo4jHelper
+from etl.helpers import ETLHelper, Neo4jHelper, IdentifierRegistry
 from transactors import CSVTransactor, Neo4jTransactor
 
 
@@ -70,7 +69,7 @@ class ExpressionETL(ETL):
                      pubf.pubModUrl = row.pubModUrl,
                      pubf.pubMedUrl = row.pubMedUrl
 
-            CREATE (gej)-[gejpubf:EVIDENCE]->(pubf) """
+            MERGE (gej)-[gejpubf:EVIDENCE]->(pubf) """
 
     ao_expression_query_template = """
         USING PERIODIC COMMIT %s
@@ -256,6 +255,49 @@ class ExpressionETL(ETL):
 
             MERGE (ei)-[eiu:STAGE_RIBBON_TERM]-(u) """
 
+    expression_join_update_query_template = """
+        USING PERIODIC COMMIT %s
+        LOAD CSV WITH HEADERS FROM \'file:///%s\' AS row
+
+            // The rows of the join are loaded again next, drop what they merge.
+            MATCH (gej:BioEntityGeneExpressionJoin:Association {primaryKey:row.ei_uuid})
+            OPTIONAL MATCH (gej)-[r:EVIDENCE|CROSS_REFERENCE|DURING|STAGE_RIBBON_TERM]-()
+            DELETE r """
+
+    expression_join_delete_query_template = """
+        USING PERIODIC COMMIT %s
+        LOAD CSV WITH HEADERS FROM \'file:///%s\' AS row
+
+            MATCH (gej:BioEntityGeneExpressionJoin:Association {primaryKey:row.ei_uuid})
+            OPTIONAL MATCH (g:Gene)-[:ASSOCIATION]->(gej)<-[:ASSOCIATION]-(e:ExpressionBioEntity)
+            DETACH DELETE gej
+
+            // The gene is no longer expressed in the entity once no join is left.
+            WITH g, e
+                WHERE g IS NOT NULL
+                AND NOT (g)-[:ASSOCIATION]->(:BioEntityGeneExpressionJoin)<-[:ASSOCIATION]-(e)
+            MATCH (g)-[gex:EXPRESSED_IN]->(e)
+            DELETE gex """
+
+    # An expression annotation (gene, assay, stage and where expressed) and the
+    # rows about it. Expression bio entities are shared between annotations and
+    # MODs, their rows are only ever added.
+    delta_groups = [
+        {'files': {'expression_entity_joins': ['ei_uuid'],
+                   'expression_gene_ao': ['ei_uuid'],
+                   'expression_ao_expression': ['ei_uuid'],
+                   'expression_cc_expression': ['ei_uuid'],
+                   'expression_SGD_cc_expression': ['ei_uuid'],
+                   'expression_ao_cc_expression': ['ei_uuid'],
+                   'expression_stage_expression': ['ei_uuid'],
+                   'expression_uberon_stage': ['ei_uuid'],
+                   'expression_uberon_stage_other': ['ei_uuid'],
+                   'expression_cross_references': ['ei_uuid'],
+                   'expression_add_pubs': ['ei_uuid']},
+         'update': expression_join_update_query_template,
+         'delete': expression_join_delete_query_template}
+    ]
+
     def __init__(self, config):
         """Ibnitialise object."""
         super().__init__()
@@ -345,6 +387,7 @@ class ExpressionETL(ETL):
 
         query_and_file_list = self.process_query_params(query_template_list)
         CSVTransactor.save_file_static(generators, query_and_file_list)
+        query_and_file_list = self.get_delta_queries(sub_type, query_and_file_list, commit_size)
 
         for item in query_and_file_list:
             query_tracking_list.append(item)
@@ -394,6 +437,9 @@ class ExpressionETL(ETL):
         uberon_ao_other_data = []
         uberon_stage_other_data = []
 
+        gene_ids = IdentifierRegistry.get_identifiers('Gene')
+        unloaded_gene_count = 0
+
         self.logger.debug("streaming json data from %s ...", expression_file)
         with codecs.open(expression_file, 'r', 'utf-8') as file_handle:
             for xpat in ijson.items(file_handle, 'data.item'):
@@ -414,6 +460,11 @@ class ExpressionETL(ETL):
                         counter = counter - 1
                         continue
 
+                if gene_ids is not None and gene_id not in gene_ids:
+                    counter = counter - 1
+                    unloaded_gene_count += 1
+                    continue
+
                 evidence = xpat.get('evidence')
 
                 if 'publicationId' in evidence:
@@ -619,7 +670,6 @@ class ExpressionETL(ETL):
                         "pubModId": publication_mod_id,
                         "pubModUrl": pub_mod_url,
                         "pubPrimaryKey": pub_med_id + publication_mod_id,
-                        "uuid": str(uuid.uuid4()),
                         "assay": assay,
                         "anatomicalStructureTermId": anatomical_structure_term_id,
                         "whereExpressedStatement": where_expressed_statement,
@@ -700,7 +750,6 @@ class ExpressionETL(ETL):
                             "pubModId": publication_mod_id,
                             "pubModUrl": pub_mod_url,
                             "pubPrimaryKey": pub_med_id + publication_mod_id,
-                            "uuid": str(uuid.uuid4()),
                             "stageTermId": stage_term_id,
                             "stageName": stage_name,
                             "stageUberonTermId": stage_uberon_term_id,
@@ -750,6 +799,10 @@ class ExpressionETL(ETL):
                     pubs = []
                     counter = 0
 
+            if unloaded_gene_count > 0:
+                self.logger.info("Skipped %s expression records for genes that were not loaded.",
+                                 unloaded_gene_count)
+
             if counter > 0:
                 yield [bio_entities,
                        bio_entity_gene_aos,
@@ -9,7 +9,7 @@ import requests
 
 from collections import defaultdict
 from etl import ETL
-from etl.helpers import Neo4jHelper
+from etl.helpers import Neo4jHelper, OntologyCache
 from genedescriptions.config_parser import GenedescConfigParser
 from genedescriptions.descriptions_writer import DescriptionsWriter
 from genedescriptions.gene_description import GeneDescription
@@ -133,9 +133,9 @@ class GeneDescriptionsETL(ETL):
         # create gene descriptions data manager and load common data
         context_info = ContextInfo()
         data_manager = DataFileManager(context_info.config_file_location)
-        # go_onto_config = data_manager.get_config('GO')
+        go_onto_config = data_manager.get_config('GO')
         go_annot_config = data_manager.get_config('GAF')
-        # do_onto_config = data_manager.get_config('DOID')
+        do_onto_config = data_manager.get_config('DOID')
         go_annot_sub_dict = {sub.get_data_provider(): sub for sub in go_annot_config.get_sub_type_objects()}
         this_dir = os.path.split(__file__)[0]
         gd_config = GenedescConfigParser(os.path.join(this_dir,
@@ -144,10 +144,12 @@ class GeneDescriptionsETL(ETL):
                                                       "gene_descriptions.yml"))
         gd_data_manager = DataManager(do_relations=None, go_relations=["subClassOf", "BFO:0000050"])
         gd_data_manager.set_ontology(ontology_type=DataType.GO,
-                                     ontology=self.get_ontology(data_type=DataType.GO),
+                                     ontology=self.get_ontology(data_type=DataType.GO,
+                                                                onto_config=go_onto_config),
                                      config=gd_config)
         gd_data_manager.set_ontology(ontology_type=DataType.DO,
-                                     ontology=self.get_ontology(data_type=DataType.DO),
+                                     ontology=self.get_ontology(data_type=DataType.DO,
+                                                                onto_config=do_onto_config),
                                      config=gd_config)
         # generate descriptions for each MOD
         for prvdr in [sub_type.get_data_provider().upper()
@@ -254,8 +256,16 @@ class GeneDescriptionsETL(ETL):
             json_desc_writer.add_gene_desc(gene_desc)
         yield [descriptions]
 
-    def get_ontology(self, data_type: DataType, provider=None):
-        """Get Ontology."""
+    def get_ontology(self, data_type: DataType, provider=None, onto_config=None):
+        """Get Ontology.
+
+        GO and DO are built from the parsed ontology cache when their file was loaded this run.
+        """
+        if onto_config is not None and data_type in [DataType.GO, DataType.DO]:
+            filepath = onto_config.get_single_filepath()
+            if filepath is not None and os.path.isfile(filepath):
+                return self.get_ontology_from_file(filepath, with_term_type=data_type == DataType.GO)
+
         ontology = Ontology()
         terms_pairs = []
         if data_type == DataType.GO:
@@ -314,6 +324,35 @@ class GeneDescriptionsETL(ETL):
 
         return ontology
 
+    def get_ontology_from_file(self, filepath, with_term_type):
+        """Get the IS_A / PART_OF ontology of an ontology file, the same one get_ontology reads from Neo4j.
+
+        with_term_type sets the namespace of the terms, which only the GO ETL loads as the term type.
+        """
+        ontology = Ontology()
+        graph = OntologyCache.get_ontology(filepath).get_graph()
+        for parent, child, edge_data in graph.edges(data=True):
+            if edge_data.get('pred') not in ["subClassOf", "BFO:0000050"]:
+                continue
+            # The ontology ETLs only load the parents of terms, properties are skipped.
+            child_node = graph.node[child]
+            if len(child_node) == 0 or child_node.get('type') == 'PROPERTY':
+                continue
+            for term_id in [child, parent]:
+                node = graph.node[term_id]
+                meta = node.get('meta', {})
+                term_type = None
+                if with_term_type:
+                    for property_value_map in meta.get('basicPropertyValues', []):
+                        if property_value_map['pred'] == 'OIO:hasOBONamespace':
+                            term_type = property_value_map['val']
+                is_obsolete = "true" if meta.get('is_obsolete') or meta.get('deprecated') else "false"
+                self.add_neo_term_to_ontobio_ontology_if_not_exists(term_id, node.get('label'), term_type,
+                                                                    is_obsolete, ontology)
+            ontology.add_parent(child, parent, relation=edge_data['pred'])
+
+        return ontology
+
     @staticmethod
     def add_neo_term_to_ontobio_ontology_if_not_exists(term_id, term_label,
                                                        term_type, is_obsolete, ontology):
@@ -2,12 +2,11 @@
 
 import logging
 import multiprocessing
-import uuid
 
 from datetime import datetime
 from etl import ETL
 from transactors import CSVTransactor, Neo4jTransactor
-from .helpers import Neo4jHelper
+from .helpers import Neo4jHelper, ETLHelper
 
 
 class GeneDiseaseOrthoETL(ETL):
@@ -124,11 +123,12 @@ class GeneDiseaseOrthoETL(ETL):
                     AND not (ec.primaryKey = "ECO:0000501")
                     AND not (ec.primaryKey = "ECO:0000250")
                     AND not (ec.primaryKey = "ECO:0000266")
+                // One row per association, whatever the number of evidence codes,
+                // as the association and its PublicationJoin are keyed on these.
                 RETURN DISTINCT gene2.primaryKey AS geneID,
                     gene1.primaryKey AS fromGeneID,
                     type(da) AS relationType,
-                    disease.primaryKey AS doId,
-                    ec.primaryKey as ec
+                    disease.primaryKey AS doId
         """
 
         return_set = Neo4jHelper().run_single_query(retrieve_gene_disease_ortho_query)
@@ -141,6 +141,7 @@ class GeneDiseaseOrthoETL(ETL):
                 relation_type = 'IMPLICATED_VIA_ORTHOLOGY'
             elif record['relationType'] == 'IS_MARKER_FOR':
                 relation_type = 'BIOMARKER_VIA_ORTHOLOGY'
+            association_key = record["geneID"] + record["fromGeneID"] + relation_type + record["doId"]
             row = {"primaryId": record["geneID"],
                    "fromGeneId": record["fromGeneID"],
                    "relationshipType": relation_type,
@@ -148,8 +149,8 @@ class GeneDiseaseOrthoETL(ETL):
                    "doId": record["doId"],
                    "dateProduced": date,
                    "dateAssigned": date,
-                   "uuid": record["geneID"] + record["fromGeneID"] + relation_type + record["doId"],
-                   "pubEvidenceUuid": str(uuid.uuid4())}
+                   "uuid": association_key,
+                   "pubEvidenceUuid": ETLHelper.get_uuid('PublicationJoin', association_key)}
             gene_disease_ortho_data.append(row)
 
         yield [gene_disease_ortho_data]
@@ -6,8 +6,7 @@ import multiprocessing
 import re
 
 from etl import ETL
-from etl.helpers import OBOHelper
-from files import TXTFile
+from etl.helpers import OBOHelper, IdentifierRegistry, ClosureHelper
 from transactors import CSVTransactor
 from transactors import Neo4jTransactor
 
@@ -116,7 +115,7 @@ class GenericOntologyETL(ETL):
         ]
 
         # Obtain the generator
-        generators = self.get_generators(filepath, batch_size)
+        generators = self.get_generators(filepath, batch_size, ont_type)
 
         query_and_file_list = self.process_query_params(query_template_list)
         CSVTransactor.save_file_static(generators, query_and_file_list)
@@ -124,151 +123,94 @@ class GenericOntologyETL(ETL):
         self.error_messages("GenOnt-{}: ".format(sub_type.get_data_provider()))
         self.logger.info("Finished Loading Generic Ontology Data: %s", sub_type.get_data_provider())
 
-    def get_generators(self, filepath, batch_size):  # noqa
+    def get_generators(self, filepath, batch_size, ont_type):
         """Get Generators."""
-        o_data = TXTFile(filepath).get_data()
-        parsed_line = OBOHelper.parse_obo(o_data)
-
         counter = 0
 
         terms = []
         syns = []
         isas = []
         partofs = []
-        subsets = []
         altids = []
 
-        for line in parsed_line:  # Convert parsed obo term into a schema-friendly AGR dictionary.
+        # Convert parsed obo term into a schema-friendly AGR dictionary.
+        for stanza in OBOHelper.iter_obo_terms(filepath):
             counter += 1
-            o_syns = line.get('synonym')
-            ident = line['id'].strip()
+            ident = stanza.get('id', [''])[0]
             prefix = ident.split(":")[0]
             display_synonym = ""
-            o_altids = line.get('alt_id')
-
-            if o_altids is not None:
-                if isinstance(o_altids, (list, tuple)):
-                    for altid in o_altids:
-                        alt_dict_to_append = {
-                            'primary_id': ident,
-                            'secondary_id': altid
-                        }
-                        altids.append(alt_dict_to_append)
-                else:
-                    alt_dict_to_append = {
-                        'primary_id': ident,
-                        'secondary_id': o_altids
-                    }
-                    altids.append(alt_dict_to_append)
-
-            if o_syns is not None:
-                if isinstance(o_syns, (list, tuple)):
-                    for syn in o_syns:
-
-                        synsplit = re.split(r'(?<!\\)"', syn)
-                        syns_dict_to_append = {
-                            'oid': ident,
-                            'syn': synsplit[1].replace('\\"', '""')
-                        }
-                        syns.append(syns_dict_to_append)  # Synonyms appended here.
-                        if "DISPLAY_SYNONYM" in syn:
-                            display_synonym = synsplit[1].replace('"', '""')
-                else:
-                    synsplit = re.split(r'(?<!\\)"', o_syns)
-                    syns_dict_to_append = {
-                        'oid': ident,
-                        'syn': synsplit[1].replace('\"', '""')
-                    }
-                    syns.append(syns_dict_to_append)  # Synonyms appended here.
-                    if "DISPLAY_SYNONYM" in o_syns:
-                        display_synonym = synsplit[1].replace('\"', '""')
-            # subset
-            new_subset = line.get('subset')
-            subsets.append(new_subset)
+
+            for altid in stanza.get('alt_id', []):
+                altids.append({
+                    'primary_id': ident,
+                    'secondary_id': altid
+                })
+
+            for syn in stanza.get('synonym', []):
+                synsplit = re.split(r'(?<!\\)"', syn)
+                syns.append({
+                    'oid': ident,
+                    'syn': synsplit[1].replace('\\"', '""')
+                })
+                if "DISPLAY_SYNONYM" in syn:
+                    display_synonym = synsplit[1].replace('"', '""')
 
             # is_a processing
-            o_is_as = line.get('is_a')
-            if o_is_as is not None:
-                if isinstance(o_is_as, (list, tuple)):
-                    for isa in o_is_as:
-                        if 'gci_filler=' not in isa:
-                            isa_without_name = isa.split(' ')[0].strip()
-                            isas_dict_to_append = {
-                                'oid': ident,
-                                'isa': isa_without_name}
-                            isas.append(isas_dict_to_append)
-                else:
-                    if 'gci_filler=' not in o_is_as:
-                        isa_without_name = o_is_as.split(' ')[0].strip()
-                        isas_dict_to_append = {'oid': ident,
-                                               'isa': isa_without_name}
-                        isas.append(isas_dict_to_append)
+            for isa in stanza.get('is_a', []):
+                if 'gci_filler=' not in isa:
+                    isas.append({
+                        'oid': ident,
+                        'isa': isa.split(' ')[0]
+                    })
 
             # part_of processing
-            relations = line.get('relationship')
-            if relations is not None:
-                if isinstance(relations, (list, tuple)):
-                    for partof in relations:
-                        if 'gci_filler=' not in partof:
-                            relationship_descriptors = partof.split(' ')
-                            o_part_of = relationship_descriptors[0]
-                            if o_part_of == 'part_of':
-                                partof_dict_to_append = {
-                                    'oid': ident,
-                                    'partof': relationship_descriptors[1]
-                                }
-                                partofs.append(partof_dict_to_append)
-                else:
-                    if 'gci_filler=' not in relations:
-                        relationship_descriptors = relations.split(' ')
-                        o_part_of = relationship_descriptors[0]
-                        if o_part_of == 'part_of':
-                            partof_dict_to_append = {
-                                'oid': ident,
-                                'partof': relationship_descriptors[1]}
-                            partofs.append(partof_dict_to_append)
-
-            definition = line.get('def')
-            if definition is None:
-                definition = ""
-            else:
-                # Looking to remove instances of \" in the definition string.
-                if "\\\"" in definition:
-                    # Replace them with just a single "
-                    definition = definition.replace('\\\"', '\"')
-
-            if definition is None:
-                definition = ""
+            for relationship in stanza.get('relationship', []):
+                if 'gci_filler=' not in relationship:
+                    relationship_descriptors = relationship.split(' ')
+                    if relationship_descriptors[0] == 'part_of':
+                        partofs.append({
+                            'oid': ident,
+                            'partof': relationship_descriptors[1]
+                        })
 
-            is_obsolete = line.get('is_obsolete')
-            if is_obsolete is None:
-                is_obsolete = "false"
+            definition = stanza.get('def', [""])[0]
+            # Looking to remove instances of \" in the definition string.
+            if "\\\"" in definition:
+                # Replace them with just a single "
+                definition = definition.replace('\\\"', '\"')
 
-            if ident is None or ident == '':
+            if ident == '':
                 self.logger.warning("Missing oid.")
             else:
-                term_dict_to_append = {
-                    'name': line.get('name'),
-                    'name_key': line.get('name'),
+                terms.append({
+                    'name': stanza.get('name', [None])[0],
+                    'name_key': stanza.get('name', [None])[0],
                     'oid': ident,
                     'definition': definition,
-                    'is_obsolete': is_obsolete,
+                    'is_obsolete': stanza.get('is_obsolete', ["false"])[0],
                     'oPrefix': prefix,
                     'oboFile': prefix,
-                    'o_type': line.get('namespace'),
+                    'o_type': stanza.get('namespace', [None])[0],
                     'display_synonym': display_synonym
-                }
-
-                terms.append(term_dict_to_append)
+                })
 
             # Establishes the number of genes to yield (return) at a time.
             if counter == batch_size:
                 counter = 0
+                IdentifierRegistry.add(ont_type + 'Term', [term['oid'] for term in terms])
+                ClosureHelper.add_edges(ont_type + 'Term',
+                                        [(isa['oid'], isa['isa']) for isa in isas]
+                                        + [(partof['oid'], partof['partof']) for partof in partofs])
                 yield [terms, isas, partofs, syns, altids]
                 terms = []
                 syns = []
                 isas = []
                 partofs = []
+                altids = []
 
         if counter > 0:
+            IdentifierRegistry.add(ont_type + 'Term', [term['oid'] for term in terms])
+            ClosureHelper.add_edges(ont_type + 'Term',
+                                    [(isa['oid'], isa['isa']) for isa in isas]
+                                    + [(partof['oid'], partof['partof']) for partof in partofs])
             yield [terms, isas, partofs, syns, altids]
@@ -0,0 +1,76 @@
+"""Genomic Overlap ETL."""
+
+import logging
+import multiprocessing
+
+from etl import ETL
+from transactors import CSVTransactor
+from transactors import Neo4jTransactor
+from .helpers import GenomicIntervalIndex
+
+
+class GenomicOverlapETL(ETL):
+    """Variants overlapping the genes and transcripts loaded, from the genomic interval index."""
+
+    logger = logging.getLogger(__name__)
+
+    gene_overlap_query_template = """
+        USING PERIODIC COMMIT %s
+        LOAD CSV WITH HEADERS FROM \'file:///%s\' AS row
+            MATCH (v:Variant {primaryKey:row.variantId})
+            MATCH (o:Gene {primaryKey:row.primaryKey})
+            MERGE (v)-[:OVERLAPS]->(o) """
+
+    transcript_overlap_query_template = """
+        USING PERIODIC COMMIT %s
+        LOAD CSV WITH HEADERS FROM \'file:///%s\' AS row
+            MATCH (v:Variant {primaryKey:row.variantId})
+            MATCH (o:Transcript {primaryKey:row.primaryKey})
+            MERGE (v)-[:OVERLAPS]->(o) """
+
+    def __init__(self, config):
+        """Initialise object."""
+        super().__init__()
+        self.data_type_config = config
+
+    def _load_and_process_data(self):
+        thread_pool = []
+
+        for sub_type in self.data_type_config.get_sub_type_objects():
+            process = multiprocessing.Process(target=self._process_sub_type, args=(sub_type,))
+            process.start()
+            thread_pool.append(process)
+
+        ETL.wait_for_threads(thread_pool)
+
+    def _process_sub_type(self, sub_type):
+        label = sub_type.get_data_provider()
+        self.logger.info("Starting Variant overlaps for: %s", label)
+
+        query_templates = {'Gene': self.gene_overlap_query_template,
+                           'Transcript': self.transcript_overlap_query_template}
+        query_list = [
+            [query_templates[label], self.data_type_config.get_neo4j_commit_size(),
+             "variant_overlaps_" + label + ".csv"]
+        ]
+
+        generators = self.get_generators(label, self.data_type_config.get_generator_batch_size())
+
+        query_and_file_list = self.process_query_params(query_list)
+        CSVTransactor.save_file_static(generators, query_and_file_list)
+        Neo4jTransactor.execute_query_batch(query_and_file_list)
+        self.error_messages("Overlap-{}: ".format(label))
+        self.logger.info("Finished Variant overlaps for: %s", label)
+
+    def get_generators(self, label, batch_size):
+        """Get Generators."""
+        overlaps = []
+        for variant_id, primary_key in GenomicIntervalIndex.get_overlaps('Variant', label):
+            overlaps.append({"variantId": variant_id,
+                             "primaryKey": primary_key})
+            if len(overlaps) == batch_size:
+                yield [overlaps]
+                overlaps = []
+
+        if overlaps:
+            yield [overlaps]
@@ -7,7 +7,7 @@ import xmltodict
 from pathlib import Path
 
 from etl import ETL
-from etl.helpers import ETLHelper, Neo4jHelper
+from etl.helpers import ETLHelper, Neo4jHelper, CrossReferenceIndex
 from transactors import CSVTransactor, Neo4jTransactor
 
 
@@ -56,6 +56,23 @@ class GeoXrefETL(ETL):
             Neo4jTransactor.execute_query_batch(query_and_file_list)
             self.error_messages()
 
+    def get_genes_by_entrez_id(self, entrez_ids):
+        """Get (gene primary key, modLocalId, entrez id) of the genes with these entrez ids.
+
+        Uses the cross reference index when the genes were loaded in this run.
+        """
+        crossreference_index = CrossReferenceIndex.get_index()
+        if crossreference_index is not None:
+            for entrez_id in entrez_ids:
+                for gene_primary_key, mod_local_id in crossreference_index.get_gene_records(entrez_id):
+                    yield gene_primary_key, mod_local_id, entrez_id
+            return
+
+        return_set = Neo4jHelper.run_single_parameter_query(self.gene_crossref_query_template,
+                                                            entrez_ids)
+        for record in return_set:
+            yield record["g.primaryKey"], record["g.modLocalId"], record["cr.globalCrossRefId"]
+
     def get_generators(self, sub_type, batch_size, species_encoded):
         """Get Generators."""
         entrez_ids = []
@@ -74,13 +91,7 @@ class GeoXrefETL(ETL):
                             entrez_ids.append("NCBI_Gene:" + entrez_id)
 
         geo_data_list = []
-        return_set = Neo4jHelper.run_single_parameter_query(self.gene_crossref_query_template,
-                                                            entrez_ids)
-
-        for record in return_set:
-            gene_primary_key = record["g.primaryKey"]
-            mod_local_id = record["g.modLocalId"]
-            global_cross_ref_id = record["cr.globalCrossRefId"]
+        for gene_primary_key, mod_local_id, global_cross_ref_id in self.get_genes_by_entrez_id(entrez_ids):
             url = self.etlh.rdh2.return_url_from_key_value('GEO', global_cross_ref_id.split(":")[1], 'entrezgene')
             geo_xref = ETLHelper.get_xref_dict(global_cross_ref_id.split(":")[1],
                                                "NCBI_Gene",
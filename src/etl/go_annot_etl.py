@@ -6,7 +6,7 @@ import csv
 import multiprocessing
 
 from etl import ETL
-from etl.helpers import ETLHelper
+from etl.helpers import ETLHelper, IdentifierRegistry
 from transactors import CSVTransactor, Neo4jTransactor
 
 
@@ -85,6 +85,8 @@ class GOAnnotETL(ETL):
         """Create Generators."""
         go_annot_list = []
         counter = 0
+        gene_ids = IdentifierRegistry.get_identifiers('Gene')
+        unloaded_gene_count = 0
         reader = csv.reader(file, delimiter='\t')
         line_counter = 1
         try:
@@ -96,6 +98,9 @@ class GOAnnotETL(ETL):
                     gene = line[1]
                 else:
                     gene = prefix + line[1]
+                if gene_ids is not None and gene not in gene_ids:
+                    unloaded_gene_count += 1
+                    continue
 
                 go_id = line[4]
                 go_annot_dict = {
@@ -111,6 +116,9 @@ class GOAnnotETL(ETL):
         except Exception:
             self.logger.error("GAF file is failing %s at line %s", file.name, str(line_counter))
 
+        if unloaded_gene_count > 0:
+            self.logger.info("Skipped %s annotations to genes that were not loaded.", unloaded_gene_count)
+
         if counter > 0:
             yield [go_annot_list]
         file.close()
@@ -1,8 +1,8 @@
 """GO ETL."""
 
 import logging
-from ontobio import OntologyFactory
 from etl import ETL
+from etl.helpers import IdentifierRegistry, ClosureHelper, OBOHelper, OntologyCache
 from transactors import CSVTransactor, Neo4jTransactor
 
 
@@ -120,8 +120,9 @@ class GOETL(ETL):
 
     def get_generators(self, filepath, batch_size):  # noqa
         """Get Generators."""
-        ont = OntologyFactory().create(filepath)
+        ont = OntologyCache.get_ontology(filepath)
         parsed_line = ont.graph.copy().node
+        parents_by_relation = OBOHelper.get_parents_by_relation(ont)
 
         go_term_list = []
         go_isas_list = []
@@ -201,12 +202,7 @@ class GOETL(ETL):
                         converted_subsets.append(subset_str)
                     subset = converted_subsets
 
-            all_parents = ont.parents(key)
-            all_parents.append(key)
-
-            # Improves performance when traversing relations
-            all_parents_subont = ont.subontology(all_parents)
-            isas_without_names = all_parents_subont.parents(key, relations=['subClassOf'])
+            isas_without_names = parents_by_relation['subClassOf'].get(key, [])
             for item in isas_without_names:
                 dictionary = {
                     "primary_id": key,
@@ -214,7 +210,7 @@ class GOETL(ETL):
                 }
                 go_isas_list.append(dictionary)
 
-            partofs_without_names = all_parents_subont.parents(key, relations=['BFO:0000050'])
+            partofs_without_names = parents_by_relation['BFO:0000050'].get(key, [])
             for item in partofs_without_names:
                 dictionary = {
                     "primary_id": key,
@@ -222,7 +218,7 @@ class GOETL(ETL):
                 }
                 go_partofs_list.append(dictionary)
 
-            regulates = all_parents_subont.parents(key, relations=['RO:0002211'])
+            regulates = parents_by_relation['RO:0002211'].get(key, [])
 
             for item in regulates:
                 dictionary = {
@@ -231,7 +227,7 @@ class GOETL(ETL):
                 }
                 go_regulates_list.append(dictionary)
 
-            negatively_regulates = all_parents_subont.parents(key, relations=['RO:0002212'])
+            negatively_regulates = parents_by_relation['RO:0002212'].get(key, [])
             for item in negatively_regulates:
                 dictionary = {
                     "primary_id": key,
@@ -239,7 +235,7 @@ class GOETL(ETL):
                 }
                 go_negatively_regulates_list.append(dictionary)
 
-            positively_regulates = all_parents_subont.parents(key, relations=['RO:0002213'])
+            positively_regulates = parents_by_relation['RO:0002213'].get(key, [])
             for item in positively_regulates:
                 dictionary = {
                     "primary_id": key,
@@ -261,6 +257,9 @@ class GOETL(ETL):
             go_term_list.append(dict_to_append)
 
             if counter == batch_size:
+                IdentifierRegistry.add('GOTerm', [term['oid'] for term in go_term_list])
+                ClosureHelper.add_edges('GOTerm', [(edge['primary_id'], edge['primary_id2'])
+                                                   for edge in go_isas_list + go_partofs_list])
                 yield [go_term_list,
                        go_isas_list,
                        go_partofs_list,
@@ -281,6 +280,9 @@ class GOETL(ETL):
                 counter = 0
 
         if counter > 0:
+            IdentifierRegistry.add('GOTerm', [term['oid'] for term in go_term_list])
+            ClosureHelper.add_edges('GOTerm', [(edge['primary_id'], edge['primary_id2'])
+                                               for edge in go_isas_list + go_partofs_list])
             yield [go_term_list,
                    go_isas_list,
                    go_partofs_list,
@@ -4,3 +4,11 @@ from .assembly_sequence_helper import AssemblySequenceHelper
 from .obo_helper import OBOHelper
 from .resource_descriptor_helper_2 import ResourceDescriptorHelper2
 from .text_processing_helper import TextProcessingHelper
+from .query_profile_helper import QueryProfileHelper
+from .neo4j_schema_helper import Neo4jSchemaHelper
+from .identifier_registry import IdentifierRegistry, IdentifierSet
+from .cross_reference_index import CrossReferenceIndex
+from .closure_helper import ClosureHelper
+from .genomic_interval_index import GenomicIntervalIndex, NestedContainmentList
+from .ontology_cache import OntologyCache
+from .delta_load_helper import DeltaLoadHelper
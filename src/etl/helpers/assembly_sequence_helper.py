@@ -1,44 +1,102 @@
 """Assembly Sequence Helper"""
 
+import fcntl
 import logging
+import mmap
 import os
 import sys
-import time
 
+import numpy as np
 from pyfaidx import Fasta
 
 
 class AssemblySequenceHelper():
-    """Assembly Sequence Helper"""
+    """Assembly Sequence Helper
+
+    The .fai index of each assembly FASTA file is built once, by prepare,
+    before the ETL processes are forked. The processes inherit the parsed
+    index and a read only memory map of the file, and read the sequences
+    straight from it.
+    """
 
     logger = logging.getLogger(__name__)
 
-    def __init__(self, assembly, data_manager):
+    # Regions of a batch less than max_gap apart are read as one window,
+    # of at most max_window bases.
+    max_gap = 1 << 16
+    max_window = 1 << 22
+
+    # FASTA sub type -> (filepath, index, memory map), filled by prepare.
+    assemblies = {}
+
+    @staticmethod
+    def get_sub_type(assembly):
+        """Get the FASTA sub type of an assembly"""
+
         sub_type = assembly.replace('.', '').replace('_', '')
         if sub_type.startswith('R6'):
             sub_type = 'R627'
-        fasta_config = data_manager.get_config('FASTA')
+        return sub_type
+
+    @classmethod
+    def prepare(cls, fasta_config):
+        """Index and memory map the FASTA file of each assembly.
+
+        The index is built under a lock on the FASTA file, so a loader running
+        at the same time never reads an index that is still being written.
+        """
 
         for sub_type_config in fasta_config.get_sub_type_objects():
-            if not sub_type == sub_type_config.get_sub_data_type():
-                self.logger.info(sub_type_config.get_sub_data_type())
-                continue
             filepath = sub_type_config.get_filepath()
-            self.logger.info(filepath)
-            break
+            if filepath is None:
+                cls.logger.warning("Can't find Assembly filepath for %s", sub_type_config.get_sub_data_type())
+                continue
 
-        if filepath is None:
-            self.logger.warning("Can't find Assembly filepath for %s", assembly)
-            sys.exit(3)
+            with open(filepath + ".lock", 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                index = cls.build_index(filepath)
+
+            with open(filepath, 'rb') as fasta_file:
+                fasta_map = mmap.mmap(fasta_file.fileno(), 0, access=mmap.ACCESS_READ)
+            cls.assemblies[sub_type_config.get_sub_data_type()] = (filepath, index, fasta_map)
+            cls.logger.info("Indexed %s sequences of %s", len(index), filepath)
+
+    @classmethod
+    def build_index(cls, filepath):
+        """Get the index of a FASTA file, name -> (length, offset, bases per line, bytes per line).
+
+        pyfaidx builds the .fai file if it is missing or older than the FASTA file.
+        """
 
-        self.assembly = assembly
-        self.filepath = filepath
         fasta_data = Fasta(filepath)
-        while len(fasta_data.keys()) == 0:
-            time.sleep(6)
+        if len(fasta_data.keys()) == 0:
+            fasta_data.close()
             os.remove(filepath + ".fai")
             fasta_data = Fasta(filepath)
-        self.fasta_data = fasta_data
+        fasta_data.close()
+
+        index = {}
+        with open(filepath + ".fai", 'r') as index_file:
+            for line in index_file:
+                name, length, offset, line_bases, line_width = line.rstrip('\n').split('\t')[:5]
+                index[name] = (int(length), int(offset), int(line_bases), int(line_width))
+        return index
+
+    def __init__(self, assembly):
+        sub_type = self.get_sub_type(assembly)
+        if sub_type not in self.assemblies:
+            self.logger.warning("Can't find Assembly filepath for %s", assembly)
+            sys.exit(3)
+
+        self.assembly = assembly
+        self.filepath, self.index, self.fasta_map = self.assemblies[sub_type]
+
+        # Where each chromosome starts when they are laid end to end.
+        self.chromosome_offsets = {}
+        chromosome_offset = 0
+        for chromosome, (length, _, _, _) in self.index.items():
+            self.chromosome_offsets[chromosome] = chromosome_offset
+            chromosome_offset += length
 
     def get_assembly(self):
         """Assembly"""
@@ -53,20 +111,69 @@ class AssemblySequenceHelper():
     def get_chromosomes(self):
         """Chromosomes"""
 
-        return self.fasta_data.keys()
+        return self.index.keys()
 
-    def get_sequence(self, chromosome, first, second):
-        """Sequence"""
+    def _read(self, chromosome, start, end):
+        """Read the 0-based, end exclusive, bases start to end of a chromosome"""
 
-        if first > second:
-            start = second
-            end = first
-        else:
-            start = first
-            end = second
+        length, offset, line_bases, line_width = self.index[chromosome]
+        start = min(max(start, 0), length)
+        end = min(max(end, start), length)
+        if start == end:
+            return ''
 
-        start = start - 1
-        if chromosome in self.fasta_data:
-            return self.fasta_data[chromosome][start:end].seq
+        first_byte = offset + (start // line_bases) * line_width + start % line_bases
+        last_byte = offset + ((end - 1) // line_bases) * line_width + (end - 1) % line_bases
+        return self.fasta_map[first_byte:last_byte + 1].translate(None, b'\r\n').decode('ascii')
+
+    def get_sequence(self, chromosome, first, second):
+        """Sequence"""
 
-        self.logger.warning("Chromosome %s not in assembly %s", chromosome, self.assembly)
+        return self.get_sequences([chromosome], [first], [second])[0]
+
+    def get_sequences(self, chromosomes, firsts, seconds):
+        """Get the sequences of a batch of regions, given as columns, in the order given.
+
+        Positions are 1-based and inclusive, in either order. The regions are
+        sorted by position and those close together are served from a single
+        read of the file. None for a chromosome not in the assembly.
+        """
+
+        sequences = [None] * len(chromosomes)
+        for chromosome in set(chromosomes) - self.index.keys():
+            self.logger.warning("Chromosome %s not in assembly %s", chromosome, self.assembly)
+
+        rows = np.array([row for row, chromosome in enumerate(chromosomes) if chromosome in self.index],
+                        dtype=np.int64)
+        if len(rows) == 0:
+            return sequences
+
+        chromosome_names = [chromosomes[row] for row in rows.tolist()]
+        offsets = np.array([self.chromosome_offsets[chromosome] for chromosome in chromosome_names], dtype=np.int64)
+        lengths = np.array([self.index[chromosome][0] for chromosome in chromosome_names], dtype=np.int64)
+        firsts = np.asarray(firsts, dtype=np.int64)[rows]
+        seconds = np.asarray(seconds, dtype=np.int64)[rows]
+        starts = np.clip(np.minimum(firsts, seconds) - 1, 0, lengths)
+        ends = np.clip(np.maximum(firsts, seconds), starts, lengths)
+
+        # One sort on the end to end position orders by chromosome and position.
+        order = np.argsort(offsets + starts, kind='stable')
+        rows, offsets, starts, ends = rows[order], offsets[order], starts[order], ends[order]
+
+        reach = np.maximum.accumulate(offsets + ends)
+        new_window = np.ones(len(rows), dtype=bool)
+        new_window[1:] = ((offsets[1:] != offsets[:-1])
+                          | (offsets[1:] + starts[1:] > reach[:-1] + self.max_gap)
+                          | (starts[1:] // self.max_window != starts[:-1] // self.max_window))
+        window_bounds = np.flatnonzero(new_window).tolist() + [len(rows)]
+
+        for window_first, window_last in zip(window_bounds, window_bounds[1:]):
+            window_start = int(starts[window_first])
+            window = self._read(chromosome_names[order[window_first]], window_start,
+                                int(ends[window_first:window_last].max()))
+            for row, start, end in zip(rows[window_first:window_last].tolist(),
+                                       (starts[window_first:window_last] - window_start).tolist(),
+                                       (ends[window_first:window_last] - window_start).tolist()):
+                sequences[row] = window[start:end]
+
+        return sequences
@@ -0,0 +1,169 @@
+"""Closure Helper"""
+
+import hashlib
+import json
+import logging
+import os
+
+from process_files import ProcessFiles
+from .identifier_registry import IdentifierRegistry
+
+
+class ClosureHelper():
+    """Computes the IS_A / PART_OF transitive closure of an ontology in Python.
+
+    The ontology ETLs add the is_a and part_of edges they load, per term label,
+    to the process files of the label. The closure is then computed from
+    those edges instead of a variable length traversal in Neo4j.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    edge_dir = 'tmp/ontology_edges'
+    # Kept between runs: the fingerprint and closure pairs last loaded per label.
+    state_dir = 'tmp/closure_state'
+
+    @classmethod
+    def reset(cls):
+        """Remove the edges of a previous run"""
+
+        ProcessFiles.remove(cls.edge_dir)
+
+    @classmethod
+    def add_edges(cls, label, edges):
+        """Add a batch of (child id, parent id) is_a / part_of edges for a term label"""
+
+        ProcessFiles.append(os.path.join(cls.edge_dir, label),
+                            ["%s\t%s" % (child, parent) for child, parent in edges if child and parent])
+
+    @classmethod
+    def get_edges(cls, label):
+        """Get the set of edges loaded for a term label, or None if the terms were not loaded this run.
+
+        Edges to or from a term that was not loaded are dropped, as they never
+        made it into the graph either.
+        """
+
+        term_ids = IdentifierRegistry.get_identifiers(label)
+        if term_ids is None:
+            return None
+
+        edges = set()
+        for line in ProcessFiles.read_lines(os.path.join(cls.edge_dir, label)):
+            child, parent = line.split('\t')
+            if child in term_ids and parent in term_ids:
+                edges.add((child, parent))
+
+        return edges
+
+    @staticmethod
+    def get_fingerprint(edges):
+        """Fingerprint of an edge set, independent of the order edges were added in"""
+
+        digest = hashlib.sha256()
+        for child, parent in sorted(edges):
+            digest.update(("%s\t%s\n" % (child, parent)).encode('utf-8'))
+        return digest.hexdigest()
+
+    @classmethod
+    def load_state(cls, label):
+        """Get the fingerprint and pair count last loaded for a label, or None"""
+
+        state_file = os.path.join(cls.state_dir, label + '.json')
+        if not os.path.isfile(state_file):
+            return None
+
+        with open(state_file, 'r') as json_file:
+            return json.load(json_file)
+
+    @classmethod
+    def load_pairs(cls, label):
+        """Get the closure pairs last loaded for a label"""
+
+        pairs = set()
+        with open(os.path.join(cls.state_dir, label + '.tsv'), 'r', encoding='utf-8') as pair_file:
+            for line in pair_file:
+                pairs.add(tuple(line.rstrip('\n').split('\t')))
+        return pairs
+
+    @classmethod
+    def record_closure(cls, label, fingerprint, pairs):
+        """Pass closure pairs through, saving them as the state of the label once all are seen.
+
+        pair_count excludes term to itself pairs, which the ontology ETLs create too.
+        """
+
+        os.makedirs(cls.state_dir, exist_ok=True)
+        pair_file_name = os.path.join(cls.state_dir, label + '.tsv')
+        pair_count = 0
+        with open(pair_file_name + '.tmp', 'w', encoding='utf-8') as pair_file:
+            for child, parent in pairs:
+                pair_file.write("%s\t%s\n" % (child, parent))
+                if child != parent:
+                    pair_count += 1
+                yield child, parent
+
+        os.replace(pair_file_name + '.tmp', pair_file_name)
+        with open(os.path.join(cls.state_dir, label + '.json'), 'w') as json_file:
+            json.dump({'fingerprint': fingerprint, 'pair_count': pair_count}, json_file)
+
+    @staticmethod
+    def compute_closure(edges):
+        """Yield (term, ancestor) for every ancestor reachable over one or more edges.
+
+        Terms are visited in topological order, parents first, so each term's
+        ancestors are the union of its parents and their already computed
+        ancestors. A term's ancestors are dropped once all its children are done.
+        Terms on a cycle are resolved by a plain graph walk instead.
+        """
+
+        parents = {}
+        children = {}
+        for child, parent in edges:
+            parents.setdefault(child, set()).add(parent)
+            children.setdefault(parent, set()).add(child)
+            parents.setdefault(parent, set())
+            children.setdefault(child, set())
+
+        pending_parents = {term: len(term_parents) for term, term_parents in parents.items()}
+        pending_children = {term: len(term_children) for term, term_children in children.items()}
+        ready = [term for term, count in pending_parents.items() if count == 0]
+        ancestors = {}
+        visited = set()
+
+        while ready:
+            term = ready.pop()
+            visited.add(term)
+
+            term_ancestors = set()
+            for parent in parents[term]:
+                term_ancestors.add(parent)
+                term_ancestors.update(ancestors[parent])
+                pending_children[parent] -= 1
+                if pending_children[parent] == 0:
+                    del ancestors[parent]
+
+            for ancestor in term_ancestors:
+                yield term, ancestor
+
+            if pending_children[term]:
+                ancestors[term] = term_ancestors
+            for child in children[term]:
+                pending_parents[child] -= 1
+                if pending_parents[child] == 0:
+                    ready.append(child)
+
+        # Whatever was not visited is on, or below, a cycle.
+        for term in parents:
+            if term in visited:
+                continue
+            reached = set()
+            stack = list(parents[term])
+            while stack:
+                parent = stack.pop()
+                if parent in reached:
+                    continue
+                reached.add(parent)
+                stack.extend(parents[parent])
+            for ancestor in reached:
+                yield term, ancestor
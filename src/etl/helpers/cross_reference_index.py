@@ -0,0 +1,160 @@
+"""Cross Reference Index"""
+
+import array
+import logging
+import mmap
+import os
+import struct
+import zlib
+
+from process_files import ProcessFiles
+
+
+class CrossReferenceIndex():
+    """Reverse lookup of gene cross references, from the global id to the genes.
+
+    The BGI ETL adds the cross references of the prefixes in indexed_prefixes
+    as it loads genes, to the process files of the index. The first reader
+    packs them into a single hash bucketed file which every reader memory maps,
+    so a lookup reads one small bucket instead of querying Neo4j.
+
+    Keys are lowercased global ids, e.g. 'uniprotkb:p12345'. Each key maps to
+    one or more (gene primary key, gene local id) pairs.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    index_dir = 'tmp/xref_index'
+    index_file = 'tmp/xref_index/xref_index.bin'
+
+    # Prefixes other data sources refer to genes by.
+    indexed_prefixes = ['UniProtKB', 'ENSEMBL', 'NCBI_Gene', 'RefSeq']
+
+    header = b'AGRXREF1'
+    # Average keys per bucket.
+    bucket_size = 4
+
+    # The index opened by this process, if any.
+    _instance = None
+
+    def __init__(self, index_file):
+        self.file_handle = open(index_file, 'rb')
+        self.data = mmap.mmap(self.file_handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header_length = len(self.header)
+        bucket_count, = struct.unpack_from('<Q', self.data, header_length)
+        offsets_start = header_length + 8
+        self.offsets = array.array('Q')
+        self.offsets.frombytes(self.data[offsets_start:offsets_start + (bucket_count + 1) * 8])
+        self.bucket_count = bucket_count
+        self.data_start = offsets_start + (bucket_count + 1) * 8
+
+    @classmethod
+    def reset(cls):
+        """Remove the index of a previous run"""
+
+        ProcessFiles.remove(cls.index_dir)
+        cls._instance = None
+
+    @classmethod
+    def add(cls, cross_references, gene_local_ids):
+        """Add a batch of gene cross reference dicts (as made by ETLHelper.get_xref_dict).
+
+        gene_local_ids maps the gene primary keys (the dataId of the dicts) to their local ids.
+        """
+
+        lines = []
+        for cross_reference in cross_references:
+            if cross_reference.get('prefix') not in cls.indexed_prefixes:
+                continue
+            lines.append("%s\t%s\t%s" % (cross_reference['globalCrossRefId'].lower(),
+                                         cross_reference['dataId'],
+                                         gene_local_ids.get(cross_reference['dataId']) or ''))
+
+        ProcessFiles.append(cls.index_dir, lines)
+
+    @staticmethod
+    def _bucket(key, bucket_count):
+        # crc32 rather than hash() so every process agrees on the bucket.
+        return zlib.crc32(key) % bucket_count
+
+    @classmethod
+    def build(cls):
+        """Pack the added cross references into the index file, return False if there were none"""
+
+        part_files = ProcessFiles.get_files(cls.index_dir)
+        if not part_files:
+            return False
+
+        lines = set()
+        for part_file in part_files:
+            with open(part_file, 'rb') as tsv_file:
+                lines.update(line for line in tsv_file if line.strip())
+
+        bucket_count = max(1, len(lines) // cls.bucket_size)
+        buckets = [[] for _ in range(bucket_count)]
+        for line in lines:
+            buckets[cls._bucket(line.split(b'\t', 1)[0], bucket_count)].append(line)
+
+        offsets = array.array('Q', [0])
+        for bucket in buckets:
+            offsets.append(offsets[-1] + sum(len(line) for line in bucket))
+
+        # Written under a process specific name and renamed, so concurrent builders
+        # never expose a partial file.
+        temp_file = "%s.%s" % (cls.index_file, os.getpid())
+        with open(temp_file, 'wb') as index_file:
+            index_file.write(cls.header)
+            index_file.write(struct.pack('<Q', bucket_count))
+            index_file.write(offsets.tobytes())
+            for bucket in buckets:
+                index_file.write(b''.join(bucket))
+        os.replace(temp_file, cls.index_file)
+
+        cls.logger.info("Built cross reference index of %s entries.", len(lines))
+        return True
+
+    @classmethod
+    def get_index(cls):
+        """Get the index for this process, or None if no cross references were added this run"""
+
+        if cls._instance is None:
+            if not os.path.isfile(cls.index_file) and not cls.build():
+                return None
+            cls._instance = cls(cls.index_file)
+
+        return cls._instance
+
+    def get_gene_records(self, global_id):
+        """Get the (gene primary key, gene local id) pairs of a global cross reference id"""
+
+        key = global_id.lower().encode('utf-8')
+        bucket = self._bucket(key, self.bucket_count)
+        start = self.data_start + self.offsets[bucket]
+        end = self.data_start + self.offsets[bucket + 1]
+
+        records = []
+        prefix = key + b'\t'
+        for line in self.data[start:end].split(b'\n'):
+            if line.startswith(prefix):
+                _, gene_id, local_id = line.decode('utf-8').split('\t')
+                records.append((gene_id, local_id))
+
+        return records
+
+    def get_genes(self, global_id):
+        """Get the gene primary keys of a global cross reference id"""
+
+        return [gene_id for gene_id, _ in self.get_gene_records(global_id)]
+
+    def get(self, global_id, default=None):
+        """Dict style lookup of the gene primary keys of a global cross reference id"""
+
+        return self.get_genes(global_id) or default
+
+    def items(self):
+        """Iterate over all (key, gene primary key, gene local id) entries"""
+
+        for line in self.data[self.data_start:].split(b'\n'):
+            if line:
+                yield tuple(line.decode('utf-8').split('\t'))
@@ -0,0 +1,244 @@
+"""Delta Load Helper"""
+
+import csv
+import glob
+import hashlib
+import logging
+import os
+import shutil
+
+
+class DeltaLoadHelper():
+    """Release to release delta loads of the sub types (MODs) of a data type.
+
+    The CSV files of each sub type loaded are kept. In the next delta load its
+    new CSV files are compared with the kept ones, and only the rows that were
+    added or changed are loaded, after queries that delete what was removed.
+    The generated CSV files are compared rather than the input files, as what
+    a sub type generates also depends on what other data types loaded.
+
+    Rows are compared per group, as defined by the delta_groups of the ETL.
+    A group is a dict of
+        files:  CSV file names without the data provider, each with the columns
+                holding the key of its rows, e.g. {'gene_data': ['primaryId'],
+                'gene_synonyms': ['primary_id']}. The key identifies a node the
+                rows of all the files hang off.
+        ignore: columns not compared, e.g. ones that change with every release.
+        drop:   optional queries per file name of the group, run with the old
+                rows of the file for the keys whose rows changed, before the
+                update query. To drop what those rows loaded when other data
+                types load relationships of the same type on the node.
+        update: optional query for the keys whose rows changed, with the new
+                (first) row of each. Run before the rows of those keys are
+                loaded again with the normal queries, e.g. to set properties
+                the normal queries only set on create, and drop relationships
+                the rows are about to merge again.
+        delete: optional query for the keys that are gone, with the old (first)
+                row of each.
+    Each row of a file that is in no group is its own key, so new rows are
+    loaded and removed rows are only counted.
+
+    The normal queries must be idempotent (MERGE rather than CREATE), rows of
+    unchanged keys may already be in the graph. Only the ETLs with delta groups
+    run in a delta load.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    state_dir = 'tmp/delta_state'
+    # Snapshots of this load, moved to state_dir once the load finished.
+    pending_dir = 'tmp/delta_state/pending'
+
+    @classmethod
+    def reset(cls):
+        """Remove the snapshots of a previous load that did not finish"""
+
+        if os.path.exists(cls.pending_dir):
+            shutil.rmtree(cls.pending_dir)
+
+    @staticmethod
+    def _read_rows(file_name):
+        """Yield the rows of a CSV file, if it exists"""
+
+        if not os.path.isfile(file_name):
+            return
+
+        with open(file_name, 'r', encoding='utf-8', newline='') as csv_file:
+            yield from csv.DictReader(csv_file)
+
+    @staticmethod
+    def _get_key(row, key_columns):
+        if key_columns is None:
+            return tuple(sorted(row.items()))
+        return tuple(row[column] for column in key_columns)
+
+    @classmethod
+    def _get_digests(cls, files, ignore):
+        """Get the digest of each key of a group, the sum of the digests of its rows.
+
+        files is a list of (CSV file, key columns). A sum, so the order of the rows does not matter.
+        """
+
+        digests = {}
+        for file_name, key_columns in files:
+            name = os.path.basename(file_name)
+            for row in cls._read_rows(file_name):
+                content = '\x1f'.join([name] + ["%s=%s" % (column, value)
+                                                for column, value in sorted(row.items())
+                                                if column not in ignore])
+                digest = int.from_bytes(hashlib.blake2b(content.encode('utf-8'), digest_size=8).digest(), 'big')
+                key = cls._get_key(row, key_columns)
+                digests[key] = (digests.get(key, 0) + digest) & 0xFFFFFFFFFFFFFFFF
+
+        return digests
+
+    @classmethod
+    def _write_first_rows(cls, files, keys, file_name):
+        """Write the first row of each key to a CSV file, return the number of rows written"""
+
+        rows = {}
+        fieldnames = []
+        for group_file_name, key_columns in files:
+            for row in cls._read_rows(group_file_name):
+                key = cls._get_key(row, key_columns)
+                if key in keys and key not in rows:
+                    rows[key] = row
+                    fieldnames.extend(column for column in row if column not in fieldnames)
+
+        if rows:
+            with open(file_name, 'w', encoding='utf-8', newline='') as csv_file:
+                csv_writer = csv.DictWriter(csv_file, fieldnames=fieldnames, restval='',
+                                            quoting=csv.QUOTE_NONNUMERIC)
+                csv_writer.writeheader()
+                csv_writer.writerows(rows.values())
+
+        return len(rows)
+
+    @classmethod
+    def _write_key_rows(cls, source_file_name, key_columns, keys, file_name):
+        """Write the rows of a CSV file that have one of the keys, return the number of rows written"""
+
+        row_count = 0
+        with open(file_name, 'w', encoding='utf-8', newline='') as csv_file:
+            csv_writer = None
+            for row in cls._read_rows(source_file_name):
+                if cls._get_key(row, key_columns) not in keys:
+                    continue
+                if csv_writer is None:
+                    csv_writer = csv.DictWriter(csv_file, fieldnames=list(row), quoting=csv.QUOTE_NONNUMERIC)
+                    csv_writer.writeheader()
+                csv_writer.writerow(row)
+                row_count += 1
+
+        return row_count
+
+    @classmethod
+    def get_delta_queries(cls, sub_type, query_and_file_list, delta_groups, commit_size):
+        """Get the queries that load what changed in a sub type since the last delta load.
+
+        query_and_file_list are the normal [query, CSV file] of the sub type,
+        with the CSV files already written. The CSV files are reduced to the
+        rows to load, and the drop, update and delete queries of the groups are added
+        in front of them.
+        """
+
+        data_type = sub_type.data_type
+        data_provider = sub_type.get_data_provider()
+
+        state_dir = os.path.join(cls.state_dir, data_type, data_provider)
+        pending_dir = os.path.join(cls.pending_dir, data_type, data_provider)
+        if os.path.exists(pending_dir):
+            shutil.rmtree(pending_dir)
+        os.makedirs(pending_dir)
+
+        # Snapshots of the full CSV files, the baseline of the next delta load.
+        for _, file_name in query_and_file_list:
+            shutil.copyfile(os.path.join('tmp', file_name), os.path.join(pending_dir, file_name))
+
+        file_names = [file_name for _, file_name in query_and_file_list]
+        groups = []
+        grouped_file_names = set()
+        for delta_group in delta_groups:
+            group_files = [("%s_%s.csv" % (stem, data_provider), key_columns)
+                           for stem, key_columns in delta_group['files'].items()]
+            group_files = [(file_name, key_columns) for file_name, key_columns in group_files
+                           if file_name in file_names]
+            if group_files:
+                groups.append((delta_group, group_files))
+                grouped_file_names.update(file_name for file_name, _ in group_files)
+        groups.extend(({}, [(file_name, None)]) for file_name in file_names if file_name not in grouped_file_names)
+
+        delete_queries = []
+        update_queries = []
+        load_keys = {}
+        for delta_group, group_files in groups:
+            ignore = set(delta_group.get('ignore', []))
+            old_files = [(os.path.join(state_dir, file_name), key_columns) for file_name, key_columns in group_files]
+            new_files = [(os.path.join(pending_dir, file_name), key_columns) for file_name, key_columns in group_files]
+
+            old_digests = cls._get_digests(old_files, ignore)
+            new_digests = cls._get_digests(new_files, ignore)
+            removed_keys = old_digests.keys() - new_digests.keys()
+            changed_keys = {key for key, digest in new_digests.items()
+                            if key in old_digests and old_digests[key] != digest}
+            added_keys = new_digests.keys() - old_digests.keys()
+
+            for file_name, key_columns in group_files:
+                stem = file_name[:-len("_%s.csv" % data_provider)]
+                if stem in delta_group.get('drop', {}) and changed_keys:
+                    drop_file_name = file_name.replace('.csv', '_dropped.csv')
+                    if cls._write_key_rows(os.path.join(state_dir, file_name), key_columns, changed_keys,
+                                           os.path.join('tmp', drop_file_name)):
+                        update_queries.append([delta_group['drop'][stem] % (commit_size, drop_file_name),
+                                               drop_file_name])
+
+            first_file_name = group_files[0][0]
+            if 'delete' in delta_group and removed_keys:
+                delete_file_name = first_file_name.replace('.csv', '_deleted.csv')
+                cls._write_first_rows(old_files, removed_keys, os.path.join('tmp', delete_file_name))
+                delete_queries.append([delta_group['delete'] % (commit_size, delete_file_name), delete_file_name])
+            if 'update' in delta_group and changed_keys:
+                update_file_name = first_file_name.replace('.csv', '_updated.csv')
+                cls._write_first_rows(new_files, changed_keys, os.path.join('tmp', update_file_name))
+                update_queries.append([delta_group['update'] % (commit_size, update_file_name), update_file_name])
+
+            for file_name, key_columns in group_files:
+                load_keys[file_name] = (key_columns, added_keys | changed_keys)
+
+            cls.logger.info("%s %s: %s added, %s changed and %s removed keys in %s%s.",
+                            data_type, data_provider,
+                            len(added_keys), len(changed_keys), len(removed_keys),
+                            ', '.join(file_name for file_name, _ in group_files),
+                            '' if 'delete' in delta_group or not removed_keys else ' (removed rows are kept)')
+
+        load_queries = []
+        for query, file_name in query_and_file_list:
+            key_columns, keys = load_keys[file_name]
+            if cls._write_key_rows(os.path.join(pending_dir, file_name), key_columns, keys,
+                                   os.path.join('tmp', file_name)):
+                load_queries.append([query, file_name])
+
+        return delete_queries + update_queries + load_queries
+
+    @classmethod
+    def commit(cls):
+        """Make the CSV files of this load the baseline of the next delta load.
+
+        Called when the load finished, so after a load that failed part way the
+        next one compares against the last one that finished.
+        """
+
+        if not os.path.isdir(cls.pending_dir):
+            return
+
+        for pending_dir in sorted(glob.glob(os.path.join(cls.pending_dir, '*', '*'))):
+            data_type = os.path.basename(os.path.dirname(pending_dir))
+            data_provider = os.path.basename(pending_dir)
+            state_dir = os.path.join(cls.state_dir, data_type, data_provider)
+            if os.path.exists(state_dir):
+                shutil.rmtree(state_dir)
+            os.makedirs(os.path.dirname(state_dir), exist_ok=True)
+            os.replace(pending_dir, state_dir)
+
+        shutil.rmtree(cls.pending_dir)
+        cls.logger.info("Saved the delta load baseline to %s", cls.state_dir)
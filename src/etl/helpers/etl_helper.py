@@ -5,12 +5,28 @@ import logging
 from .resource_descriptor_helper_2 import ResourceDescriptorHelper2
 
 
+class LazyResourceDescriptorHelper():
+    """Class attribute that creates the shared ResourceDescriptorHelper2 on first use.
+
+    So importing etl (and creating ETLHelpers) does not download or parse the
+    resource descriptor and species files. The loader creates it before forking
+    the ETLs, so they inherit the loaded lookups.
+    """
+
+    def __get__(self, instance, owner):
+        if owner._rdh2 is None:
+            owner._rdh2 = ResourceDescriptorHelper2()
+        return owner._rdh2
+
+
 class ETLHelper():
     """ETL Helper."""
 
     logger = logging.getLogger(__name__)
-    rdh2 = ResourceDescriptorHelper2()
-    rdh2.get_data()
+    _rdh2 = None
+    rdh2 = LazyResourceDescriptorHelper()
+
+    uuid_namespace = uuid.uuid5(uuid.NAMESPACE_URL, 'https://www.alliancegenome.org')
 
     @staticmethod
     def get_cypher_xref_text():
@@ -110,6 +126,16 @@ class ETLHelper():
             self.logger.critical("No reference page for %s", publication_mod_id)
         return url
 
+    @staticmethod
+    def get_uuid(*natural_key):
+        """Get the deterministic UUID (version 5) of a natural key.
+
+        The first part names the kind of node, e.g. 'CrossReference', so equal
+        keys of different kinds get different ids. The same input gives the same
+        id on every run.
+        """
+        return str(uuid.uuid5(ETLHelper.uuid_namespace, '\x1f'.join(str(part) for part in natural_key)))
+
     @staticmethod
     def get_xref_dict(local_id, prefix, cross_ref_type, page,
                       display_name, cross_ref_complete_url, primary_id):
@@ -122,7 +148,7 @@ class ETLHelper():
             "crossRefCompleteUrl": cross_ref_complete_url,
             "prefix": prefix,
             "crossRefType": cross_ref_type,
-            "uuid":  str(uuid.uuid4()),
+            "uuid": ETLHelper.get_uuid('CrossReference', primary_id, cross_ref_type),
             "page": page,
             "primaryKey": primary_id,
             "displayName": display_name}
@@ -0,0 +1,135 @@
+"""Genomic Interval Index"""
+
+import bisect
+import logging
+import os
+
+from process_files import ProcessFiles
+
+
+class NestedContainmentList():
+    """Intervals of one chromosome, indexed for overlap queries.
+
+    The intervals are sorted by start, and each goes into the sublist of the
+    last earlier interval that contains it. No interval in a list contains
+    another, so the ends of a list are sorted as well, and its first overlap
+    is a binary search away.
+    """
+
+    def __init__(self, intervals):
+        intervals = sorted(intervals, key=lambda interval: (interval[0], -interval[1]))
+        self.identifiers = [identifier for _, _, identifier in intervals]
+
+        # Position of the containing interval (-1 for none) -> (starts, ends, positions).
+        self.sublists = {}
+        containing = []
+        for position, (start, end, _) in enumerate(intervals):
+            while containing and intervals[containing[-1]][1] < end:
+                containing.pop()
+            starts, ends, positions = self.sublists.setdefault(containing[-1] if containing else -1, ([], [], []))
+            starts.append(start)
+            ends.append(end)
+            positions.append(position)
+            containing.append(position)
+
+    def get_overlaps(self, start, end):
+        """Yield the identifiers of the intervals overlapping start to end, both inclusive"""
+
+        parents = [-1] if self.sublists else []
+        while parents:
+            starts, ends, positions = self.sublists[parents.pop()]
+            for index in range(bisect.bisect_left(ends, start), len(positions)):
+                if starts[index] > end:
+                    break
+                position = positions[index]
+                yield self.identifiers[position]
+                if position in self.sublists:
+                    parents.append(position)
+
+
+class GenomicIntervalIndex():
+    """Genomic locations of the genes, transcripts and variants loaded, shared between processes.
+
+    BGIETL, TranscriptETL and VariationETL add the locations they generate, per
+    label, to the process files of the label. Overlaps between two labels
+    are then computed in bulk in the loader, from nested containment lists per
+    assembly and chromosome, and loaded as relationships.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    interval_dir = 'tmp/genomic_intervals'
+
+    # Size of a GenomicLocationBin, in bases.
+    bin_size = 100000
+
+    @classmethod
+    def reset(cls):
+        """Remove the locations of a previous run"""
+
+        ProcessFiles.remove(cls.interval_dir)
+
+    @staticmethod
+    def get_chromosome(chromosome):
+        """Chromosome name without a 'chr' prefix, as the Chromosome nodes are keyed"""
+
+        if chromosome.startswith("chr"):
+            return chromosome[3:]
+        return chromosome
+
+    @classmethod
+    def add(cls, label, locations):
+        """Add a batch of (identifier, assembly, chromosome, start, end) locations for a label.
+
+        Locations without a chromosome, start or end are left out.
+        """
+
+        lines = []
+        for identifier, assembly, chromosome, start, end in locations:
+            if not identifier or not chromosome or start in (None, '') or end in (None, ''):
+                continue
+            start, end = sorted((int(start), int(end)))
+            lines.append("%s\t%s\t%s\t%s\t%s" % (identifier, assembly, cls.get_chromosome(chromosome), start, end))
+
+        ProcessFiles.append(os.path.join(cls.interval_dir, label), lines)
+
+    @classmethod
+    def get_locations(cls, label):
+        """Yield the (identifier, assembly, chromosome, start, end) locations added for a label"""
+
+        for line in ProcessFiles.read_lines(os.path.join(cls.interval_dir, label)):
+            identifier, assembly, chromosome, start, end = line.split('\t')
+            yield identifier, assembly, chromosome, int(start), int(end)
+
+    @classmethod
+    def get_index(cls, label):
+        """Get a nested containment list of the locations of a label, per (assembly, chromosome)"""
+
+        intervals = {}
+        for identifier, assembly, chromosome, start, end in cls.get_locations(label):
+            intervals.setdefault((assembly, chromosome), []).append((start, end, identifier))
+
+        return {key: NestedContainmentList(chromosome_intervals)
+                for key, chromosome_intervals in intervals.items()}
+
+    @classmethod
+    def get_overlaps(cls, label, other_label):
+        """Yield each (identifier, other identifier) pair whose locations overlap, once.
+
+        Only locations on the same assembly and chromosome overlap.
+        """
+
+        index = cls.get_index(other_label)
+        for identifier, assembly, chromosome, start, end in cls.get_locations(label):
+            chromosome_index = index.get((assembly, chromosome))
+            if chromosome_index is None:
+                continue
+            for other_identifier in dict.fromkeys(chromosome_index.get_overlaps(start, end)):
+                yield identifier, other_identifier
+
+    @classmethod
+    def get_bins(cls, start, end):
+        """Get the numbers of the bins a location is in"""
+
+        start, end = sorted((int(start), int(end)))
+        return range(start // cls.bin_size, end // cls.bin_size + 1)
@@ -0,0 +1,97 @@
+"""Identifier Registry"""
+
+import array
+import logging
+import os
+
+from process_files import ProcessFiles
+
+
+class IdentifierSet():
+    """Sorted, read only set of identifiers packed into a single bytes blob.
+
+    Uses a fraction of the memory of a Python set of the same strings; lookups
+    are a binary search over the blob.
+    """
+
+    def __init__(self, identifiers):
+        identifiers = sorted(set(identifier.encode('utf-8') for identifier in identifiers))
+        self.blob = b''.join(identifiers)
+        self.offsets = array.array('Q', [0])
+        for identifier in identifiers:
+            self.offsets.append(self.offsets[-1] + len(identifier))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _get(self, index):
+        return self.blob[self.offsets[index]:self.offsets[index + 1]]
+
+    def __contains__(self, identifier):
+        if identifier is None:
+            return False
+
+        key = identifier.encode('utf-8')
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self._get(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low < len(self) and self._get(low) == key
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._get(index).decode('utf-8')
+
+
+class IdentifierRegistry():
+    """Primary keys of the nodes loaded so far, per label, shared between processes.
+
+    The ETLs that create Genes, Alleles, AGMs, Constructs and ontology terms add
+    their identifiers here as they generate them, to the process files of the
+    label. Later ETLs use the registry to drop rows that reference nodes that
+    were never loaded, and to resolve ids, without querying Neo4j.
+
+    A label nothing was registered for (e.g. a partial load) returns None from
+    get_identifiers, and callers must then not filter on it.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    registry_dir = 'tmp/identifiers'
+
+    # Identifier sets already read by this process, by label.
+    _identifier_sets = {}
+
+    @classmethod
+    def reset(cls):
+        """Remove the identifiers of a previous run"""
+
+        ProcessFiles.remove(cls.registry_dir)
+        cls._identifier_sets = {}
+
+    @classmethod
+    def add(cls, label, identifiers):
+        """Register a batch of identifiers for a label"""
+
+        ProcessFiles.append(os.path.join(cls.registry_dir, label),
+                            [identifier for identifier in identifiers if identifier], '.txt')
+
+    @classmethod
+    def get_identifiers(cls, label):
+        """Get the IdentifierSet of a label, or None if nothing was registered for it"""
+
+        if label in cls._identifier_sets:
+            return cls._identifier_sets[label]
+
+        label_dir = os.path.join(cls.registry_dir, label)
+        if not ProcessFiles.get_files(label_dir, '.txt'):
+            return None
+
+        identifier_set = IdentifierSet(ProcessFiles.read_lines(label_dir, '.txt'))
+        cls.logger.info("Identifier registry has %s %s ids.", len(identifier_set), label)
+        cls._identifier_sets[label] = identifier_set
+
+        return identifier_set
@@ -53,107 +53,3 @@ class Neo4jHelper():
 
     #def split_into_chunks(self, data, batch_size):
     #    return (data[pos:pos + batch_size] for pos in range(0, len(data), batch_size))
-
-    @staticmethod
-    def create_indices():
-        """Create Indicies"""
-
-        uri = "bolt://" + Neo4jHelper.context_info.env["NEO4J_HOST"] \
-                + ":" + str(Neo4jHelper.context_info.env["NEO4J_PORT"])
-        driver = GraphDatabase.driver(uri,
-                                      auth=("neo4j", "neo4j"),
-                                      max_connection_pool_size=-1)
-
-        with driver.session() as session:
-            indicies = [":Gene(primaryKey)",
-                        ":Gene(modLocalId)",
-                        ":Gene(symbol)",
-                        ":Gene(gff3ID)",
-                        ":Gene(taxonId)",
-                        ":Construct(primaryKey)",
-                        ":Transcript(primaryKey)",
-                        ":TranscriptLevelConsequence(primaryKey)",
-                        ":GeneLevelConsequence(primaryKey)",
-                        ":Transcript(gff3ID)",
-                        ":GOTerm(primaryKey)",
-                        ":Genotype(primaryKey)",
-                        ":AffectedGenomicModel(primaryKey)",
-                        ":SOTerm(primaryKey)",
-                        ":SOTerm(name)",
-                        ":Ontology(primaryKey)",
-                        ":Ontology(name)",
-                        ":DOTerm(primaryKey)",
-                        ":DOTerm(oid)",
-                        ":GOTerm(oid)",
-                        ":GenomicLocation(primaryKey)",
-                        ":Assembly(primaryKey)",
-                        ":Publication(primaryKey)",
-                        ":Transgene(primaryKey)",
-                        ":DiseaseEntityJoin(primaryKey)",
-                        ":Species(primaryKey)",
-                        ":Entity(primaryKey)",
-                        ":Exon(primaryKey)",
-                        ":Synonym(primaryKey)",
-                        ":Identifier(primaryKey)",
-                        ":Association(primaryKey)",
-                        ":InteractionGeneJoin(primaryKey)",
-                        ":InteractionGeneJoin(uuid)",
-                        ":CrossReference(primaryKey)",
-                        ":CrossReference(globalCrossRefId)",
-                        ":CrossReference(localId)",
-                        ":CrossReference(crossRefType)",
-                        ":OrthologyGeneJoin(primaryKey)",
-                        ":GOTerm(isObsolete)",
-                        ":DOTerm(isObsolete)",
-                        ":UBERONTerm(isObsolete)",
-                        ":Ontology(isObsolete)",
-                        ":SecondaryId(primaryKey)",
-                        ":Chromosome(primaryKey)",
-                        ":OrthoAlgorithm(name)",
-                        ":Gene(modGlobalId)",
-                        ":Gene(localId)",
-                        ":HTPDataset(primaryKey)",
-                        ":HTPDatasetSample(primaryKey)",
-                        ":CategoryTag(primaryKey)",
-                        ":Load(primaryKey)",
-                        ":Feature(primaryKey)",
-                        ":Allele(primaryKey)",
-                        ":MITerm(primaryKey)",
-                        ":Phenotype(primaryKey)",
-                        ":PhenotypeEntityJoin(primaryKey)",
-                        ":ExpressionBioEntity(primaryKey)",
-                        ":Stage(primaryKey)",
-                        ":PublicationJoin(primaryKey)",
-                        ":PhenotypePublicationJoin(primaryKey)",
-                        ":Variant(primaryKey)",
-                        ":Variant(hgvsNomenclature)",
-                        ":SequenceTargetingReagent(primaryKey)",
-                        ":ECOTerm(primaryKey)",
-                        ":ZFATerm(primaryKey)",
-                        ":ZFSTerm(primaryKey)",
-                        ":CLTerm(primaryKey)",
-                        ":WBBTTerm(primaryKey)",
-                        ":FBCVTerm(primaryKey)",
-                        ":FBBTTerm(primaryKey)",
-                        ":MATerm(primaryKey)",
-                        ":EMAPATerm(primaryKey)",
-                        ":UBERONTerm(primaryKey)",
-                        ":PATOTerm(primaryKey)",
-                        ":APOTerm(primaryKey)",
-                        ":DPOTerm(primaryKey)",
-                        ":FYPOTerm(primaryKey)",
-                        ":WBPhenotypeTerm(primaryKey)",
-                        ":MPTerm(primaryKey)",
-                        ":HPTerm(primaryKey)",
-                        ":OBITerm(primaryKey)",
-                        ":BTOTerm(primaryKey)",
-                        ":CHEBITerm(primaryKey)",
-                        ":MMUSDVTerm(primaryKey)",
-                        ":BSPOTerm(primaryKey)",
-                        ":MMOTerm(primaryKey)",
-                        ":WBLSTerm(primaryKey)",
-                        ":BioEntityGeneExpressionJoin(primaryKey)",
-                        ":Stage(primaryKey)"]
-
-            for index in indicies:
-                session.run("CREATE INDEX ON " + index)
@@ -0,0 +1,466 @@
+"""Neo4j Schema Helper"""
+
+import json
+import logging
+import os
+import re
+import time
+
+from neo4j import GraphDatabase
+from loader_common import ContextInfo
+
+
+class Neo4jSchemaHelper():
+    """Derives, creates and reports on the indexes and constraints of the graph.
+
+    Unique constraints and lookup indexes are derived from the node patterns in
+    the ETL query templates. Indexes the loader itself does not need (e.g. ones
+    used by the API) are declared in declared_indexes, and can be deferred until
+    the data is loaded.
+    """
+
+    logger = logging.getLogger(__name__)
+    context_info = ContextInfo()
+
+    # Seconds to wait for indexes to come ONLINE before loading starts.
+    await_indexes_timeout = 3600
+    # Seconds between progress reports while deferred indexes populate.
+    index_progress_interval = 30
+
+    declared_indexes = [":Gene(primaryKey)",
+                        ":Gene(modLocalId)",
+                        ":Gene(symbol)",
+                        ":Gene(gff3ID)",
+                        ":Gene(taxonId)",
+                        ":Construct(primaryKey)",
+                        ":Transcript(primaryKey)",
+                        ":TranscriptLevelConsequence(primaryKey)",
+                        ":GeneLevelConsequence(primaryKey)",
+                        ":Transcript(gff3ID)",
+                        ":GOTerm(primaryKey)",
+                        ":Genotype(primaryKey)",
+                        ":AffectedGenomicModel(primaryKey)",
+                        ":SOTerm(primaryKey)",
+                        ":SOTerm(name)",
+                        ":Ontology(primaryKey)",
+                        ":Ontology(name)",
+                        ":DOTerm(primaryKey)",
+                        ":DOTerm(oid)",
+                        ":GOTerm(oid)",
+                        ":GenomicLocation(primaryKey)",
+                        ":Assembly(primaryKey)",
+                        ":Publication(primaryKey)",
+                        ":Transgene(primaryKey)",
+                        ":DiseaseEntityJoin(primaryKey)",
+                        ":Species(primaryKey)",
+                        ":Entity(primaryKey)",
+                        ":Exon(primaryKey)",
+                        ":Synonym(primaryKey)",
+                        ":Identifier(primaryKey)",
+                        ":Association(primaryKey)",
+                        ":InteractionGeneJoin(primaryKey)",
+                        ":InteractionGeneJoin(uuid)",
+                        ":CrossReference(primaryKey)",
+                        ":CrossReference(globalCrossRefId)",
+                        ":CrossReference(localId)",
+                        ":CrossReference(crossRefType)",
+                        ":OrthologyGeneJoin(primaryKey)",
+                        ":GOTerm(isObsolete)",
+                        ":DOTerm(isObsolete)",
+                        ":UBERONTerm(isObsolete)",
+                        ":Ontology(isObsolete)",
+                        ":SecondaryId(primaryKey)",
+                        ":Chromosome(primaryKey)",
+                        ":OrthoAlgorithm(name)",
+                        ":Gene(modGlobalId)",
+                        ":Gene(localId)",
+                        ":HTPDataset(primaryKey)",
+                        ":HTPDatasetSample(primaryKey)",
+                        ":CategoryTag(primaryKey)",
+                        ":Load(primaryKey)",
+                        ":Feature(primaryKey)",
+                        ":Allele(primaryKey)",
+                        ":MITerm(primaryKey)",
+                        ":Phenotype(primaryKey)",
+                        ":PhenotypeEntityJoin(primaryKey)",
+                        ":ExpressionBioEntity(primaryKey)",
+                        ":Stage(primaryKey)",
+                        ":PublicationJoin(primaryKey)",
+                        ":PhenotypePublicationJoin(primaryKey)",
+                        ":Variant(primaryKey)",
+                        ":Variant(hgvsNomenclature)",
+                        ":SequenceTargetingReagent(primaryKey)",
+                        ":ECOTerm(primaryKey)",
+                        ":ZFATerm(primaryKey)",
+                        ":ZFSTerm(primaryKey)",
+                        ":CLTerm(primaryKey)",
+                        ":WBBTTerm(primaryKey)",
+                        ":FBCVTerm(primaryKey)",
+                        ":FBBTTerm(primaryKey)",
+                        ":MATerm(primaryKey)",
+                        ":EMAPATerm(primaryKey)",
+                        ":UBERONTerm(primaryKey)",
+                        ":PATOTerm(primaryKey)",
+                        ":APOTerm(primaryKey)",
+                        ":DPOTerm(primaryKey)",
+                        ":FYPOTerm(primaryKey)",
+                        ":WBPhenotypeTerm(primaryKey)",
+                        ":MPTerm(primaryKey)",
+                        ":HPTerm(primaryKey)",
+                        ":OBITerm(primaryKey)",
+                        ":BTOTerm(primaryKey)",
+                        ":CHEBITerm(primaryKey)",
+                        ":MMUSDVTerm(primaryKey)",
+                        ":BSPOTerm(primaryKey)",
+                        ":MMOTerm(primaryKey)",
+                        ":WBLSTerm(primaryKey)",
+                        ":BioEntityGeneExpressionJoin(primaryKey)"]
+
+    # Labels that must never get a unique constraint even if the templates suggest one.
+    constraint_exclusions = set()
+
+    clause_pattern = re.compile(r'\b(ON\s+CREATE\s+SET|ON\s+MATCH\s+SET|OPTIONAL\s+MATCH|MATCH|MERGE|'
+                                r'CREATE|WHERE|SET|WITH|RETURN|UNWIND|LOAD\s+CSV|USING|CALL|'
+                                r'DETACH\s+DELETE|DELETE|REMOVE|FOREACH|YIELD)\b')
+    node_pattern = re.compile(r'\(\s*(\w*)\s*((?::\s*[\w%]+)+)\s*(\{[^}]*\})?\s*\)')
+    where_pattern = re.compile(r'\b(\w+)\.(\w+)\s*=\s*(?:row\.|\$)')
+    index_pattern = re.compile(r':(\w+)\(([\w, ]+)\)')
+
+    @staticmethod
+    def parse_index(index):
+        """Turn ':Label(prop1, prop2)' into (Label, (prop1, prop2))"""
+
+        match = Neo4jSchemaHelper.index_pattern.match(index)
+        return match.group(1), tuple(prop.strip() for prop in match.group(2).split(','))
+
+    @staticmethod
+    def format_index(label, props):
+        """Turn (Label, (prop1, prop2)) into ':Label(prop1, prop2)'"""
+
+        return ":%s(%s)" % (label, ', '.join(props))
+
+    @staticmethod
+    def get_query_templates(base_class):
+        """Get the *_template class attributes of every subclass of base_class"""
+
+        templates = []
+        classes = list(base_class.__subclasses__())
+        while classes:
+            etl_class = classes.pop()
+            classes.extend(etl_class.__subclasses__())
+            for name, value in vars(etl_class).items():
+                if name.endswith('template') and isinstance(value, str):
+                    templates.append(value)
+
+        return templates
+
+    @staticmethod
+    def expand_template(query, ontology_types):
+        """Expand :%sTerm style label placeholders into one query per ontology type"""
+
+        if not re.search(r':%s', query):
+            return [query]
+
+        return [re.sub(r':%s(\w*)', lambda match, ont=ont: ':' + ont + match.group(1), query)
+                for ont in ontology_types]
+
+    @classmethod
+    def parse_template(cls, query):
+        """Collect the node patterns of a query.
+
+        Returns (merges, creates, lookups):
+        merges: (labels, props) of each MERGE node pattern, props is () when unkeyed
+        creates: labels of node patterns that can create a node other than by a
+                 plain node MERGE (CREATE and MERGE of a path)
+        lookups: (label, props) looked up by property, first label only
+        """
+
+        query = re.sub(r'//[^\n]*', '', query)
+
+        merges = []
+        creates = []
+        lookups = []
+
+        positions = [(match.start(), match.group(1).split()[0]) for match in cls.clause_pattern.finditer(query)]
+        positions.append((len(query), None))
+
+        variables = {}
+        for (start, keyword), (end, _) in zip(positions, positions[1:]):
+            clause = query[start:end]
+
+            if keyword == 'WHERE':
+                for variable, prop in cls.where_pattern.findall(clause):
+                    if variable in variables:
+                        lookups.append((variables[variable], (prop,)))
+                continue
+
+            if keyword not in ('MATCH', 'OPTIONAL', 'MERGE', 'CREATE'):
+                continue
+
+            is_path = '-[' in clause or '-(' in clause or ')-' in clause
+            for variable, label_text, property_map in cls.node_pattern.findall(clause):
+                labels = tuple(label.strip() for label in label_text.split(':') if label.strip())
+                props = ()
+                if property_map:
+                    props = tuple(re.findall(r'(?:^|,)\s*(\w+)\s*:', property_map[1:-1]))
+                if variable:
+                    variables[variable] = labels[0]
+
+                if props:
+                    lookups.append((labels[0], props))
+
+                if keyword == 'CREATE' or (keyword == 'MERGE' and is_path and props):
+                    creates.append(labels)
+                elif keyword == 'MERGE':
+                    merges.append((labels, props))
+
+        return merges, creates, lookups
+
+    @classmethod
+    def derive_schema(cls, templates, ontology_types):
+        """Derive (constraints, lookup_indexes) from the query templates.
+
+        A label gets a unique primaryKey constraint when every MERGE using it has
+        the same labels, with it first, and only {primaryKey:...}, and it is never
+        created any other way. Otherwise a MERGE could create a second node with the same key.
+        """
+
+        merges = []
+        creates = []
+        lookups = set()
+        for template in templates:
+            for query in cls.expand_template(template, ontology_types):
+                query_merges, query_creates, query_lookups = cls.parse_template(query)
+                merges.extend(query_merges)
+                creates.extend(query_creates)
+                lookups.update(query_lookups)
+
+        created_labels = set(label for labels in creates for label in labels)
+
+        merge_forms = {}
+        for labels, props in merges:
+            for label in labels:
+                merge_forms.setdefault(label, set()).add((labels, props))
+
+        constraints = set()
+        for label, forms in merge_forms.items():
+            if label in created_labels or label in cls.constraint_exclusions:
+                continue
+            if len(forms) != 1:
+                continue
+            labels, props = next(iter(forms))
+            # Only the primary label of a node is constrained, not shared ones like :Identifier.
+            if labels[0] == label and props == ('primaryKey',):
+                constraints.add((label, 'primaryKey'))
+
+        return constraints, lookups
+
+    @classmethod
+    def get_ontology_types(cls, data_manager):
+        """Label prefixes used for the %sTerm placeholders in the ontology templates"""
+
+        ontology_types = set(['DO'])
+        for data_type in ('ONTOLOGY', 'Closure'):
+            config = data_manager.get_config(data_type)
+            if config is None:
+                continue
+            for sub_type in config.submission_system_data:
+                ontology_types.add('DO' if sub_type[0] == 'DOID' else sub_type[0])
+
+        return sorted(ontology_types)
+
+    @classmethod
+    def get_required_schema(cls, base_class, data_manager):
+        """Get (constraints, lookup_indexes, api_indexes).
+
+        lookup_indexes are needed by the load queries themselves, api_indexes are
+        the declared indexes no load query looks anything up by.
+        """
+
+        constraints, lookups = cls.derive_schema(cls.get_query_templates(base_class),
+                                                 cls.get_ontology_types(data_manager))
+
+        # A unique constraint brings its own index.
+        def not_constrained(index):
+            return not (len(index[1]) == 1 and (index[0], index[1][0]) in constraints)
+
+        lookup_indexes = set(index for index in lookups if not_constrained(index))
+        api_indexes = set(index for index in (cls.parse_index(index) for index in cls.declared_indexes)
+                          if not_constrained(index) and index not in lookup_indexes)
+
+        return constraints, lookup_indexes, api_indexes
+
+    @staticmethod
+    def _get_driver():
+        uri = "bolt://" + Neo4jSchemaHelper.context_info.env["NEO4J_HOST"] \
+                + ":" + str(Neo4jSchemaHelper.context_info.env["NEO4J_PORT"])
+        return GraphDatabase.driver(uri,
+                                    auth=("neo4j", "neo4j"),
+                                    max_connection_pool_size=-1)
+
+    @staticmethod
+    def get_index_states(session):
+        """Get the state and population progress of every single label index, keyed by (label, props)"""
+
+        states = {}
+        for record in session.run("CALL db.indexes()"):
+            record = dict(record)
+            labels = record.get('tokenNames') or record.get('labelsOrTypes') or []
+            if len(labels) != 1:
+                continue
+            progress = record.get('progress', record.get('populationPercent'))
+            states[(labels[0], tuple(record.get('properties') or []))] = {
+                'state': record.get('state'),
+                'progress': progress,
+                'unique': 'unique' in str(record.get('type', '')).lower()
+                          or str(record.get('uniqueness', '')).upper() == 'UNIQUE'}
+
+        return states
+
+    @classmethod
+    def get_existing_schema(cls, session):
+        """Get the (label, props) of existing indexes and the subset backing unique constraints"""
+
+        states = cls.get_index_states(session)
+        return set(states), set(index for index, state in states.items() if state['unique'])
+
+    @classmethod
+    def _create_indexes(cls, session, indexes, existing_indexes):
+        created = 0
+        for label, props in sorted(indexes):
+            if (label, props) in existing_indexes:
+                continue
+            cls.logger.debug("Creating index on %s", cls.format_index(label, props))
+            session.run("CREATE INDEX ON " + cls.format_index(label, props))
+            created += 1
+
+        return created
+
+    @classmethod
+    def create_schema(cls, base_class, data_manager, defer_api_indexes=False):
+        """Create the required constraints and indexes and wait until they are ONLINE.
+
+        With defer_api_indexes only the constraints and the indexes the load
+        queries use are created, see create_deferred_indexes. Existing constraints
+        and indexes are left alone, so this can be run against a database that
+        already has them.
+        """
+
+        constraints, lookup_indexes, api_indexes = cls.get_required_schema(base_class, data_manager)
+        indexes = lookup_indexes if defer_api_indexes else lookup_indexes | api_indexes
+
+        driver = cls._get_driver()
+        with driver.session() as session:
+            existing_indexes, existing_unique = cls.get_existing_schema(session)
+
+            for label, prop in sorted(constraints):
+                if (label, (prop,)) in existing_unique:
+                    continue
+                if (label, (prop,)) in existing_indexes:
+                    # A plain index on the same property blocks the constraint.
+                    session.run("DROP INDEX ON " + cls.format_index(label, (prop,)))
+                cls.logger.info("Creating unique constraint on %s", cls.format_index(label, (prop,)))
+                session.run("CREATE CONSTRAINT ON (n:%s) ASSERT n.%s IS UNIQUE" % (label, prop))
+
+            cls._create_indexes(session, indexes, existing_indexes)
+
+            cls.logger.info("Waiting for %s indexes and %s constraints to come online.",
+                            len(indexes), len(constraints))
+            if defer_api_indexes:
+                cls.logger.info("%s indexes only used by the API are deferred until after the load.",
+                                len(api_indexes - existing_indexes))
+            session.run("CALL db.awaitIndexes(%s)" % cls.await_indexes_timeout).consume()
+            cls.logger.info("All indexes are online.")
+
+    @classmethod
+    def create_deferred_indexes(cls, base_class, data_manager):
+        """Create the indexes only the API needs, once the data is loaded.
+
+        All the CREATE INDEX statements are issued before waiting, so Neo4j
+        populates the indexes side by side. Progress is logged until all of
+        them are ONLINE.
+        """
+
+        _, _, api_indexes = cls.get_required_schema(base_class, data_manager)
+
+        driver = cls._get_driver()
+        with driver.session() as session:
+            existing_indexes, _ = cls.get_existing_schema(session)
+            created = cls._create_indexes(session, api_indexes, existing_indexes)
+            cls.logger.info("Creating %s deferred indexes.", created)
+            cls.wait_for_indexes(session, api_indexes)
+
+    @classmethod
+    def wait_for_indexes(cls, session, indexes):
+        """Poll until the given indexes are ONLINE, logging population progress"""
+
+        start_time = time.time()
+        while True:
+            states = cls.get_index_states(session)
+            pending = sorted(index for index in indexes
+                             if states.get(index, {}).get('state') != 'ONLINE')
+            failed = [index for index in pending if states.get(index, {}).get('state') == 'FAILED']
+            for label, props in failed:
+                cls.logger.error("Index %s FAILED to populate.", cls.format_index(label, props))
+            pending = [index for index in pending if index not in failed]
+
+            if not pending:
+                break
+            if time.time() - start_time > cls.await_indexes_timeout:
+                cls.logger.error("Timed out waiting for %s indexes to come online.", len(pending))
+                break
+
+            cls.logger.info("%s of %s deferred indexes online, %s populating: %s",
+                            len(indexes) - len(pending) - len(failed),
+                            len(indexes),
+                            len(pending),
+                            ', '.join("%s %s%%" % (cls.format_index(label, props),
+                                                   states.get((label, props), {}).get('progress'))
+                                      for label, props in pending))
+            time.sleep(cls.index_progress_interval)
+
+        cls.logger.info("Deferred indexes done in %s seconds.", int(time.time() - start_time))
+
+    @classmethod
+    def get_profiled_indexes(cls, profile_report):
+        """Get the (label, props) of indexes seen in the plans of a query profile report"""
+
+        used = set()
+
+        def walk(plan):
+            if 'Index' in (plan['operator'] or '') or 'Unique' in (plan['operator'] or ''):
+                for label, props in cls.index_pattern.findall(' '.join(plan['arguments'].values())):
+                    used.add((label, tuple(prop.strip() for prop in props.split(','))))
+            for child in plan['children']:
+                walk(child)
+
+        with open(profile_report, 'r') as report_file:
+            for profile in json.load(report_file):
+                walk(profile['plan'])
+
+        return used
+
+    @classmethod
+    def report_unused_indexes(cls, base_class, data_manager, profile_report=None):
+        """Log the indexes no load query looks anything up by.
+
+        If a query profile report is given, indexes that no profiled plan used are
+        reported as well. Unused indexes may still be needed by the API.
+        """
+
+        constraints, lookup_indexes, api_indexes = cls.get_required_schema(base_class, data_manager)
+        indexes = lookup_indexes | api_indexes
+
+        unused = sorted(api_indexes)
+        cls.logger.info("%s of %s indexes are not used by any load query:", len(unused), len(indexes))
+        for label, props in unused:
+            cls.logger.info("    %s", cls.format_index(label, props))
+
+        if profile_report is not None and os.path.isfile(profile_report):
+            used = cls.get_profiled_indexes(profile_report)
+            all_indexes = indexes | set((label, (prop,)) for label, prop in constraints)
+            not_profiled = sorted(index for index in all_indexes if index not in used)
+            cls.logger.info("%s of %s indexes were not used by any profiled query plan:",
+                            len(not_profiled), len(all_indexes))
+            for label, props in not_profiled:
+                cls.logger.info("    %s", cls.format_index(label, props))
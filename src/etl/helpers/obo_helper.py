@@ -2,8 +2,8 @@
 
 import logging
 
-from ontobio import OntologyFactory
 from .etl_helper import ETLHelper
+from .ontology_cache import OntologyCache
 
 
 class OBOHelper():
@@ -12,11 +12,39 @@ class OBOHelper():
     logger = logging.getLogger(__name__)
     etlh = ETLHelper()
 
+    # Relations the term parents are looked up for.
+    parent_relations = ['subClassOf', 'BFO:0000050', 'RO:0002211', 'RO:0002212', 'RO:0002213']
+
+    @staticmethod
+    def get_parents_by_relation(ont, relations=None):
+        """Get the direct parents of every term, per relation, in one pass over the graph edges.
+
+        Returns {relation: {term id: [parent ids]}}, the same parents
+        ont.parents(term, relations=[relation]) gives, without building a
+        subontology per term.
+        """
+
+        if relations is None:
+            relations = OBOHelper.parent_relations
+
+        parents_by_relation = {relation: {} for relation in relations}
+        # Edges run from the parent to the child.
+        for parent, child, edge_data in ont.get_graph().edges(data=True):
+            term_parents = parents_by_relation.get(edge_data.get('pred'))
+            if term_parents is None:
+                continue
+            parents = term_parents.setdefault(child, [])
+            if parent not in parents:
+                parents.append(parent)
+
+        return parents_by_relation
+
     def get_data(self, filepath):  # noqa
         """Get Data."""
-        ont = OntologyFactory().create(filepath)
+        ont = OntologyCache.get_ontology(filepath)
 
         parsed_line = ont.graph.copy().node
+        parents_by_relation = self.get_parents_by_relation(ont)
 
         # Convert parsed obo term into a schema-friendly AGR dictionary.
         for key in parsed_line.items():
@@ -76,17 +104,11 @@ class OBOHelper():
                             namespace = bpv.get('val')
                             break
 
-            all_parents = ont.parents(key)
-            all_parents.append(key)
-
-            # Improves performance when traversing relations
-            all_parents_subont = ont.subontology(all_parents)
-
-            isas_without_names = all_parents_subont.parents(key, relations=['subClassOf'])
-            partofs_without_names = all_parents_subont.parents(key, relations=['BFO:0000050'])
-            regulates = all_parents_subont.parents(key, relations=['RO:0002211'])
-            negatively_regulates = all_parents_subont.parents(key, relations=['RO:0002212'])
-            positively_regulates = all_parents_subont.parents(key, relations=['RO:0002213'])
+            isas_without_names = parents_by_relation['subClassOf'].get(key, [])
+            partofs_without_names = parents_by_relation['BFO:0000050'].get(key, [])
+            regulates = parents_by_relation['RO:0002211'].get(key, [])
+            negatively_regulates = parents_by_relation['RO:0002212'].get(key, [])
+            positively_regulates = parents_by_relation['RO:0002213'].get(key, [])
 
             # NU: def_links_unprocessed = []
             # def_links = ""
@@ -179,6 +201,38 @@ class OBOHelper():
 
         return ont
 
+    @staticmethod
+    def iter_obo_terms(filepath):
+        """Yield the [Term] stanzas of an OBO file one at a time, as {tag: [values]}.
+
+        Every tag maps to a list of its values in file order, whether it occurs once or more.
+        """
+        term = None
+        with open(filepath, 'r', encoding='utf-8') as obo_file:
+            for line in obo_file:
+                line = line.strip()
+                if not line or line[0] == '!':
+                    continue
+
+                if line[0] == '[':
+                    if term:
+                        yield term
+                    # Other stanzas ([Typedef], [Instance]) are skipped.
+                    term = {} if line == '[Term]' else None
+                    continue
+
+                if term is None:
+                    continue
+
+                tag, separator, value = line.partition(':')
+                if separator:
+                    term.setdefault(tag, []).append(value.strip())
+                else:
+                    OBOHelper.logger.info(line)
+
+        if term:
+            yield term
+
     @staticmethod
     def process_line(line, o_dict, within_term):
         """Process Line."""
@@ -0,0 +1,67 @@
+"""Ontology Cache"""
+
+import hashlib
+import logging
+import os
+import pickle
+
+from ontobio import OntologyFactory, Ontology
+
+
+class OntologyCache():
+    """Parsed ontobio ontologies, pickled and keyed by the content hash of the OBO file.
+
+    The first consumer of an ontology file parses it with ontobio and saves the
+    parsed graphs (terms with their synonyms, subsets and other meta, and the
+    edges). Every later consumer, in this run or the next while the file is
+    unchanged, loads the pickle instead of parsing the file again.
+
+    Each call returns a fresh Ontology, so consumers are free to modify it.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    cache_dir = 'tmp/ontology_cache'
+
+    @staticmethod
+    def get_checksum(filepath):
+        """Get the SHA256 hash of the contents of a file"""
+
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as data_file:
+            for block in iter(lambda: data_file.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @classmethod
+    def get_ontology(cls, filepath):
+        """Get the ontobio Ontology of an OBO file, parsing it only if it is not cached"""
+
+        cache_file = os.path.join(cls.cache_dir, cls.get_checksum(filepath) + '.pickle')
+
+        if os.path.isfile(cache_file):
+            cls.logger.info("Loading parsed ontology of %s from %s", filepath, cache_file)
+            with open(cache_file, 'rb') as pickle_file:
+                payload = pickle.load(pickle_file)
+            return Ontology(handle=filepath, payload=payload)
+
+        ont = OntologyFactory().create(filepath)
+
+        # The obographs document is left out, nothing uses it.
+        payload = {'id': ont.id,
+                   'meta': ont.meta,
+                   'graph': ont.graph,
+                   'xref_graph': ont.xref_graph,
+                   'logical_definitions': ont.all_logical_definitions,
+                   'property_chain_axioms': ont.all_property_chain_axioms}
+
+        # Written under a process specific name and renamed, so concurrent writers
+        # never expose a partial file.
+        os.makedirs(cls.cache_dir, exist_ok=True)
+        temp_file = "%s.%s" % (cache_file, os.getpid())
+        with open(temp_file, 'wb') as pickle_file:
+            pickle.dump(payload, pickle_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)
+        cls.logger.info("Saved parsed ontology of %s to %s", filepath, cache_file)
+
+        return ont
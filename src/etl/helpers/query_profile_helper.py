@@ -0,0 +1,183 @@
+"""Query Profile Helper"""
+
+import csv
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+
+
+class QueryProfileHelper():
+    """Captures PROFILE plans for each distinct query template.
+
+    Each template is profiled once, against the first rows of its CSV, inside a
+    transaction that is rolled back so the profile run does not change the graph.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    profile_dir = 'tmp/profiles'
+    # Sample CSVs live under tmp so Neo4j can LOAD CSV them from its import directory.
+    sample_dir = 'profile_samples'
+    report_file = 'tmp/query_profiles.json'
+    sample_rows = 1000
+
+    # Operators worth flagging, keyed by the name used in the report.
+    flagged_operators = {
+        'label_scan': ('AllNodesScan', 'NodeByLabelScan'),
+        'cartesian_product': ('CartesianProduct',),
+        'eager': ('Eager',)
+    }
+
+    periodic_commit_pattern = re.compile(r'USING\s+PERIODIC\s+COMMIT\s+\d*', re.IGNORECASE)
+
+    @classmethod
+    def reset(cls):
+        """Remove the profiles of a previous run"""
+
+        if os.path.exists(cls.profile_dir):
+            shutil.rmtree(cls.profile_dir)
+
+    @classmethod
+    def get_template_key(cls, query, filename):
+        """Key for a template: the query with its CSV file name and commit size removed"""
+
+        template = cls.periodic_commit_pattern.sub('', query.replace(filename, ''))
+        return hashlib.sha1(template.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def claim_template(cls, query, filename):
+        """Return the profile file to write if no other process has claimed this template"""
+
+        os.makedirs(cls.profile_dir, exist_ok=True)
+        profile_file = os.path.join(cls.profile_dir,
+                                    cls.get_template_key(query, filename) + '.json')
+        try:
+            open(profile_file, 'x').close()
+        except FileExistsError:
+            return None
+
+        return profile_file
+
+    @classmethod
+    def write_sample(cls, filename):
+        """Copy the header and first rows of a CSV to the sample directory"""
+
+        os.makedirs(os.path.join('tmp', cls.sample_dir), exist_ok=True)
+        sample_filename = os.path.join(cls.sample_dir, filename)
+
+        with open(os.path.join('tmp', filename), 'r', encoding='utf-8') as csv_file, \
+                open(os.path.join('tmp', sample_filename), 'w', encoding='utf-8') as sample_file:
+            reader = csv.reader(csv_file)
+            writer = csv.writer(sample_file, quoting=csv.QUOTE_NONNUMERIC)
+            for index, row in enumerate(reader):
+                if index > cls.sample_rows:
+                    break
+                writer.writerow(row)
+
+        return sample_filename
+
+    @staticmethod
+    def _plan_to_dict(plan):
+        """Normalise a profiled plan from either driver API into plain dicts"""
+
+        if isinstance(plan, dict):
+            return {'operator': plan.get('operatorType'),
+                    'db_hits': plan.get('dbHits', 0),
+                    'rows': plan.get('rows', 0),
+                    'arguments': {key: str(value) for key, value in plan.get('args', {}).items()},
+                    'children': [QueryProfileHelper._plan_to_dict(child)
+                                 for child in plan.get('children', [])]}
+
+        return {'operator': plan.operator_type,
+                'db_hits': plan.db_hits,
+                'rows': plan.rows,
+                'arguments': {key: str(value) for key, value in plan.arguments.items()},
+                'children': [QueryProfileHelper._plan_to_dict(child) for child in plan.children]}
+
+    @classmethod
+    def analyse_plan(cls, plan):
+        """Total the db hits of a plan and collect the flagged operators in it"""
+
+        db_hits = plan['db_hits'] or 0
+        flags = []
+        # Operator names may carry a runtime suffix, e.g. NodeByLabelScan@neo4j.
+        operator = (plan['operator'] or '').split('@')[0]
+        for flag, operators in cls.flagged_operators.items():
+            if operator in operators:
+                flags.append({'flag': flag,
+                              'operator': operator,
+                              'details': plan['arguments'].get('Details',
+                                                               plan['arguments'].get('LabelName', ''))})
+        for child in plan['children']:
+            child_db_hits, child_flags = cls.analyse_plan(child)
+            db_hits += child_db_hits
+            flags.extend(child_flags)
+
+        return db_hits, flags
+
+    @classmethod
+    def profile(cls, session, query, filename):
+        """Profile a query once per template, if no other process has done it already"""
+
+        profile_file = cls.claim_template(query, filename)
+        if profile_file is None:
+            return
+
+        try:
+            sample_filename = cls.write_sample(filename)
+            profile_query = cls.periodic_commit_pattern.sub('', query) \
+                .replace('file:///' + filename, 'file:///' + sample_filename)
+
+            transaction = session.begin_transaction()
+            try:
+                summary = transaction.run('PROFILE ' + profile_query).consume()
+            finally:
+                transaction.rollback()
+        except Exception as error:
+            # Profiling must never hold up the load itself.
+            cls.logger.warning("Could not profile query for %s: %s", filename, error)
+            return
+
+        plan = cls._plan_to_dict(summary.profile)
+        db_hits, flags = cls.analyse_plan(plan)
+
+        with open(profile_file, 'w') as json_file:
+            json.dump({'file': filename,
+                       'query': query,
+                       'sample_rows': cls.sample_rows,
+                       'db_hits': db_hits,
+                       'flags': flags,
+                       'plan': plan}, json_file, indent=4)
+
+        for flag in flags:
+            cls.logger.warning("Query for %s has %s: %s %s",
+                               filename, flag['flag'], flag['operator'], flag['details'])
+
+    @classmethod
+    def save_report(cls):
+        """Merge the captured profiles into one report, most db hits first"""
+
+        profiles = []
+        for profile_file in glob.glob(os.path.join(cls.profile_dir, '*.json')):
+            with open(profile_file, 'r') as json_file:
+                content = json_file.read()
+            if content:
+                profiles.append(json.loads(content))
+
+        profiles.sort(key=lambda profile: profile['db_hits'], reverse=True)
+
+        with open(cls.report_file, 'w') as report_file:
+            json.dump(profiles, report_file, indent=4)
+
+        flagged = [profile for profile in profiles if profile['flags']]
+        cls.logger.info("Profiled %s query templates, %s flagged. Report: %s",
+                        len(profiles), len(flagged), cls.report_file)
+        for profile in flagged:
+            cls.logger.warning("%s db hits: %s flags: %s",
+                               profile['file'],
+                               profile['db_hits'],
+                               ', '.join(sorted(set(flag['flag'] for flag in profile['flags']))))
@@ -1,11 +1,30 @@
 """Resource Descriptor Helper 2."""
 
+import hashlib
 import logging
+import os
+import pickle
 import re
 import yaml
 from files import Download
 
 
+class ResourcePage():
+    """A resource descriptor page, compiled for a db prefix as it is written in the data.
+
+    url_parts is the page url split on '[%s]', so joining the parts with a local id
+    gives the url. It is None for databases that should not generate a url.
+    """
+
+    __slots__ = ('key', 'gid_pattern', 'gid_regex', 'url_parts')
+
+    def __init__(self, key, gid_pattern, url):
+        self.key = key
+        self.gid_pattern = gid_pattern
+        self.gid_regex = re.compile(gid_pattern, re.IGNORECASE) if gid_pattern else None
+        self.url_parts = url.split('[%s]') if url is not None else None
+
+
 class ResourceDescriptorHelper2():
     """Resource Descriptor Helper 2."""
 
@@ -45,6 +64,34 @@ class ResourceDescriptorHelper2():
     # DB should not generate a url.
     no_url = {}
 
+    # Error counters, with the label they are reported under. Each process only logs the
+    # details of the first error per key at debug level; the counts of every process
+    # are merged into one report at the end of the load (see ETL.error_messages).
+    error_counters = [('missing_pages', "Missing page"),
+                      ('missing_keys', "Missing key"),
+                      ('deprecated_mess', "Deprecated"),
+                      ('bad_pages', "None matching urls"),
+                      ('bad_regex', "None matching regex")]
+
+    # Lookup tables built from the YAML files, pickled with the checksum of the files.
+    # Processes that are not forked from a loaded one still read the downloaded files,
+    # the snapshot only saves them parsing the YAML and building the tables.
+    snapshot_file = 'tmp/resource_descriptors.pickle'
+    snapshot_tables = ['resource_descriptor_dict', 'key_lookup', 'key_to_fullname',
+                       'key_to_shortname', 'key_to_order', 'key_to_taxonid', 'no_url']
+
+    # ResourcePage per (db prefix as passed in, page), False if the lookup reports an error.
+    resource_pages = {}
+
+    def get_error_counts(self):
+        """Get the non empty error counters of this process, by report label."""
+        return {label: getattr(self, counter) for counter, label in self.error_counters if getattr(self, counter)}
+
+    def reset_error_counts(self):
+        """Clear the error counters of this process."""
+        for counter, _ in self.error_counters:
+            setattr(self, counter, {})
+
     def get_key(self, alt_key):
         """Get species/DB main key.
 
@@ -63,8 +110,7 @@ class ResourceDescriptorHelper2():
                 else:
                     self.missing_keys[mk_key] = 1
                     mess = "The database key '{}' --> '{}' cannot be found in the lookup.".format(alt_key, main_key)
-                    self.logger.critical(mess)
-                    self.logger.info("Available are %s", self.key_lookup.keys())
+                    self.logger.debug(mess)
                 return ret_key
             if key_prefix not in self.key_lookup:
                 self.logger.debug("%s Found after splitting", alt_key)
@@ -74,8 +120,7 @@ class ResourceDescriptorHelper2():
                     self.missing_keys[main_key] += 1
                 else:
                     mess = "The database key '{}' --> '{}' cannot be found in the lookup.".format(alt_key, main_key)
-                    self.logger.critical(mess)
-                    self.logger.critical("Available are %s", self.key_lookup.keys())
+                    self.logger.debug(mess)
                     self.missing_keys[main_key] = 1
         else:
             ret_key = self.key_lookup[main_key]
@@ -117,21 +162,14 @@ class ResourceDescriptorHelper2():
             self.logger.critical("Could not find orddr for identifier %s", identifier)
         return order
 
-    def _get_alt_keys(self):
+    def _get_alt_keys(self, species_file):
         """Get alternative keys for species.
 
         These are stored in the resourceDescriptor.yaml file under
         aliases. The keys for this are not used/stored but are here for reference
         or may be used at a later point.
         """
-        url = 'https://raw.githubusercontent.com/alliance-genome/agr_schemas/master/ingest/species/species.yaml'
-        self.logger.critical("species url is %s", url)
-
-        resource_descriptor_file = Download('tmp',
-                                            url,
-                                            'species.yaml').get_downloaded_data()
-
-        yaml_list = yaml.load(resource_descriptor_file, Loader=yaml.SafeLoader)
+        yaml_list = yaml.load(species_file, Loader=yaml.SafeLoader)
         for item in yaml_list:
             db_name = item['primaryDataProvider']['dataProviderShortName'].upper()
             # Hack human data comes from RGD but we do not want to overwrite RGD
@@ -161,9 +199,14 @@ class ResourceDescriptorHelper2():
         return self.resource_descriptor_dict
 
     def __init__(self):
-        """Load the dict from file."""
+        """Load the lookup tables, from the snapshot if the YAML files are unchanged.
+
+        The files are downloaded if they are not in tmp yet, and read either way:
+        the snapshot is keyed on their contents, not their URLs, as the loader
+        downloads them from the schema branch under the same names.
+        """
         if self.resource_descriptor_dict:
-            self.logger.critical("keys are:- %s", self.resource_descriptor_dict.keys())
+            self.logger.debug("Resource descriptors already loaded")
             return
 
         url = 'https://raw.githubusercontent.com/' \
@@ -173,6 +216,50 @@ class ResourceDescriptorHelper2():
                                             url,
                                             'resourceDescriptors.yaml').get_downloaded_data()
 
+        url = 'https://raw.githubusercontent.com/alliance-genome/agr_schemas/master/ingest/species/species.yaml'
+        self.logger.info("species url is %s", url)
+
+        species_file = Download('tmp',
+                                url,
+                                'species.yaml').get_downloaded_data()
+
+        checksum = hashlib.sha256((resource_descriptor_file + species_file).encode('utf-8')).hexdigest()
+        if self._load_snapshot(checksum):
+            return
+
+        self._load_resource_descriptors(resource_descriptor_file)
+        self._get_alt_keys(species_file)
+        self._save_snapshot(checksum)
+
+    def _load_snapshot(self, checksum):
+        """Load the lookup tables from the snapshot, return False if it is missing or out of date."""
+        if not os.path.isfile(self.snapshot_file):
+            return False
+        with open(self.snapshot_file, 'rb') as pickle_file:
+            snapshot = pickle.load(pickle_file)
+        if snapshot.get('checksum') != checksum:
+            return False
+
+        # The lookup dicts are updated in place, as they are shared by the class.
+        for table in self.snapshot_tables:
+            if table == 'resource_descriptor_dict':
+                ResourceDescriptorHelper2.resource_descriptor_dict = snapshot[table]
+            else:
+                getattr(ResourceDescriptorHelper2, table).update(snapshot[table])
+        self.logger.debug("Resource descriptors loaded from %s", self.snapshot_file)
+        return True
+
+    def _save_snapshot(self, checksum):
+        """Pickle the lookup tables for other processes."""
+        snapshot = {table: getattr(ResourceDescriptorHelper2, table) for table in self.snapshot_tables}
+        snapshot['checksum'] = checksum
+        temp_file = "%s.%s" % (self.snapshot_file, os.getpid())
+        with open(temp_file, 'wb') as pickle_file:
+            pickle.dump(snapshot, pickle_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, self.snapshot_file)
+
+    def _load_resource_descriptors(self, resource_descriptor_file):
+        """Build the lookup dictionary keyed by db_prefix, and the key lookups, from the YAML."""
         yaml_list = yaml.load(resource_descriptor_file, Loader=yaml.SafeLoader)
         # Convert the list into a more useful lookup dictionary keyed by db_prefix.
         resource_descriptor_dict = {}
@@ -204,7 +291,6 @@ class ResourceDescriptorHelper2():
         # pp.pprint(self.resource_descriptor_dict)
         # quit()
         ResourceDescriptorHelper2.resource_descriptor_dict = resource_descriptor_dict
-        self._get_alt_keys()
 
     def split_identifier(self, identifier, ignore_error=False):
         """Split Identifier.
@@ -225,9 +311,9 @@ class ResourceDescriptorHelper2():
             if not ignore_error:
                 key = "Identifier problem"
                 if key not in self.missing_keys:
-                    self.logger.critical('Identifier does not contain \':\' or \'-\' characters.')
-                    self.logger.critical('Splitting identifier is not possible.')
-                    self.logger.critical('Identifier: %s', identifier)
+                    self.logger.debug('Identifier does not contain \':\' or \'-\' characters.')
+                    self.logger.debug('Splitting identifier is not possible.')
+                    self.logger.debug('Identifier: %s', identifier)
                     self.missing_keys[key] = 1
                 else:
                     self.missing_keys[key] += 1
@@ -243,9 +329,42 @@ class ResourceDescriptorHelper2():
         else:
             self.missing_keys[mk_key] = 1
             mess = "The database prefix '{}' '{}' cannot be found in the Resource Descriptor YAML.".format(alt_key, key)
-            self.logger.critical(mess)
-            self.logger.critical('Identifier: %s', value)
-            self.logger.info("keys are:- %s", self.key_lookup.keys())
+            self.logger.debug(mess)
+            self.logger.debug('Identifier: %s', value)
+
+    def get_resource_page(self, alt_key, page=None):
+        """Get the compiled ResourcePage for a db prefix and page, or None.
+
+        None is returned when the lookup would report an error, so the caller
+        can take the uncompiled route which reports it.
+        """
+        resource_page = self.resource_pages.get((alt_key, page))
+        if resource_page is None:
+            resource_page = self._compile_resource_page(alt_key, page) or False
+            self.resource_pages[(alt_key, page)] = resource_page
+        return resource_page or None
+
+    def _compile_resource_page(self, alt_key, page):
+        key = self.key_lookup.get(alt_key.upper())
+        if key is None:
+            return None
+        if key in self.no_url:
+            return ResourcePage(key, None, None)
+        if key not in self.key_lookup:
+            return None
+        resource_descriptor = self.resource_descriptor_dict.get(key)
+        if not resource_descriptor or 'default_url' not in resource_descriptor:
+            return None
+        try:
+            if page:
+                url = resource_descriptor['pages'][page]['url']
+            else:
+                url = resource_descriptor['default_url']
+        except (KeyError, TypeError):
+            return None
+        if not isinstance(url, str):
+            return None
+        return ResourcePage(key, resource_descriptor.get('gid_pattern'), url)
 
     def return_url_from_key_value(self, alt_key, value, alt_page=None):
         """Return url for a key value pair.
@@ -256,6 +375,14 @@ class ResourceDescriptorHelper2():
 
         By default, if alt_page is not set it will use the main one 'default_url'
         """
+        resource_page = self.get_resource_page(alt_key, alt_page)
+        if resource_page is None or not isinstance(value, str):
+            return self._return_url_from_key_value(alt_key, value, alt_page)
+        if resource_page.url_parts is None:
+            return ''
+        return value.strip().join(resource_page.url_parts)
+
+    def _return_url_from_key_value(self, alt_key, value, alt_page):
         url = None
         key = self.get_key(alt_key)
         if key in self.no_url:
@@ -282,7 +409,7 @@ class ResourceDescriptorHelper2():
                 self.missing_pages[key] += 1
             else:
                 self.missing_pages[key] = 1
-                self.logger.critical(mess)
+                self.logger.debug(mess)
         except AttributeError as e:
             mess = "***** ERROR!!! key = '{}', value = '{}' page = {} error = '{}'******".format(key, value, page, e)
             key = "{}-{}".format(key, page)
@@ -290,7 +417,7 @@ class ResourceDescriptorHelper2():
                 self.missing_pages[key] += 1
             else:
                 self.missing_pages[key] = 1
-                self.logger.critical(mess)
+                self.logger.debug(mess)
         return url
 
     def return_url(self, identifier, page):
@@ -309,6 +436,30 @@ class ResourceDescriptorHelper2():
         """Return URL for an identifier."""
         db_prefix, identifier_stripped, separator = self.split_identifier(identifier)
 
+        resource_page = self.get_resource_page(db_prefix, page) if db_prefix else None
+        if resource_page is None or (resource_page.url_parts is not None and resource_page.gid_regex is None):
+            return self._return_url_from_identifier(db_prefix, identifier_stripped, separator, page)
+        if resource_page.url_parts is None:
+            return None
+
+        if resource_page.gid_regex.match(identifier) is None:
+            self.bad_regex_message(resource_page.key, db_prefix, identifier, resource_page.gid_pattern, page)
+        return identifier_stripped.strip().join(resource_page.url_parts)
+
+    def bad_regex_message(self, key, db_prefix, identifier, gid_pattern, page):
+        """Generate message for an identifier not matching the gid pattern."""
+        if key not in self.bad_regex:
+            self.logger.debug('Cross Reference identifier did %s',
+                              'not match Resource Descriptor YAML file gid pattern.')
+            self.logger.debug('Database prefix: %s', db_prefix)
+            self.logger.debug('Identifier: %s', identifier)
+            self.logger.debug('gid pattern: %s', gid_pattern)
+            self.logger.debug('page: %s', page)
+            self.bad_regex[key] = 1
+        else:
+            self.bad_regex[key] += 1
+
+    def _return_url_from_identifier(self, db_prefix, identifier_stripped, separator, page):
         key = self.get_key(db_prefix)
         if not key:
             return None
@@ -318,9 +469,9 @@ class ResourceDescriptorHelper2():
             gid_pattern = self.resource_descriptor_dict[key]['gid_pattern']
         except KeyError:
             if key not in self.missing_keys:
-                self.logger.critical("The database prefix '%s' has no 'gid_pattern'.", db_prefix)
-                self.logger.critical('Page: %s', page)
-                self.logger.critical('Identifier: %s', identifier)
+                self.logger.debug("The database prefix '%s' has no 'gid_pattern'.", db_prefix)
+                self.logger.debug('Page: %s', page)
+                self.logger.debug('Identifier: %s', db_prefix + separator + identifier_stripped)
                 self.missing_keys[key] = 1
             else:
                 self.missing_keys[key] += 1
@@ -330,14 +481,5 @@ class ResourceDescriptorHelper2():
 
         regex_output = re.match(gid_pattern, identifier_post_processed, re.IGNORECASE)
         if regex_output is None:
-            if key not in self.bad_regex:
-                self.logger.critical('Cross Reference identifier did %s',
-                                     'not match Resource Descriptor YAML file gid pattern.')
-                self.logger.critical('Database prefix: %s', db_prefix)
-                self.logger.critical('Identifier: %s', identifier_post_processed)
-                self.logger.critical('gid pattern: %s', gid_pattern)
-                self.logger.critical('page: %s', page)
-                self.bad_regex[key] = 1
-            else:
-                self.bad_regex[key] += 1
-        return self.return_url_from_key_value(db_prefix, identifier_stripped, alt_page=page)
+            self.bad_regex_message(key, db_prefix, identifier_post_processed, gid_pattern, page)
+        return self._return_url_from_key_value(db_prefix, identifier_stripped, page)
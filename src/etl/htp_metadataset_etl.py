@@ -118,6 +118,7 @@ class HTPMetaDatasetETL(ETL):
         query_and_file_list = self.process_query_params(query_list)
         CSVTransactor.save_file_static(generators, query_and_file_list)
         Neo4jTransactor.execute_query_batch(query_and_file_list)
+        self.error_messages("HTPMetaDataset-{}: ".format(sub_type.get_data_provider()))
 
     def get_generators(self, htp_dataset_data, batch_size):
         dataset_tags = []
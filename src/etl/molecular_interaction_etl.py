@@ -1,7 +1,6 @@
 """Molecular Interaction ETL."""
 
 import logging
-import uuid
 import csv
 import re
 import sys
@@ -9,7 +8,7 @@ import itertools
 
 from etl import ETL
 from transactors import CSVTransactor, Neo4jTransactor
-from etl.helpers import Neo4jHelper, ETLHelper
+from etl.helpers import Neo4jHelper, ETLHelper, IdentifierRegistry, CrossReferenceIndex
 
 
 class MolecularInteractionETL(ETL):
@@ -116,10 +115,18 @@ class MolecularInteractionETL(ETL):
         query_and_file_list = self.process_query_params(query_template_list)
         CSVTransactor.save_file_static(generators, query_and_file_list)
         Neo4jTransactor.execute_query_batch(query_and_file_list)
+        self.error_messages("MolInt: ")
 
     @staticmethod
     def populate_genes():
-        """Populate Genes."""
+        """Populate Genes.
+
+        Uses the identifier registry when the genes were loaded in this run.
+        """
+        gene_ids = IdentifierRegistry.get_identifiers('Gene')
+        if gene_ids is not None:
+            return gene_ids
+
         master_gene_set = set()
 
         query = "MATCH (g:Gene) RETURN g.primaryKey"
@@ -142,46 +149,26 @@ class MolecularInteractionETL(ETL):
     def populate_crossreference_dictionary(self):
         """Populate the crossreference dictionary.
 
-        We're populating a rather large dictionary to use for looking up Alliance genes by
-        their crossreferences.
-        Edit the list below if you'd like to add more crossreferences to the dictionary.
-        The key of the dictionary is the crossreference and the value is the Alliance
-        gene to which it resolves.
+        Looks up Alliance genes by their crossreferences: the key is the lowercased
+        global crossreference id and the value the list of Alliance genes it resolves to.
+        This is the CrossReferenceIndex built during the BGI load; if the genes were
+        not loaded in this run the crossreferences are queried from Neo4j instead.
+        The prefixes used are CrossReferenceIndex.indexed_prefixes, to use more add
+        them there and a regex entry to the resolve_identifier function.
         """
-        master_crossreference_dictionary = dict()
+        crossreference_index = CrossReferenceIndex.get_index()
+        if crossreference_index is not None:
+            return crossreference_index
 
-        # If additional crossreferences need to be used to find interactors, they can be added here.
-        # Use the crossreference prefix as the dictionary name.
-        # Also add a regex entry to the resolve_identifier function.
-        master_crossreference_dictionary['UniProtKB'] = dict()
-        master_crossreference_dictionary['ENSEMBL'] = dict()
-        master_crossreference_dictionary['NCBI_Gene'] = dict()
-        master_crossreference_dictionary['RefSeq'] = dict()
+        master_crossreference_dictionary = dict()
 
-        for key in master_crossreference_dictionary:
+        for key in CrossReferenceIndex.indexed_prefixes:
             self.logger.info('Querying for %s cross references.', key)
             result = self.query_crossreferences(key)
             for record in result:
-                cross_ref_record = None
-                # Modify the cross reference ID to match the PSI MITAB format if necessary.
-                # So far, this is just converting 'NCBI_Gene' to 'entrez gene/locuslink'.
-                if record['cr.globalCrossRefId'].startswith('NCBI_Gene'):
-                    cross_ref_record_split = record['cr.globalCrossRefId'].split(':')[1]
-                    cross_ref_record = 'entrez gene/locuslink:' + cross_ref_record_split
-                else:
-                    cross_ref_record = record['cr.globalCrossRefId']
-
-                # The crossreference dictionary is a list of genes
-                # linked to a single crossreference.
-                # Append the gene if the crossref dict entry exists.
-                # Otherwise, create a list and append the entry.
-                if cross_ref_record.lower() in master_crossreference_dictionary[key]:
-                    master_crossreference_dictionary[key][cross_ref_record.lower()].append(record['g.primaryKey'])
-                else:
-                    master_crossreference_dictionary[key][cross_ref_record.lower()] = []
-                    master_crossreference_dictionary[key][cross_ref_record.lower()].append(record['g.primaryKey'])
-
-                # The ids in PSI-MITAB files are lower case, hence the .lower() used above.
+                # The ids in PSI-MITAB files are lower case, hence the .lower().
+                master_crossreference_dictionary.setdefault(record['cr.globalCrossRefId'].lower(), []) \
+                    .append(record['g.primaryKey'])
 
         return master_crossreference_dictionary
 
@@ -261,7 +248,6 @@ class MolecularInteractionETL(ETL):
                 except KeyError:
                     pass
 
-            xref_dict['uuid'] = str(uuid.uuid4())
             xref_dict['globalCrossRefId'] = individual
             xref_dict['id'] = individual  # Used for name.
             xref_dict['displayName'] = individual_body
@@ -275,6 +261,7 @@ class MolecularInteractionETL(ETL):
 
             if individual.startswith('flybase'):
                 xref_dict['primaryKey'] = individual_body
+            xref_dict['uuid'] = ETLHelper.get_uuid('CrossReference', xref_dict['primaryKey'], 'interaction')
             xref_main_list.append(xref_dict)
 
         return xref_main_list
@@ -304,10 +291,10 @@ class MolecularInteractionETL(ETL):
         xref_dict['prefix'] = individual_prefix
         xref_dict['localId'] = individual_body
         xref_dict['crossRefCompleteUrl'] = individual_url
-        xref_dict['uuid'] = str(uuid.uuid4())
+        xref_dict['uuid'] = ETLHelper.get_uuid('CrossReference', xref_dict['primaryKey'], page)
         xref_dict['crossRefType'] = page
         xref_dict['page'] = page
-        xref_dict['reference_uuid'] = str(uuid.uuid4())
+        xref_dict['reference_uuid'] = ETLHelper.get_uuid('ModInteractionLink', gene_id)
 
 #       For matching to the gene when creating the xref relationship in Neo.
         xref_dict['dataId'] = gene_id
@@ -400,14 +387,16 @@ class MolecularInteractionETL(ETL):
                     # We might have multiple regex matches.
                     # Search them all against our crossreferences.
                     for regex_match in regex_output:
-                        identifier = regex_match
-                        for crossreference_type in master_crossreference_dictionary.keys():
-                            # Using lowercase in the identifier to be consistent
-                            # with Alliance lowercase identifiers.
-                            if identifier.lower() in \
-                                     master_crossreference_dictionary[crossreference_type]:
-                                # Return the corresponding Alliance gene(s).
-                                return master_crossreference_dictionary[crossreference_type][identifier.lower()]
+                        # Using lowercase in the identifier to be consistent
+                        # with Alliance lowercase identifiers.
+                        identifier = regex_match.lower()
+                        # PSI MITAB uses 'entrez gene/locuslink' for NCBI_Gene.
+                        if identifier.startswith('entrez gene/locuslink:'):
+                            identifier = 'ncbi_gene:' + identifier.split(':', 1)[1]
+                        genes = master_crossreference_dictionary.get(identifier)
+                        if genes:
+                            # Return the corresponding Alliance gene(s).
+                            return genes
         # If we can't resolve any of the crossReferences, return None
 
         # print('Could not resolve identifiers.')
@@ -428,18 +417,17 @@ class MolecularInteractionETL(ETL):
 
         # Populate our master dictionary for resolving cross references.
         master_crossreference_dictionary = self.populate_crossreference_dictionary()
-        self.logger.info('Obtained the following number of cross references from Neo4j:')
-        for entry in master_crossreference_dictionary:
-            self.logger.info('%s: %s', entry, len(master_crossreference_dictionary[entry]))
 
         # Populate our master gene set for filtering Alliance genes.
         master_gene_set = self.populate_genes()
-        self.logger.info('Obtained %s gene primary ids from Neo4j.', len(master_gene_set))
+        self.logger.info('Obtained %s gene primary ids.', len(master_gene_set))
 
         resolved_a_b_count = 0
         unresolved_a_b_count = 0
         total_interactions_loaded_count = 0
         unresolved_publication_count = 0
+        duplicate_interaction_count = 0
+        loaded_interaction_uuids = set()
 
         # Used for debugging.
         # unresolved_entries = []
@@ -611,7 +599,15 @@ class MolecularInteractionETL(ETL):
                 list_of_mol_int_dataset = [dict(mol_int_dataset,
                                                 interactor_A=x,
                                                 interactor_B=y,
-                                                uuid=str(uuid.uuid4())) for x, y in int_combos]
+                                                uuid=ETLHelper.get_uuid('InteractionGeneJoin', '\t'.join(row), x, y))
+                                           for x, y in int_combos]
+                # The uuid is derived from the line, skip the lines repeated in the file.
+                list_of_mol_int_dataset = [dataset_entry for dataset_entry in list_of_mol_int_dataset
+                                           if dataset_entry['uuid'] not in loaded_interaction_uuids]
+                if not list_of_mol_int_dataset:
+                    duplicate_interaction_count += 1
+                    continue
+                loaded_interaction_uuids.update(dataset_entry['uuid'] for dataset_entry in list_of_mol_int_dataset)
                 # Tracking successfully loaded identifiers.
                 total_interactions_loaded_count += len(list_of_mol_int_dataset)
                 # Tracking successfully resolved identifiers.
@@ -666,6 +662,8 @@ class MolecularInteractionETL(ETL):
                          total_interactions_loaded_count,
                          '(accounting for multiple possible identifier resolutions)')
 
+        self.logger.info('Skipped %s repeated PSI-MITAB interactions.', duplicate_interaction_count)
+
         self.logger.info('Note: Interactions missing valid publications will be skipped, even if their identifiers'
                          ' resolve correctly.')
 
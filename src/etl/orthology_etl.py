@@ -2,7 +2,6 @@
 
 from itertools import permutations
 import logging
-import uuid
 import multiprocessing
 import codecs
 from random import shuffle
@@ -224,7 +223,7 @@ class OrthologyETL(ETL):
 
                 counter = counter + 1
 
-                ortho_uuid = str(uuid.uuid4())
+                ortho_uuid = ETLHelper.get_uuid('OrthologyGeneJoin', gene_1_agr_primary_id, gene_2_agr_primary_id)
 
                 if self.test_object.using_test_data() is True:
                     is_it_test_entry = self.test_object.check_for_test_id_entry(gene_1_agr_primary_id)
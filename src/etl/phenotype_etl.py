@@ -1,10 +1,11 @@
 """Phenotype ETL."""
 
+import json
 import logging
-import uuid
 import multiprocessing
 
 from etl import ETL
+from etl.helpers import ETLHelper
 from files import JSONFile
 from transactors import CSVTransactor
 from transactors import Neo4jTransactor
@@ -44,12 +45,12 @@ class PhenoTypeETL(ETL):
                  pubf.pubMedUrl = row.pubMedUrl
 
                        //MERGE (pubf)-[pe:EVIDENCE]-(pa)
-           CREATE (pubEJ:PublicationJoin:Association {primaryKey:row.pecjPrimaryKey})
+           MERGE (pubEJ:PublicationJoin:Association {primaryKey:row.pecjPrimaryKey})
              SET pubEJ.joinType = 'pub_evidence_code_join'
 
-            CREATE (pubf)-[pubfpubEJ:ASSOCIATION {uuid:row.pecjPrimaryKey}]->(pubEJ)
+            MERGE (pubf)-[pubfpubEJ:ASSOCIATION {uuid:row.pecjPrimaryKey}]->(pubEJ)
 
-            CREATE (pa)-[pubfpubEE:EVIDENCE]->(pubEJ)
+            MERGE (pa)-[pubfpubEE:EVIDENCE]->(pubEJ)
 
             """
     execute_gene_query_template = """
@@ -78,12 +79,12 @@ class PhenoTypeETL(ETL):
                  pubf.pubMedUrl = row.pubMedUrl
 
                        //MERGE (pubf)-[pe:EVIDENCE]-(pa)
-           CREATE (pubEJ:PublicationJoin:Association {primaryKey:row.pecjPrimaryKey})
+           MERGE (pubEJ:PublicationJoin:Association {primaryKey:row.pecjPrimaryKey})
              SET pubEJ.joinType = 'pub_evidence_code_join'
 
-            CREATE (pubf)-[pubfpubEJ:ASSOCIATION {uuid:row.pecjPrimaryKey}]->(pubEJ)
+            MERGE (pubf)-[pubfpubEJ:ASSOCIATION {uuid:row.pecjPrimaryKey}]->(pubEJ)
 
-            CREATE (pa)-[pubfpubEE:EVIDENCE]->(pubEJ)
+            MERGE (pa)-[pubfpubEE:EVIDENCE]->(pubEJ)
 
             """
 
@@ -113,12 +114,12 @@ class PhenoTypeETL(ETL):
                  pubf.pubMedUrl = row.pubMedUrl
 
                        //MERGE (pubf)-[pe:EVIDENCE]-(pa)
-            CREATE (pubEJ:PublicationJoin:Association {primaryKey:row.pecjPrimaryKey})
+            MERGE (pubEJ:PublicationJoin:Association {primaryKey:row.pecjPrimaryKey})
               SET pubEJ.joinType = 'pub_evidence_code_join'
 
-            CREATE (pubf)-[pubfpubEJ:ASSOCIATION {uuid:row.pecjPrimaryKey}]->(pubEJ)
+            MERGE (pubf)-[pubfpubEJ:ASSOCIATION {uuid:row.pecjPrimaryKey}]->(pubEJ)
 
-            CREATE (pa)-[pubfpubEE:EVIDENCE]->(pubEJ)
+            MERGE (pa)-[pubfpubEE:EVIDENCE]->(pubEJ)
 
     """
 
@@ -129,7 +130,7 @@ class PhenoTypeETL(ETL):
             MATCH (n:Allele {primaryKey:row.pgeId})
             MATCH (d:PublicationJoin {primaryKey:row.pecjPrimaryKey})
 
-            CREATE (d)-[dgaw:PRIMARY_GENETIC_ENTITY]->(n)
+            MERGE (d)-[dgaw:PRIMARY_GENETIC_ENTITY]->(n)
 
     """
 
@@ -140,10 +141,40 @@ class PhenoTypeETL(ETL):
             MATCH (n:AffectedGenomicModel {primaryKey:row.pgeId})
             MATCH (d:PublicationJoin {primaryKey:row.pecjPrimaryKey})
 
-            CREATE (d)-[dgaw:PRIMARY_GENETIC_ENTITY]->(n)
+            MERGE (d)-[dgaw:PRIMARY_GENETIC_ENTITY]->(n)
 
     """
 
+    execute_delete_query_template = """
+
+        USING PERIODIC COMMIT %s
+            LOAD CSV WITH HEADERS FROM \'file:///%s\' AS row
+            MATCH (pubEJ:PublicationJoin {primaryKey:row.pecjPrimaryKey})
+            DETACH DELETE pubEJ
+
+            // The association goes too once none of its evidence is left.
+            WITH row
+            MATCH (pa:PhenotypeEntityJoin:Association {primaryKey:row.phenotypeUniqueKey})
+                WHERE NOT (pa)-[:EVIDENCE]->()
+            OPTIONAL MATCH ()-[hp:HAS_PHENOTYPE {uuid:row.phenotypeUniqueKey}]->()
+            DELETE hp
+            DETACH DELETE pa
+
+    """
+
+    # An annotation (one per phenotype record) and its evidence. Its key is derived
+    # from the whole record, so annotations are only ever added or removed. The
+    # same rows are written for genes, alleles and AGMs.
+    delta_groups = [
+        {'files': {'phenotype_gene_data': ['pecjPrimaryKey'],
+                   'phenotype_allele_data': ['pecjPrimaryKey'],
+                   'phenotype_agm_data': ['pecjPrimaryKey'],
+                   'phenotype_pges_allele_data': ['pecjPrimaryKey'],
+                   'phenotype_pges_agm_data': ['pecjPrimaryKey']},
+         'ignore': ['loadKey', 'dateProduced', 'pubMedUrl', 'pubModUrl'],
+         'delete': execute_delete_query_template}
+    ]
+
     def __init__(self, config):
         """Initialise object."""
         super().__init__()
@@ -192,6 +223,7 @@ class PhenoTypeETL(ETL):
 
         query_and_file_list = self.process_query_params(query_template_list)
         CSVTransactor.save_file_static(generators, query_and_file_list)
+        query_and_file_list = self.get_delta_queries(sub_type, query_and_file_list, commit_size)
         Neo4jTransactor.execute_query_batch(query_and_file_list)
         self.error_messages("Phenotype-{}: ".format(sub_type.get_data_provider()))
 
@@ -264,7 +296,7 @@ class PhenoTypeETL(ETL):
         load_key = date_produced + self.data_provider + "_phenotype"
 
         for pheno in phenotype_data['data']:
-            pecj_primary_key = str(uuid.uuid4())
+            pecj_primary_key = ETLHelper.get_uuid('PublicationJoin', json.dumps(pheno, sort_keys=True))
             counter = counter + 1
             primary_id = pheno.get('objectId')
             phenotype_statement = pheno.get('phenotypeStatement')
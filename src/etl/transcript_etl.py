@@ -1,11 +1,11 @@
 """Transcript ETL."""
 
-import re
 import logging
 import multiprocessing
-import uuid
 
 from etl import ETL
+from etl.helpers import ETLHelper, GenomicIntervalIndex
+from files import GFF3File
 from transactors import CSVTransactor
 from transactors import Neo4jTransactor
 
@@ -105,6 +105,16 @@ class TranscriptETL(ETL):
             CREATE (gchrm)-[ofc:ASSOCIATION]->(chrm)
             CREATE (gchrm)-[ao:ASSOCIATION]->(a)"""
 
+    transcript_types = {'mRNA', 'ncRNA', 'piRNA', 'lincRNA', 'miRNA', 'pre_miRNA', 'snoRNA', 'lnc_RNA',
+                        'tRNA', 'snRNA', 'rRNA', 'antisense_RNA', 'C_gene_segment',
+                        'V_gene_segment', 'pseudogene_attribute', 'snoRNA_gene', 'pseudogenic_transcript'}
+    feature_types = transcript_types | {'gene', 'exon'}
+
+    # Data provider of each #!data-source of the GFF3 files that differs from it.
+    data_source_providers = {'FlyBase': 'FB',
+                             'WormBase': 'WB',
+                             'RAT': 'RGD'}
+
     def __init__(self, config):
         """Initialise object."""
         super().__init__()
@@ -150,167 +160,101 @@ class TranscriptETL(ETL):
         Neo4jTransactor.execute_query_batch(query_and_file_list)
         self.error_messages("Transcript-{}: ".format(sub_type.get_data_provider()))
 
-    def get_generators(self, filepath, batch_size):  # noqa
+    def get_generators(self, filepath, batch_size):
         """Get Generators."""
-        with open(filepath) as file_handle:
-            transcript_maps = []
-            gene_maps = []
-            exon_maps = []
-            counter = 0
-            data_provider = ''
-            assembly = ''
-            for line in file_handle:
-                counter = counter + 1
-                transcript_map = {}
-                gene_map = {}
-                exon_map = {}
-
-                curie = ''
-                parent = ''
-                gff3_id = ''
-                synonym = ''
-                name = ''
-
-                transcript_types = ['mRNA', 'ncRNA', 'piRNA', 'lincRNA', 'miRNA', 'pre_miRNA', 'snoRNA', 'lnc_RNA',
-                                    'tRNA', 'snRNA', 'rRNA', 'antisense_RNA', 'C_gene_segment',
-                                    'V_gene_segment', 'pseudogene_attribute', 'snoRNA_gene', 'pseudogenic_transcript']
-                possible_types = ['gene', 'exon', 'mRNA', 'ncRNA', 'piRNA', 'lincRNA', 'miRNA',
-                                  'pre_miRNA', 'snoRNA', 'lnc_RNA', 'tRNA', 'snRNA', 'rRNA',
-                                  'antisense_RNA', 'C_gene_segment', 'V_gene_segment',
-                                  'pseudogene_attribute', 'snoRNA_gene', 'pseudogenic_transcript']
-                gene_id = ''
-
-                if line.startswith('#!'):
-                    header_columns = line.split()
-                    if line.startswith('#!assembly'):
-                        assembly = header_columns[1]
-
-                    elif line.startswith('#!data-source '):
-                        data_provider = header_columns[1]
-                        if data_provider == 'FlyBase':
-                            data_provider = 'FB'
-                        if data_provider == 'WormBase':
-                            data_provider = 'WB'
-                        if data_provider == 'RAT':
-                            data_provider = 'RGD'
-                elif line.startswith('##FASTA'):
-                    break
-                elif line.startswith('#'):
-                    continue
+        transcript_maps = []
+        gene_maps = []
+        exon_maps = []
+        counter = 0
+
+        gff3_file = GFF3File(filepath)
+        for columns, attributes in gff3_file.get_features(self.feature_types):
+            counter = counter + 1
+
+            data_source = gff3_file.directives.get('data-source', '')
+            data_provider = self.data_source_providers.get(data_source, data_source)
+            assembly = gff3_file.directives.get('assembly') or 'assembly_unlabeled_in_gff3_header'
+
+            gff3_id = attributes.get('ID', '')
+            if data_provider == 'WB' and ":" in gff3_id:
+                gff3_id = gff3_id.split(":")[1]
+            parent = attributes.get('Parent', '')
+            if data_provider == 'WB' and ":" in parent:
+                parent = parent.split(":")[1]
+            synonym = ''
+            transcript_id = attributes.get('transcript_id')
+            if transcript_id is not None and (transcript_id.startswith("FB:") or data_provider == 'MGI'):
+                synonym = gff3_id
+                if ":" in transcript_id and data_provider == 'MGI':
+                    gff3_id = transcript_id.split(":")[1]
                 else:
-                    columns = re.split(r'\t', line)
-                    feature_type_name = columns[2].strip()
-                    if feature_type_name in possible_types:
-                        column8 = columns[8]
-                        notes = "_".join(column8.split())
-                        kvpairs = re.split(';', notes)
-                        if kvpairs is not None:
-                            for pair in kvpairs:
-                                if "=" in pair:
-                                    key = pair.split("=")[0]
-                                    value = pair.split("=")[1]
-                                    if key == 'ID':
-                                        if data_provider == 'WB':
-                                            if ":" in value:
-                                                gff3_id = value.split(":")[1]
-                                            else:
-                                                gff3_id = value
-                                        else:
-                                            gff3_id = value
-                                    if key == 'gene_id':
-                                        gene_id = value
-                                    if key == 'Parent':
-                                        if data_provider == 'WB':
-                                            parent = value.split(":")[1]
-                                        else:
-                                            parent = value
-                                    if key == 'Name':
-                                        name = value
-                                    if key == 'transcript_id':
-                                        if value.startswith("FB:") or data_provider == 'MGI':
-                                            synonym = gff3_id
-                                            if ":" in value and data_provider == 'MGI':
-                                                gff3_id = value.split(":")[1]
-                                            else:
-                                                gff3_id = value
-                                    if key == 'curie':
-                                        curie = value
-
-                                if self.test_object.using_test_data() is True:
-
-                                    is_it_test_entry = self.test_object.check_for_test_id_entry(curie)
-
-                                    if is_it_test_entry is False:
-                                        is_it_test_entry = self.test_object.check_for_test_id_entry(parent)
-                                        if is_it_test_entry is False:
-                                            is_it_test_entry = self.test_object.check_for_test_id_entry(gene_id)
-
-                                            if is_it_test_entry is True:
-                                                counter = counter - 1
-                                            continue
-                        if feature_type_name in transcript_types:
-                            transcript_map.update({'curie': curie})
-                            transcript_map.update({'parentId': parent})
-                            transcript_map.update({'gff3ID': gff3_id})
-                            transcript_map.update({'genomicLocationUUID': str(uuid.uuid4())})
-                            transcript_map.update({'chromosomeNumber': columns[0]})
-                            transcript_map.update({'featureType': feature_type_name})
-                            transcript_map.update({'start': columns[3]})
-                            transcript_map.update({'dataProvider': data_provider})
-                            transcript_map.update({'end': columns[4]})
-                            transcript_map.update({'assembly': assembly})
-                            transcript_map.update({'dataProvider': data_provider})
-                            transcript_map.update({'name': name})
-                            transcript_map.update({'synonym': synonym})
-                            if assembly is None:
-                                assembly = 'assembly_unlabeled_in_gff3_header'
-                                transcript_map.update({'assembly': assembly})
-                            transcript_maps.append(transcript_map)
-
-                        elif feature_type_name == 'gene':
-                            gene_map.update({'curie': curie})
-                            gene_map.update({'parentId': parent})
-                            gene_map.update({'gff3ID': gff3_id})
-                            gene_map.update({'synonym': synonym})
-                            gene_maps.append(gene_map)
-                        elif feature_type_name == 'exon':
-                            exon_map.update({'parentId': parent})
-                            exon_map.update({'gff3ID': str(uuid.uuid4())})
-                            exon_map.update({'genomicLocationUUID': str(uuid.uuid4())})
-                            exon_map.update({'chromosomeNumber': columns[0]})
-                            exon_map.update({'featureType': feature_type_name})
-                            exon_map.update({'start': columns[3]})
-                            exon_map.update({'dataProvider': data_provider})
-                            exon_map.update({'end': columns[4]})
-                            exon_map.update({'assembly': assembly})
-                            exon_map.update({'dataProvider': data_provider})
-                            exon_map.update({'name': name})
-                            exon_map.update({'synonym': synonym})
-                            if assembly is None or assembly == '':
-                                assembly = 'assembly_unlabeled_in_gff3_header'
-                                exon_map.update({'assembly': assembly})
-                                transcript_map.update({'assembly': assembly})
-                            exon_maps.append(exon_map)
-                        else:
-                            continue
-
-                if counter == batch_size:
-                    counter = 0
-
-                    yield [gene_maps,
-                           transcript_maps,
-                           transcript_maps,
-                           transcript_maps,
-                           exon_maps,
-                           exon_maps]
-                    transcript_maps = []
-                    gene_maps = []
-                    exon_maps = []
-
-            if counter > 0:
+                    gff3_id = transcript_id
+            curie = attributes.get('curie', '')
+            name = attributes.get('Name', '')
+
+            feature_type_name = columns[2].strip()
+            if feature_type_name in self.transcript_types:
+                transcript_maps.append({
+                    'curie': curie,
+                    'parentId': parent,
+                    'gff3ID': gff3_id,
+                    'genomicLocationUUID': ETLHelper.get_uuid(
+                        'TranscriptGenomicLocation', gff3_id, columns[0], columns[3], columns[4], assembly),
+                    'chromosomeNumber': columns[0],
+                    'featureType': feature_type_name,
+                    'start': columns[3],
+                    'end': columns[4],
+                    'assembly': assembly,
+                    'dataProvider': data_provider,
+                    'name': name,
+                    'synonym': synonym})
+            elif feature_type_name == 'gene':
+                gene_maps.append({
+                    'curie': curie,
+                    'parentId': parent,
+                    'gff3ID': gff3_id,
+                    'synonym': synonym})
+            else:
+                exon_maps.append({
+                    'parentId': parent,
+                    'gff3ID': ETLHelper.get_uuid(
+                        'Exon', parent, columns[0], columns[3], columns[4], columns[6]),
+                    'genomicLocationUUID': ETLHelper.get_uuid(
+                        'ExonGenomicLocation', parent, columns[0], columns[3], columns[4], columns[6]),
+                    'chromosomeNumber': columns[0],
+                    'featureType': feature_type_name,
+                    'start': columns[3],
+                    'end': columns[4],
+                    'assembly': assembly,
+                    'dataProvider': data_provider,
+                    'name': name,
+                    'synonym': synonym})
+
+            if counter == batch_size:
+                counter = 0
+
+                GenomicIntervalIndex.add('Transcript', [(transcript['curie'], transcript['assembly'],
+                                                         transcript['chromosomeNumber'], transcript['start'],
+                                                         transcript['end'])
+                                                        for transcript in transcript_maps])
                 yield [gene_maps,
                        transcript_maps,
                        transcript_maps,
                        transcript_maps,
                        exon_maps,
                        exon_maps]
+                transcript_maps = []
+                gene_maps = []
+                exon_maps = []
+
+        if counter > 0:
+            GenomicIntervalIndex.add('Transcript', [(transcript['curie'], transcript['assembly'],
+                                                     transcript['chromosomeNumber'], transcript['start'],
+                                                     transcript['end'])
+                                                    for transcript in transcript_maps])
+            yield [gene_maps,
+                   transcript_maps,
+                   transcript_maps,
+                   transcript_maps,
+                   exon_maps,
+                   exon_maps]
@@ -2,14 +2,13 @@
 
 import logging
 import multiprocessing
-import uuid
+
+import numpy as np
 
 from etl import ETL
-from etl.helpers import ETLHelper, AssemblySequenceHelper
+from etl.helpers import ETLHelper, AssemblySequenceHelper, GenomicIntervalIndex
 from files import JSONFile
 from transactors import CSVTransactor, Neo4jTransactor
-from data_manager import DataFileManager
-from loader_common import ContextInfo
 
 
 class VariationETL(ETL):
@@ -52,7 +51,7 @@ class VariationETL(ETL):
         LOAD CSV WITH HEADERS FROM \'file:///%s\' AS row
             MATCH (o:Variant {primaryKey:row.variantId})
             MATCH (s:SOTerm {primaryKey:row.soTermId})
-            CREATE (o)-[:VARIATION_TYPE]->(s)"""
+            MERGE (o)-[:VARIATION_TYPE]->(s)"""
 
     genomic_locations_query_template = """
         USING PERIODIC COMMIT %s
@@ -63,18 +62,19 @@ class VariationETL(ETL):
             MERGE (a:Assembly {primaryKey:row.assembly})
              ON CREATE SET a.dataProvider = row.dataProvider
 
-            CREATE (o)-[gchrm:LOCATED_ON]->(chrm)
+            // A variant of several alleles has a row per allele, with the same location.
+            MERGE (o)-[gchrm:LOCATED_ON]->(chrm)
 
-            CREATE (gchrmn:GenomicLocation {primaryKey:row.uuid})
-              SET gchrmn.start = apoc.number.parseInt(row.start),
+            MERGE (gchrmn:GenomicLocation {primaryKey:row.uuid})
+              ON CREATE SET gchrmn.start = apoc.number.parseInt(row.start),
                 gchrmn.end = apoc.number.parseInt(row.end),
                 gchrmn.assembly = row.assembly,
                 gchrmn.strand = row.strand,
                 gchrmn.chromosome = row.chromosome
 
-            CREATE (o)-[of:ASSOCIATION]->(gchrmn)
-            CREATE (gchrmn)-[ofc:ASSOCIATION]->(chrm)
-            CREATE (gchrmn)-[ao:ASSOCIATION]->(a)
+            MERGE (o)-[of:ASSOCIATION]->(gchrmn)
+            MERGE (gchrmn)-[ofc:ASSOCIATION]->(chrm)
+            MERGE (gchrmn)-[ao:ASSOCIATION]->(a)
     """
 
     xrefs_query_template = """
@@ -85,6 +85,15 @@ class VariationETL(ETL):
             MATCH (o:Variant {primaryKey:row.dataId})
     """ + ETLHelper.get_cypher_xref_text()
 
+    # The change part of the HGVS name of each variant type, see get_hgvs_nomenclature.
+    hgvs_change_templates = {
+        'SO:1000002': '{start}{ref}>{alt}',  # point mutation
+        'SO:1000008': '{start}{ref}>{alt}',  # substitution
+        'SO:0000667': '{start}_{end}ins{alt}',  # insertion
+        'SO:0000159': '{start}_{end}del',  # deletion
+        'SO:0002007': '{start}_{end}delins{alt}',  # MNV
+        'SO:1000032': '{start}_{end}delins{alt}'}  # DELIN
+
     def __init__(self, config):
         """Initialise object."""
         super().__init__()
@@ -140,48 +149,98 @@ class VariationETL(ETL):
                               end_position, reference_sequence, variant_sequence,
                               assembly, chromosome):
         """Get HGVS nomenclature."""
-        if start_position is None:
-            start_position_str = ""
-        else:
-            start_position_str = str(start_position)
-
-        if end_position is None:
-            end_position_str = ""
-        else:
-            end_position_str = str(end_position)
-
-        if variant_sequence is None:
-            variant_sequence_str = ""
-        else:
-            variant_sequence_str = variant_sequence
-
-        if reference_sequence is None:
-            reference_sequence_str = ""
-        else:
-            reference_sequence_str = reference_sequence
-
-        hgvs_nomenclature = refseq_id.split(":")[1] + ':g.' + start_position_str
-        hgvs_synonym = '('+assembly+')' + chromosome + ':' + start_position_str
-
-        if variant_type in ['SO:1000002', 'SO:1000008']:  # point mutation/substitution
-            hgvs_nomenclature += reference_sequence_str + ">" + variant_sequence_str
-            hgvs_synonym += reference_sequence_str + ">" + variant_sequence_str
-        elif variant_type == "SO:0000667":  # insertion
-            hgvs_nomenclature += '_' + end_position_str + 'ins' + variant_sequence_str
-            hgvs_synonym += '_' + end_position_str + 'ins' + variant_sequence_str
-        elif variant_type == "SO:0000159":  # deletion
-            hgvs_nomenclature += '_' + end_position_str + 'del'
-            hgvs_synonym += '_' + end_position_str + 'del'
-        elif variant_type == "SO:0002007":  # MNV
-            hgvs_nomenclature += '_' + end_position_str + 'delins' + variant_sequence_str
-            hgvs_synonym += '_' + end_position_str + 'delins' + variant_sequence_str
-        elif variant_type == "SO:1000032":  # DELIN
-            hgvs_nomenclature += '_' + end_position_str + 'delins' + variant_sequence_str
-            hgvs_synonym += '_' + end_position_str + 'delins' + variant_sequence_str
-        else:
-            hgvs_nomenclature = ''
-            hgvs_synonym = ''
-        return hgvs_nomenclature, hgvs_synonym
+        change_template = self.hgvs_change_templates.get(variant_type)
+        if change_template is None:
+            return '', ''
+
+        change = change_template.format(start='' if start_position is None else start_position,
+                                        end='' if end_position is None else end_position,
+                                        ref='' if reference_sequence is None else reference_sequence,
+                                        alt='' if variant_sequence is None else variant_sequence)
+        return refseq_id.split(":")[1] + ':g.' + change, '(' + assembly + ')' + chromosome + ':' + change
+
+    def get_variant_batch(self, allele_records, assemblies):
+        """Get the chromosome, sequences and HGVS names of each of a batch of variants.
+
+        The batch is read into columns, the coordinates of the reference
+        sequences and flanks computed on whole columns, and the sequences of
+        each assembly fetched in one call, before the rows are built.
+        """
+
+        padding_width = 500
+
+        chromosomes = np.array([allele_record["chromosome"][3:] if allele_record["chromosome"].startswith("chr")
+                                else allele_record["chromosome"]
+                                for allele_record in allele_records], dtype=object)
+        assembly_names = np.array([allele_record["assembly"] for allele_record in allele_records], dtype=object)
+        so_term_ids = np.array([allele_record.get('type') for allele_record in allele_records], dtype=object)
+        located = np.array([allele_record.get('start') != "" and allele_record.get('end') != ""
+                            for allele_record in allele_records], dtype=bool)
+        firsts = np.array([allele_record.get('start') if is_located else 0
+                           for allele_record, is_located in zip(allele_records, located)], dtype=np.int64)
+        seconds = np.array([allele_record.get('end') if is_located else 0
+                            for allele_record, is_located in zip(allele_records, located)], dtype=np.int64)
+
+        starts = np.minimum(firsts, seconds)
+        ends = np.maximum(firsts, seconds)
+        not_insertion = so_term_ids != "SO:0000667"
+        has_reference = located & not_insertion & (chromosomes != "Unmapped_Scaffold_8_D1580_D1567")
+        # The flanks of anything but an insertion leave a base on either side.
+        flank_starts = starts - not_insertion
+        flank_ends = ends + not_insertion
+
+        reference_sequences = ["" if allele_record.get('genomicReferenceSequence') == 'N/A'
+                               else allele_record.get('genomicReferenceSequence')
+                               for allele_record in allele_records]
+        padding_lefts = [""] * len(allele_records)
+        padding_rights = [""] * len(allele_records)
+        for assembly in dict.fromkeys(assembly_names[located].tolist()):
+            if assembly not in assemblies:
+                self.logger.info(assembly)
+                assemblies[assembly] = AssemblySequenceHelper(assembly)
+
+            in_assembly = located & (assembly_names == assembly)
+            reference_rows = np.flatnonzero(in_assembly & has_reference)
+            flank_rows = np.flatnonzero(in_assembly)
+            sequences = assemblies[assembly].get_sequences(
+                np.concatenate([chromosomes[reference_rows], chromosomes[flank_rows], chromosomes[flank_rows]]).tolist(),
+                np.concatenate([starts[reference_rows],
+                                np.maximum(flank_starts[flank_rows] - padding_width, 1),
+                                flank_ends[flank_rows]]),
+                np.concatenate([ends[reference_rows],
+                                flank_starts[flank_rows],
+                                flank_ends[flank_rows] + padding_width]))
+
+            reference_rows = reference_rows.tolist()
+            flank_rows = flank_rows.tolist()
+            for column, column_rows, column_sequences in [
+                    (reference_sequences, reference_rows, sequences[:len(reference_rows)]),
+                    (padding_lefts, flank_rows, sequences[len(reference_rows):len(reference_rows) + len(flank_rows)]),
+                    (padding_rights, flank_rows, sequences[len(reference_rows) + len(flank_rows):])]:
+                for row, sequence in zip(column_rows, column_sequences):
+                    column[row] = sequence
+
+        chromosomes = chromosomes.tolist()
+        variant_sequences = ["" if allele_record.get('genomicVariantSequence') == 'N/A'
+                             else allele_record.get('genomicVariantSequence')
+                             for allele_record in allele_records]
+        hgvs_names = [self.get_hgvs_nomenclature(allele_record.get('sequenceOfReferenceAccessionNumber'),
+                                                 allele_record.get('type'),
+                                                 allele_record.get('start'),
+                                                 allele_record.get('end'),
+                                                 reference_sequence,
+                                                 variant_sequence,
+                                                 allele_record.get('assembly'),
+                                                 chromosome)
+                      for allele_record, reference_sequence, variant_sequence, chromosome
+                      in zip(allele_records, reference_sequences, variant_sequences, chromosomes)]
+
+        return [(chromosome, reference_sequence, variant_sequence, padding_left, padding_right,
+                 hgvs_nomenclature, hgvs_synonym)
+                for chromosome, reference_sequence, variant_sequence, padding_left, padding_right,
+                (hgvs_nomenclature, hgvs_synonym)
+                in zip(chromosomes, reference_sequences, variant_sequences, padding_lefts, padding_rights,
+                       hgvs_names)]
 
     def get_generators(self, variant_data, batch_size):  # noqa
         """Get Generators."""
@@ -202,64 +261,13 @@ class VariationETL(ETL):
             release = variant_data['metaData']['release']
 
         assemblies = {}
-        for allele_record in variant_data['data']:
-            chromosome = allele_record["chromosome"]
-            if chromosome.startswith("chr"):
-                chromosome_str = chromosome[3:]
-            else:
-                chromosome_str = chromosome
+        records = variant_data['data']
+        for index, allele_record in enumerate(records):
+            if index % batch_size == 0:
+                variant_batch = self.get_variant_batch(records[index:index + batch_size], assemblies)
+            (chromosome_str, genomic_reference_sequence, genomic_variant_sequence, padding_left, padding_right,
+             hgvs_nomenclature, hgvs_synonym) = variant_batch[index % batch_size]
 
-            assembly = allele_record["assembly"]
-
-            if assembly not in assemblies:
-                self.logger.info(assembly)
-                context_info = ContextInfo()
-                data_manager = DataFileManager(context_info.config_file_location)
-                assemblies[assembly] = AssemblySequenceHelper(assembly, data_manager)
-
-            so_term_id = allele_record.get('type')
-            genomic_reference_sequence = allele_record.get('genomicReferenceSequence')
-            genomic_variant_sequence = allele_record.get('genomicVariantSequence')
-
-            if genomic_reference_sequence == 'N/A':
-                genomic_reference_sequence = ""
-            if genomic_variant_sequence == 'N/A':
-                genomic_variant_sequence = ""
-
-            padding_left = ""
-            padding_right = ""
-            if allele_record.get('start') != "" and allele_record.get('end') != "":
-
-                # not insertion
-                if so_term_id != "SO:0000667" and chromosome_str != "Unmapped_Scaffold_8_D1580_D1567":
-                    genomic_reference_sequence = assemblies[assembly].get_sequence(
-                        chromosome_str,
-                        allele_record.get('start'),
-                        allele_record.get('end'))
-
-                if allele_record.get('start') < allele_record.get('end'):
-                    start = allele_record.get('start')
-                    end = allele_record.get('end')
-                else:
-                    start = allele_record.get('end')
-                    end = allele_record.get('start')
-
-                padding_width = 500
-                if so_term_id != "SO:0000667":  # not insertion
-                    start = start - 1
-                    end = end + 1
-
-                left_padding_start = start - padding_width
-                if left_padding_start < 1:
-                    left_padding_start = 1
-
-                padding_left = assemblies[assembly].get_sequence(chromosome_str,
-                                                                 left_padding_start,
-                                                                 start)
-                right_padding_end = end + padding_width
-                padding_right = assemblies[assembly].get_sequence(chromosome_str,
-                                                                  end,
-                                                                  right_padding_end)
             counter = counter + 1
             global_id = allele_record.get('alleleId')
             mod_global_cross_ref_id = ""
@@ -300,16 +308,6 @@ class VariationETL(ETL):
                                                              in ['SO:1000002', 'SO:1000008']):
                     self.logger.debug("%s genomicVariantSequence", allele_record.get('alleleId'))
 
-            hgvs_nomenclature, hgvs_synonym = self.get_hgvs_nomenclature(
-                allele_record.get('sequenceOfReferenceAccessionNumber'),
-                allele_record.get('type'),
-                allele_record.get('start'),
-                allele_record.get('end'),
-                genomic_reference_sequence,
-                genomic_variant_sequence,
-                allele_record.get('assembly'),
-                chromosome_str)
-
             if (genomic_reference_sequence is not None and len(genomic_reference_sequence) > 30000) \
                     or (genomic_variant_sequence is not None and len(genomic_variant_sequence)) > 30000:
                 self.logger.debug("%s has too long of a sequence potentionally",
@@ -340,7 +338,9 @@ class VariationETL(ETL):
                     "chromosome": chromosome_str,
                     "start": allele_record.get('start'),
                     "end": allele_record.get('end'),
-                    "uuid": str(uuid.uuid4()),
+                    "uuid": ETLHelper.get_uuid('VariantGenomicLocation', hgvs_nomenclature,
+                                               allele_record.get('assembly'), chromosome_str,
+                                               allele_record.get('start'), allele_record.get('end')),
                     "dataProvider": self.data_provider}
 
                 variant_so_term = {
@@ -352,6 +352,9 @@ class VariationETL(ETL):
                 variants.append(variant_dataset)
 
             if counter == batch_size:
+                GenomicIntervalIndex.add('Variant', [(location['variantId'], location['assembly'],
+                                                      location['chromosome'], location['start'], location['end'])
+                                                     for location in variant_genomic_locations])
                 yield [variants, variant_genomic_locations, variant_so_terms, cross_references]
                 variants = []
                 variant_genomic_locations = []
@@ -359,4 +362,7 @@ class VariationETL(ETL):
                 cross_references = []
 
         if counter > 0:
+            GenomicIntervalIndex.add('Variant', [(location['variantId'], location['assembly'],
+                                                  location['chromosome'], location['start'], location['end'])
+                                                 for location in variant_genomic_locations])
             yield [variants, variant_genomic_locations, variant_so_terms, cross_references]
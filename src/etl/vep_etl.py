@@ -40,6 +40,9 @@ class VEPETL(ETL):
 
                    """
 
+    # PolyPhen and SIFT values, e.g. probably_damaging(0.998)
+    prot_func_regex = re.compile(r'^([^\(]+)\(([\d\.]+)\)')
+
     def __init__(self, config):
         """Initialise object."""
         super().__init__()
@@ -67,8 +70,12 @@ class VEPETL(ETL):
              "vep_gene_data_" + sub_type.get_data_provider() + ".csv"]
         ]
 
+        batch_size = self.data_type_config.get_generator_batch_size()
+        # The cores are shared by the processes of all sub types.
+        processes = max(1, multiprocessing.cpu_count() // len(self.data_type_config.get_sub_type_objects()))
+
         # Obtain the generator
-        generators = self.get_generators(filepath)
+        generators = self.get_generators(filepath, batch_size, processes)
 
         query_and_file_list = self.process_query_params(query_template_list)
         CSVTransactor.save_file_static(generators, query_and_file_list)
@@ -76,40 +83,32 @@ class VEPETL(ETL):
         self.error_messages("VEP-{}: ".format(sub_type.get_data_provider()))
 
     @staticmethod
-    def get_generators(filepath):
-        """Get Generators"""
+    def parse_lines(lines):
+        """Parse VEP output lines, run in the processes of TXTFile.get_parsed_batches."""
+        prot_func_regex = VEPETL.prot_func_regex
 
-        data = TXTFile(filepath).get_data()
         vep_maps = []
-        impact = ''
-        pph_prediction = ''
-        pph_score = ''
-        sift_prediction = ''
-        sift_score = ''
-
-        prot_func_regex = re.compile(r'^([^\(]+)\(([\d\.]+)\)')
-
-        for line in data:
+        for line in lines:
             columns = line.split()
-            if columns[0].startswith('#'):
+            if not columns or columns[0].startswith('#'):
                 continue
 
-            notes = columns[13]
-            kvpairs = notes.split(";")
-            if kvpairs is not None:
-                for pair in kvpairs:
-                    key = pair.split("=")[0]
-                    value = pair.split("=")[1]
-                    if key == 'IMPACT':
-                        impact = value
-                    elif key == 'PolyPhen':
-                        m = prot_func_regex.match(value)
-                        pph_prediction = m.group(1)
-                        pph_score = m.group(2)
-                    elif key == 'SIFT':
-                        m = prot_func_regex.match(value)
-                        sift_prediction = m.group(1)
-                        sift_score = m.group(2)
+            notes = dict(pair.partition("=")[::2] for pair in columns[13].split(";"))
+            impact = notes.get('IMPACT', '')
+
+            pph_prediction = ''
+            pph_score = ''
+            if 'PolyPhen' in notes:
+                m = prot_func_regex.match(notes['PolyPhen'])
+                pph_prediction = m.group(1)
+                pph_score = m.group(2)
+
+            sift_prediction = ''
+            sift_score = ''
+            if 'SIFT' in notes:
+                m = prot_func_regex.match(notes['SIFT'])
+                sift_prediction = m.group(1)
+                sift_score = m.group(2)
 
             if columns[3].startswith('Gene:'):
                 gene_id = columns[3].lstrip('Gene:')
@@ -128,6 +127,13 @@ class VEPETL(ETL):
                           "siftPrediction": sift_prediction,
                           "siftScore": sift_score
                           }
+
             vep_maps.append(vep_result)
 
-        yield [vep_maps]
+        return vep_maps
+
+    @staticmethod
+    def get_generators(filepath, batch_size, processes):
+        """Get Generators"""
+        for vep_maps in TXTFile(filepath).get_parsed_batches(VEPETL.parse_lines, batch_size, processes):
+            yield [vep_maps]
@@ -2,9 +2,9 @@
 
 import logging
 import multiprocessing
-import uuid
 import re
 from etl import ETL
+from etl.helpers import ETLHelper
 from files import TXTFile
 
 from transactors import CSVTransactor
@@ -63,6 +63,9 @@ class VEPTranscriptETL(ETL):
 
             """
 
+    # PolyPhen and SIFT values, e.g. probably_damaging(0.998)
+    prot_func_regex = re.compile(r'^([^\(]+)\(([\d\.]+)\)')
+
     def __init__(self, config):
         """Initialise object."""
         super().__init__()
@@ -90,15 +93,20 @@ class VEPTranscriptETL(ETL):
              "vep_transcript_data_" + sub_type.get_data_provider() + ".csv"]
         ]
 
+        batch_size = self.data_type_config.get_generator_batch_size()
+        # The cores are shared by the processes of all sub types.
+        processes = max(1, multiprocessing.cpu_count() // len(self.data_type_config.get_sub_type_objects()))
+
         # Obtain the generator
-        generators = self.get_generators(filepath)
+        generators = self.get_generators(filepath, batch_size, processes)
 
         query_and_file_list = self.process_query_params(query_template_list)
         CSVTransactor.save_file_static(generators, query_and_file_list)
         Neo4jTransactor.execute_query_batch(query_and_file_list)
         self.error_messages("VEPTran-{}: ".format(sub_type.get_data_provider()))
 
-    def return_range_split_values(self, column):
+    @staticmethod
+    def return_range_split_values(column):
         """Get range vaues."""
         if "-" in column:
             if column == '-':
@@ -124,79 +132,52 @@ class VEPTranscriptETL(ETL):
             ranger = column
         return start, end, ranger
 
-    def get_generators(self, filepath):
-        """Get Generators."""
-        data = TXTFile(filepath).get_data()
+    @staticmethod
+    def parse_lines(lines):
+        """Parse VEP output lines, run in the processes of TXTFile.get_parsed_batches."""
+        return_range_split_values = VEPTranscriptETL.return_range_split_values
+        prot_func_regex = VEPTranscriptETL.prot_func_regex
+
         vep_maps = []
+        for line in lines:
+            columns = line.split()
+            if not columns or columns[0].startswith('#'):
+                continue
 
-        prot_func_regex = re.compile(r'^([^\(]+)\(([\d\.]+)\)')
+            notes = dict(pair.partition("=")[::2] for pair in columns[13].split(";"))
 
-        for line in data:
-            impact = ''
-            hgvs_p = ''
-            hgvs_c = ''
-            hgvs_g = ''
             pph_prediction = ''
             pph_score = ''
+            if 'PolyPhen' in notes:
+                m = prot_func_regex.match(notes['PolyPhen'])
+                pph_prediction = m.group(1)
+                pph_score = m.group(2)
+
             sift_prediction = ''
             sift_score = ''
-
-            columns = line.split()
-            if columns[0].startswith('#'):
-                continue
-
-            notes = columns[13]
-            kvpairs = notes.split(";")
-            if kvpairs is not None:
-                for pair in kvpairs:
-                    key = pair.split("=")[0]
-                    value = pair.split("=")[1]
-                    if key == 'IMPACT':
-                        impact = value
-                    elif key == 'HGVSp':
-                        hgvs_p = value
-                    elif key == 'HGVSc':
-                        hgvs_c = value
-                    elif key == 'HGVSg':
-                        hgvs_g = value
-                    elif key == 'PolyPhen':
-                        m = prot_func_regex.match(value)
-                        pph_prediction = m.group(1)
-                        pph_score = m.group(2)
-                    elif key == 'SIFT':
-                        m = prot_func_regex.match(value)
-                        sift_prediction = m.group(1)
-                        sift_score = m.group(2)
+            if 'SIFT' in notes:
+                m = prot_func_regex.match(notes['SIFT'])
+                sift_prediction = m.group(1)
+                sift_score = m.group(2)
 
             if columns[3].startswith('Gene:'):
                 gene_id = columns[3].lstrip('Gene:')
             else:
                 gene_id = columns[3]
 
-            cdna_start_position, cdna_end_position, cdna_range = self.return_range_split_values(
-                columns[7]
-            )
-            cds_start_position, cds_end_position, cds_range = self.return_range_split_values(
-                columns[8]
-            )
-            protein_start_position, protein_end_position, protein_range = self.return_range_split_values(
-                columns[9]
-            )
-
-            amino_acid_reference, amino_acid_variation, amino_acid_change = self.return_range_split_values(
-                columns[10]
-            )
-            codon_reference, codon_variation, codon_change = self.return_range_split_values(
-                columns[11]
-            )
+            cdna_start_position, cdna_end_position, cdna_range = return_range_split_values(columns[7])
+            cds_start_position, cds_end_position, cds_range = return_range_split_values(columns[8])
+            protein_start_position, protein_end_position, protein_range = return_range_split_values(columns[9])
+            amino_acid_reference, amino_acid_variation, amino_acid_change = return_range_split_values(columns[10])
+            codon_reference, codon_variation, codon_change = return_range_split_values(columns[11])
 
             vep_result = {"hgvsNomenclature": columns[0],
                           "transcriptLevelConsequence": columns[6],
-                          "primaryKey": str(uuid.uuid4()),
-                          "impact": impact,
-                          "hgvsProteinNomenclature": hgvs_p,
-                          "hgvsCodingNomenclature": hgvs_c,
-                          "hgvsVEPGeneNomenclature": hgvs_g,
+                          "primaryKey": ETLHelper.get_uuid('TranscriptLevelConsequence', line),
+                          "impact": notes.get('IMPACT', ''),
+                          "hgvsProteinNomenclature": notes.get('HGVSp', ''),
+                          "hgvsCodingNomenclature": notes.get('HGVSc', ''),
+                          "hgvsVEPGeneNomenclature": notes.get('HGVSg', ''),
                           "gene": gene_id,
                           "transcriptId": columns[4],
                           "aminoAcidReference": amino_acid_reference,
@@ -222,4 +203,9 @@ class VEPTranscriptETL(ETL):
 
             vep_maps.append(vep_result)
 
-        yield [vep_maps]
+        return vep_maps
+
+    def get_generators(self, filepath, batch_size, processes):
+        """Get Generators."""
+        for vep_maps in TXTFile(filepath).get_parsed_batches(self.parse_lines, batch_size, processes):
+            yield [vep_maps]
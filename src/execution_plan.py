@@ -0,0 +1,242 @@
+"""Dry run planning of a load.
+
+Resolves the config through the submission system and reports what each ETL
+would read and write, with estimates from the previous run, without
+connecting to Neo4j.
+"""
+
+import ast
+import inspect
+import json
+import logging
+import os
+import sys
+import time
+
+from run_metrics import RunMetrics
+
+
+class ExecutionPlan():
+    """Execution Plan"""
+
+    logger = logging.getLogger(__name__)
+
+    # Written at the end of every load and read back when planning the next one.
+    metrics_file = RunMetrics.report_file
+    plan_file = 'tmp/execution_plan.json'
+
+    sub_type_placeholder = '<sub_type>'
+
+    def __init__(self, etl_groups, etl_dispatch, data_manager):
+        self.etl_groups = etl_groups
+        self.etl_dispatch = etl_dispatch
+        self.data_manager = data_manager
+        self.previous_metrics = self.load_previous_metrics()
+        self.plan = []
+
+    @classmethod
+    def load_previous_metrics(cls):
+        """Load the metrics of the previous run, or an empty dict if there was none"""
+
+        if not os.path.isfile(cls.metrics_file):
+            cls.logger.warning("No previous run metrics found at %s, no estimates will be made.",
+                               cls.metrics_file)
+            return {}
+
+        with open(cls.metrics_file, 'r') as metrics_file:
+            return json.load(metrics_file)
+
+    @classmethod
+    def _render_file_name(cls, node):
+        """Turn a CSV file name expression into a pattern, non literal parts become placeholders"""
+
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return node.value
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            return cls._render_file_name(node.left) + cls._render_file_name(node.right)
+        if isinstance(node, ast.JoinedStr):
+            return ''.join(cls._render_file_name(value) for value in node.values)
+        if isinstance(node, ast.FormattedValue):
+            return cls.sub_type_placeholder
+        return cls.sub_type_placeholder
+
+    @classmethod
+    def get_query_templates(cls, etl_class):
+        """Get the (query template name, CSV file name pattern) pairs an ETL runs.
+
+        These are read from the query lists in the ETL module, i.e. lists whose
+        first item is a *_template attribute and that contain a .csv file name.
+        """
+
+        tree = ast.parse(inspect.getsource(sys.modules[etl_class.__module__]))
+
+        query_templates = []
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.List) or not node.elts:
+                continue
+            template = node.elts[0]
+            if not isinstance(template, ast.Attribute) or not template.attr.endswith('template'):
+                continue
+            for element in node.elts[1:]:
+                file_name = cls._render_file_name(element)
+                if file_name.endswith('.csv'):
+                    if (template.attr, file_name) not in query_templates:
+                        query_templates.append((template.attr, file_name))
+                    break
+
+        return query_templates
+
+    @staticmethod
+    def get_input_files(config):
+        """Get the input files of a DataTypeConfig and whether they are already downloaded"""
+
+        input_files = []
+        for sub_type, _, temp_extracted_file in config.submission_system_data:
+            input_file = {'sub_type': sub_type,
+                          'filepath': None,
+                          'cached': False,
+                          'bytes': 0}
+            if temp_extracted_file is not None:
+                filepath = os.path.join('tmp', temp_extracted_file)
+                input_file['filepath'] = filepath
+                if os.path.isfile(filepath):
+                    input_file['cached'] = True
+                    input_file['bytes'] = os.path.getsize(filepath)
+            input_files.append(input_file)
+
+        return input_files
+
+    def _estimate(self, etl_name, input_bytes, csv_patterns, sub_types):
+        """Estimate runtime and CSV rows by scaling the previous run by input size"""
+
+        previous_bytes = self.previous_metrics.get('input_bytes', {}).get(etl_name)
+        previous_runtime = self.previous_metrics.get('etl_runtimes', {}).get(etl_name)
+        previous_rows = self.previous_metrics.get('csv_rows', {})
+
+        scale = 1.0
+        if previous_bytes and input_bytes:
+            scale = input_bytes / previous_bytes
+
+        runtime = None
+        if previous_runtime is not None:
+            runtime = previous_runtime * scale
+
+        rows = {}
+        for pattern in csv_patterns:
+            for sub_type in sub_types:
+                csv_name = pattern.replace(self.sub_type_placeholder, str(sub_type))
+                if csv_name in previous_rows and csv_name not in rows:
+                    rows[csv_name] = int(previous_rows[csv_name] * scale)
+
+        return runtime, rows
+
+    def build(self):
+        """Build the plan for every ETL group in load order"""
+
+        self.plan = []
+        for etl_group in self.etl_groups:
+            group_plan = {'group': etl_group, 'etls': [], 'estimated_runtime': None}
+            for etl_name in etl_group:
+                config = self.data_manager.get_config(etl_name)
+                if config is None:
+                    self.logger.debug("No Config found for: %s", etl_name)
+                    continue
+
+                etl_class = self.etl_dispatch[etl_name]
+                input_files = self.get_input_files(config)
+                input_bytes = sum(input_file['bytes'] for input_file in input_files)
+                query_templates = self.get_query_templates(etl_class)
+                runtime, rows = self._estimate(etl_name,
+                                               input_bytes,
+                                               [file_name for _, file_name in query_templates],
+                                               [input_file['sub_type'] for input_file in input_files])
+
+                group_plan['etls'].append({
+                    'etl': etl_name,
+                    'class': etl_class.__name__,
+                    'input_files': input_files,
+                    'input_bytes': input_bytes,
+                    'query_templates': query_templates,
+                    'estimated_runtime': runtime,
+                    'estimated_csv_rows': rows})
+
+                if runtime is not None:
+                    group_plan['estimated_runtime'] = max(group_plan['estimated_runtime'] or 0,
+                                                          runtime)
+
+            if group_plan['etls']:
+                self.plan.append(group_plan)
+
+        return self.plan
+
+    @staticmethod
+    def _format_time(seconds):
+        if seconds is None:
+            return 'unknown'
+        return time.strftime("%H:%M:%S", time.gmtime(seconds))
+
+    def log_plan(self):
+        """Log the plan in a human readable form"""
+
+        total_runtime = 0
+        total_rows = 0
+        missing_files = []
+        to_download = []
+
+        for group_plan in self.plan:
+            self.logger.info("ETL group: %s Estimated time: %s",
+                             group_plan['group'],
+                             self._format_time(group_plan['estimated_runtime']))
+            total_runtime += group_plan['estimated_runtime'] or 0
+            for etl_plan in group_plan['etls']:
+                self.logger.info("    %s (%s) Input: %s bytes Estimated time: %s",
+                                 etl_plan['etl'],
+                                 etl_plan['class'],
+                                 etl_plan['input_bytes'],
+                                 self._format_time(etl_plan['estimated_runtime']))
+                for input_file in etl_plan['input_files']:
+                    if input_file['filepath'] is None:
+                        state = 'NO FILE'
+                        missing_files.append((etl_plan['etl'], input_file['sub_type']))
+                    elif input_file['cached']:
+                        state = 'cached'
+                    else:
+                        state = 'download'
+                        to_download.append(input_file['filepath'])
+                    self.logger.info("        sub type: %s [%s] %s",
+                                     input_file['sub_type'],
+                                     state,
+                                     input_file['filepath'])
+                for template_name, file_name in etl_plan['query_templates']:
+                    self.logger.info("        query: %s -> %s", template_name, file_name)
+                for csv_name, rows in etl_plan['estimated_csv_rows'].items():
+                    self.logger.info("        estimated rows: %s %s", csv_name, rows)
+                    total_rows += rows
+
+        self.logger.info("Files to download: %s", len(to_download))
+        self.logger.info("Sub types without a file: %s", len(missing_files))
+        for etl_name, sub_type in missing_files:
+            self.logger.warning("    %s %s has no file", etl_name, sub_type)
+        self.logger.info("Estimated CSV rows: %s", total_rows)
+        self.logger.info("Estimated total time: %s",
+                         self._format_time(total_runtime) if self.previous_metrics else 'unknown')
+
+    def save(self):
+        """Write the plan as JSON"""
+
+        with open(self.plan_file, 'w') as plan_file:
+            json.dump(self.plan, plan_file, indent=4)
+        self.logger.info("Execution plan written to %s", self.plan_file)
+
+    @classmethod
+    def get_input_bytes(cls, etl_names, data_manager):
+        """Get the total size of the input files of each ETL"""
+
+        input_bytes = {}
+        for etl_name in etl_names:
+            config = data_manager.get_config(etl_name)
+            if config is not None:
+                input_bytes[etl_name] = sum(input_file['bytes']
+                                            for input_file in cls.get_input_files(config))
+
+        return input_bytes
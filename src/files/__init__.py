@@ -1,5 +1,6 @@
 from .csv_file import CSVFile
 from .txt_file import TXTFile
+from .gff3_file import GFF3File
 from .json_file import JSONFile
 from .s3_file import S3File
 from .tar_file import TARFile
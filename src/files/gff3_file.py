@@ -0,0 +1,56 @@
+"""GFF3 File"""
+
+import logging
+from urllib.parse import unquote
+
+
+class GFF3File():
+    """GFF3 File
+
+    Streams the features of a GFF3 file, stopping at its ##FASTA section.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, filename):
+        self.filename = filename
+        # The #! directives read so far, e.g. {'assembly': 'GRCm38', 'data-source': 'MGI'}.
+        self.directives = {}
+
+    @staticmethod
+    def get_attributes(column):
+        """Decode the attributes column, tag=value pairs separated by ';' with URL escaped values"""
+
+        attributes = {}
+        for pair in column.split(';'):
+            tag, separator, value = pair.partition('=')
+            if separator:
+                value = value.strip()
+                attributes[tag.strip()] = unquote(value) if '%' in value else value
+
+        return attributes
+
+    def get_features(self, feature_types):
+        """Yield the columns and attributes of each feature with a type in feature_types.
+
+        The directives before a feature are in self.directives when it is yielded.
+        """
+
+        self.logger.info("Loading gff3 data from %s...", self.filename)
+
+        with open(self.filename, 'r', encoding='utf-8') as file_handle:
+            for line in file_handle:
+                if line[0] == '#':
+                    if line.startswith('#!'):
+                        directive = line[2:].split()
+                        if directive:
+                            self.directives[directive[0]] = directive[1] if len(directive) > 1 else ''
+                    elif line.startswith('##FASTA'):
+                        break
+                    continue
+
+                columns = line.rstrip('\n').split('\t')
+                if len(columns) < 9 or columns[2].strip() not in feature_types:
+                    continue
+
+                yield columns, self.get_attributes(columns[8])
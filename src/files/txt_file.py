@@ -1,7 +1,22 @@
 """Text File"""
 
+import collections
 import logging
 import codecs
+import multiprocessing
+import os
+
+
+def parse_chunk(parse_lines, filename, start, end):
+    """Parse the lines between two byte offsets of a file, without their line ends"""
+
+    with open(filename, 'rb') as file_handle:
+        file_handle.seek(start)
+        lines = file_handle.read(end - start).decode('utf-8').split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    return parse_lines(lines)
+
 
 class TXTFile():
     """Text File"""
@@ -22,3 +37,50 @@ class TXTFile():
                 lines.append(line)
 
         return lines
+
+    def get_chunks(self, chunk_size):
+        """Get the (start, end) byte offsets of chunks of about chunk_size bytes, ending on a line end"""
+
+        size = os.path.getsize(self.filename)
+        chunks = []
+        with open(self.filename, 'rb') as file_handle:
+            start = 0
+            while start < size:
+                file_handle.seek(min(start + chunk_size, size))
+                file_handle.readline()
+                end = min(file_handle.tell(), size)
+                chunks.append((start, end))
+                start = end
+
+        return chunks
+
+    def get_parsed_batches(self, parse_lines, batch_size, processes, chunk_size=1 << 22):
+        """Yield the rows parse_lines returns for the lines of the file, in batches of batch_size.
+
+        The file is split into chunks, parsed in a pool of processes with at
+        most two chunks per process in flight, so memory stays bounded. The
+        rows come in file order. parse_lines gets a list of lines without their
+        line ends and must be picklable, e.g. a module function or staticmethod.
+        """
+
+        chunks = self.get_chunks(chunk_size)
+        self.logger.info("Parsing txt data from %s in %s chunks, %s processes...",
+                         self.filename, len(chunks), processes)
+
+        batch = []
+        with multiprocessing.Pool(processes) as pool:
+            pending = collections.deque()
+            next_chunk = 0
+            while next_chunk < len(chunks) or pending:
+                while next_chunk < len(chunks) and len(pending) < 2 * processes:
+                    start, end = chunks[next_chunk]
+                    pending.append(pool.apply_async(parse_chunk, (parse_lines, self.filename, start, end)))
+                    next_chunk += 1
+
+                batch.extend(pending.popleft().get())
+                while len(batch) >= batch_size:
+                    yield batch[:batch_size]
+                    batch = batch[batch_size:]
+
+        if batch:
+            yield batch
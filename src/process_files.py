@@ -0,0 +1,52 @@
+"""Process Files
+
+Data the forked loader processes share through the file system.
+
+Each process appends to its own file in a directory, named after its pid, so
+recording needs no locks or queues. The file is opened per write and closed
+straight away, since forked processes exit without flushing open files. A
+reader gets the lines of every process by reading back all the files.
+"""
+
+import glob
+import os
+import shutil
+
+
+class ProcessFiles():
+    """Process Files"""
+
+    @staticmethod
+    def remove(directory):
+        """Remove the files of every process, e.g. of a previous run"""
+
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+
+    @staticmethod
+    def append(directory, lines, suffix='.tsv'):
+        """Append lines, without their line ends, to the file of this process"""
+
+        if not lines:
+            return
+
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "%s%s" % (os.getpid(), suffix)), 'a', encoding='utf-8') as part_file:
+            part_file.write('\n'.join(lines) + '\n')
+
+    @staticmethod
+    def get_files(directory, suffix='.tsv'):
+        """Get the file names of the processes that appended to a directory, in a stable order"""
+
+        return sorted(glob.glob(os.path.join(directory, '*' + suffix)))
+
+    @classmethod
+    def read_lines(cls, directory, suffix='.tsv'):
+        """Yield the non empty lines of every process, without their line ends"""
+
+        for file_name in cls.get_files(directory, suffix):
+            with open(file_name, 'r', encoding='utf-8') as part_file:
+                for line in part_file:
+                    line = line.rstrip('\n')
+                    if line:
+                        yield line
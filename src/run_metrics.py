@@ -0,0 +1,223 @@
+"""Per ETL and per query metrics for a load.
+
+Every process appends its records as JSON lines to the process files under
+tmp/metrics. At the end of the load the records are merged into a JSON report
+and a Prometheus textfile.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import resource
+
+from process_files import ProcessFiles
+
+
+class RunMetrics():
+    """Run Metrics"""
+
+    logger = logging.getLogger(__name__)
+
+    metrics_dir = 'tmp/metrics'
+    report_file = 'tmp/run_metrics.json'
+    prometheus_file = 'tmp/run_metrics.prom'
+
+    # ETL name for records from this process. Set in the parent right before
+    # an ETL process is forked, so the ETL and its sub type processes inherit it.
+    etl_name = None
+
+    @classmethod
+    def reset(cls):
+        """Remove the records of a previous run"""
+
+        ProcessFiles.remove(cls.metrics_dir)
+
+    @classmethod
+    def set_etl(cls, etl_name):
+        """Set the ETL name records from this process (and its children) are filed under"""
+
+        cls.etl_name = etl_name
+
+    @classmethod
+    def record(cls, record_type, **fields):
+        """Append a record for this process"""
+
+        fields['type'] = record_type
+        if 'etl' not in fields:
+            fields['etl'] = cls.etl_name
+        ProcessFiles.append(cls.metrics_dir, [json.dumps(fields)], '.jsonl')
+
+    @classmethod
+    def record_peak_rss(cls):
+        """Record the peak resident set size of this process"""
+
+        # ru_maxrss is in kilobytes on Linux.
+        cls.record('process',
+                   process=multiprocessing.current_process().name,
+                   pid=os.getpid(),
+                   peak_rss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
+    @classmethod
+    def load_records(cls):
+        """Read the records of every process"""
+
+        return [json.loads(line) for line in ProcessFiles.read_lines(cls.metrics_dir, '.jsonl')]
+
+    @staticmethod
+    def _add(totals, key, record, fields):
+        entry = totals.setdefault(key, {})
+        for field in fields:
+            entry[field] = entry.get(field, 0) + (record.get(field) or 0)
+
+    @classmethod
+    def summarise(cls, records):
+        """Merge records into totals per ETL and per CSV file / query, and the runtime of each ETL"""
+
+        etls = {}
+        files = {}
+        processes = {}
+        etl_runtimes = {}
+
+        for record in records:
+            etl_name = record.get('etl') or 'unknown'
+            etl_totals = etls.setdefault(etl_name, {'parse_seconds': 0,
+                                                    'csv_rows': 0,
+                                                    'csv_bytes': 0,
+                                                    'queue_wait_seconds': 0,
+                                                    'query_seconds': 0,
+                                                    'nodes_created': 0,
+                                                    'relationships_created': 0,
+                                                    'peak_rss': 0})
+            if record['type'] == 'runtime':
+                etl_runtimes[etl_name] = record['seconds']
+            elif record['type'] == 'parse':
+                etl_totals['parse_seconds'] += record['seconds']
+            elif record['type'] == 'csv':
+                cls._add(files, record['file'], record, ['rows', 'bytes'])
+                files[record['file']]['etl'] = etl_name
+                etl_totals['csv_rows'] += record['rows']
+                etl_totals['csv_bytes'] += record['bytes']
+            elif record['type'] == 'query':
+                cls._add(files, record['file'], record, ['queue_wait_seconds',
+                                                         'query_seconds',
+                                                         'nodes_created',
+                                                         'relationships_created',
+                                                         'properties_set'])
+                files[record['file']]['etl'] = etl_name
+                etl_totals['queue_wait_seconds'] += record['queue_wait_seconds']
+                etl_totals['query_seconds'] += record['query_seconds']
+                etl_totals['nodes_created'] += record['nodes_created']
+                etl_totals['relationships_created'] += record['relationships_created']
+            elif record['type'] == 'process':
+                key = "%s-%s" % (record['process'], record['pid'])
+                processes[key] = {'etl': etl_name,
+                                  'peak_rss': max(record['peak_rss'],
+                                                  processes.get(key, {}).get('peak_rss', 0))}
+                etl_totals['peak_rss'] = max(etl_totals['peak_rss'], record['peak_rss'])
+
+        return etls, files, processes, etl_runtimes
+
+    @staticmethod
+    def summarise_lookup_errors(records):
+        """Merge the resource descriptor lookup error counts of every process.
+
+        Returns {label: {key: {'count': total, 'etls': [ETLs it was seen in]}}}
+        """
+
+        lookup_errors = {}
+        for record in records:
+            if record['type'] != 'lookup_errors':
+                continue
+            for label, counts in record['counts'].items():
+                for key, count in counts.items():
+                    entry = lookup_errors.setdefault(label, {}).setdefault(key, {'count': 0, 'etls': []})
+                    entry['count'] += count
+                    etl_name = record.get('etl') or 'unknown'
+                    if etl_name not in entry['etls']:
+                        entry['etls'].append(etl_name)
+
+        return lookup_errors
+
+    @classmethod
+    def log_lookup_errors(cls, lookup_errors):
+        """Log the merged lookup error counts, one line per key"""
+
+        for label, keys in sorted(lookup_errors.items()):
+            for key, entry in sorted(keys.items(), key=lambda item: -item[1]['count']):
+                cls.logger.critical("%s %s seen %s times in %s",
+                                    label, key, entry['count'], ', '.join(sorted(entry['etls'])))
+
+    @staticmethod
+    def _prometheus_lines(name, help_text, samples):
+        lines = ["# HELP agr_loader_%s %s" % (name, help_text),
+                 "# TYPE agr_loader_%s gauge" % name]
+        for labels, value in samples:
+            label_text = ','.join('%s="%s"' % (key, str(label).replace('"', '\\"'))
+                                  for key, label in labels.items())
+            lines.append("agr_loader_%s{%s} %s" % (name, label_text, value))
+        return lines
+
+    @classmethod
+    def save_report(cls, etl_group_runtimes, input_bytes):
+        """Write the JSON report and Prometheus textfile for this run.
+
+        etl_group_runtimes: [{'group': ETL names, 'seconds': elapsed seconds}] per ETL group,
+                            including the wait for its queued queries
+        input_bytes: bytes of input files per ETL
+        """
+
+        records = cls.load_records()
+        etls, files, processes, etl_runtimes = cls.summarise(records)
+        lookup_errors = cls.summarise_lookup_errors(records)
+
+        report = {'etl_runtimes': etl_runtimes,
+                  'etl_group_runtimes': etl_group_runtimes,
+                  'input_bytes': input_bytes,
+                  'csv_rows': {filename: totals['rows']
+                               for filename, totals in files.items() if 'rows' in totals},
+                  'etls': etls,
+                  'files': files,
+                  'processes': processes,
+                  'lookup_errors': lookup_errors}
+
+        with open(cls.report_file, 'w') as report_file:
+            json.dump(report, report_file, indent=4)
+
+        lines = cls._prometheus_lines('etl_runtime_seconds',
+                                      'Elapsed time of the ETL process.',
+                                      [({'etl': etl_name}, runtime)
+                                       for etl_name, runtime in etl_runtimes.items()])
+        lines.extend(cls._prometheus_lines('etl_group_runtime_seconds',
+                                           'Elapsed time of the ETL group, including its queued queries.',
+                                           [({'group': ','.join(group_runtime['group'])},
+                                             group_runtime['seconds'])
+                                            for group_runtime in etl_group_runtimes]))
+        for field, help_text in [('parse_seconds', 'Time spent in the ETL generators.'),
+                                 ('csv_rows', 'Rows written to CSV.'),
+                                 ('csv_bytes', 'Bytes written to CSV.'),
+                                 ('queue_wait_seconds', 'Time query batches waited in the queue.'),
+                                 ('query_seconds', 'Neo4j execution time.'),
+                                 ('nodes_created', 'Nodes created in Neo4j.'),
+                                 ('relationships_created', 'Relationships created in Neo4j.'),
+                                 ('peak_rss', 'Peak RSS in bytes of the largest ETL process.')]:
+            lines.extend(cls._prometheus_lines('etl_' + field, help_text,
+                                               [({'etl': etl_name}, totals[field])
+                                                for etl_name, totals in etls.items()]))
+        for field, help_text in [('query_seconds', 'Neo4j execution time per query.'),
+                                 ('queue_wait_seconds', 'Queue wait time per query.'),
+                                 ('nodes_created', 'Nodes created per query.'),
+                                 ('relationships_created', 'Relationships created per query.'),
+                                 ('rows', 'Rows written per CSV file.'),
+                                 ('bytes', 'Bytes written per CSV file.')]:
+            lines.extend(cls._prometheus_lines('file_' + field, help_text,
+                                               [({'etl': totals['etl'], 'file': filename},
+                                                 totals[field])
+                                                for filename, totals in files.items()
+                                                if field in totals]))
+
+        with open(cls.prometheus_file, 'w') as prometheus_file:
+            prometheus_file.write('\n'.join(lines) + '\n')
+
+        cls.log_lookup_errors(lookup_errors)
+        cls.logger.info("Run metrics written to %s and %s", cls.report_file, cls.prometheus_file)
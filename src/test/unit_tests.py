@@ -4,7 +4,17 @@ Tests that methods return what they should etc.
 
 Remember to remove bad_pages test once the olf code has been removed.
 """
-from etl.helpers import ETLHelper
+import csv
+import json
+import os
+import random
+
+from etl import ETL, GenericOntologyETL, GenomicOverlapETL, HTPMetaDatasetETL, MolecularInteractionETL
+from etl.helpers import (ClosureHelper, DeltaLoadHelper, ETLHelper, GenomicIntervalIndex, IdentifierSet,
+                         NestedContainmentList, Neo4jSchemaHelper, OBOHelper)
+from data_manager import DataFileManager
+from files import GFF3File, TXTFile
+from run_metrics import RunMetrics
 
 
 class TestClass():
@@ -109,3 +119,300 @@ class TestClass():
         for item_name in self.etlh.rdh2.bad_regex.keys():
             assert 1 == self.etlh.rdh2.bad_regex[item_name]
             assert item_name == 'MESH'
+
+    def test_index_submission_data(self):
+        """Test latest upload wins when indexing submission data."""
+        data_files = [
+            {'dataType': {'name': 'BGI'}, 'dataSubType': {'name': 'RGD'},
+             's3Path': 'old', 'uploadDate': 1},
+            {'dataType': {'name': 'BGI'}, 'dataSubType': {'name': 'RGD'},
+             's3Path': 'new', 'uploadDate': 2},
+            {'dataType': {'name': 'BGI'}, 'dataSubType': {'name': 'RGD'},
+             's3Path': 'local', 'uploadDate': 2},
+            {'dataType': {'name': 'GO'}, 'dataSubType': {'name': 'GO'},
+             's3Path': 'go'}]
+
+        index = DataFileManager.index_submission_data(data_files)
+
+        assert index[('BGI', 'RGD')]['s3Path'] == 'new'
+        assert index[('GO', 'GO')]['s3Path'] == 'go'
+        assert ('BGI', 'MGI') not in index
+
+    def test_derive_schema(self):
+        """Test unique constraints are only derived for labels always merged the same way."""
+        templates = ["""
+            MERGE (g:Gene {primaryKey:row.primaryId})
+            MERGE (s:Synonym:Identifier {primaryKey:row.synonym})
+            MERGE (g)-[:ALSO_KNOWN_AS]-(s)""",
+                     """
+            MATCH (g:Gene {primaryKey:row.geneId})
+            MERGE (s:Synonym {primaryKey:row.synonym})
+            MERGE (x:CrossReference {primaryKey:row.id, crossRefType:row.type})
+            CREATE (p:PublicationJoin {primaryKey:row.pubId})""",
+                     """
+            MERGE (t:%sTerm:Ontology {primaryKey:row.oid})"""]
+
+        constraints, lookups = Neo4jSchemaHelper.derive_schema(templates, ['GO', 'DO'])
+
+        assert constraints == {('Gene', 'primaryKey'),
+                               ('GOTerm', 'primaryKey'),
+                               ('DOTerm', 'primaryKey')}
+        assert ('CrossReference', ('primaryKey', 'crossRefType')) in lookups
+
+        _, lookups = Neo4jSchemaHelper.derive_schema([GenomicOverlapETL.gene_overlap_query_template,
+                                                      GenomicOverlapETL.transcript_overlap_query_template],
+                                                     ['GO', 'DO'])
+        assert {label for label, _ in lookups} == {'Variant', 'Gene', 'Transcript'}
+
+    def test_identifier_set(self):
+        """Test membership in a packed identifier set."""
+        identifier_set = IdentifierSet(['MGI:2', 'ZFIN:ZDB-GENE-1', 'MGI:10', 'MGI:2'])
+
+        assert len(identifier_set) == 3
+        assert 'MGI:10' in identifier_set
+        assert 'ZFIN:ZDB-GENE-1' in identifier_set
+        assert 'MGI:1' not in identifier_set
+        assert 'ZFIN:ZDB-GENE-2' not in identifier_set
+        assert list(identifier_set) == ['MGI:10', 'MGI:2', 'ZFIN:ZDB-GENE-1']
+
+    def test_compute_closure(self):
+        """Test the local closure matches a plain graph walk, cycles included."""
+        edges = {('c', 'b'), ('b', 'a'), ('d', 'b'), ('d', 'a'),
+                 ('x', 'y'), ('y', 'x'), ('z', 'x')}
+
+        closure = set(ClosureHelper.compute_closure(edges))
+
+        assert closure == {('c', 'b'), ('c', 'a'), ('b', 'a'), ('d', 'b'), ('d', 'a'),
+                           ('x', 'y'), ('x', 'x'), ('y', 'x'), ('y', 'y'),
+                           ('z', 'x'), ('z', 'y')}
+
+    def test_iter_obo_terms(self, tmp_path, monkeypatch):
+        """Test OBO terms are read one stanza at a time, and their alt ids stay with them."""
+        monkeypatch.chdir(tmp_path)
+        with open('terms.obo', 'w') as obo_file:
+            obo_file.write('format-version: 1.2\n'
+                           'ontology: uberon\n'
+                           '\n'
+                           '[Term]\n'
+                           'id: UBERON:1\n'
+                           'name: one\n'
+                           'alt_id: UBERON:11\n'
+                           'alt_id: UBERON:12\n'
+                           'is_a: UBERON:0 ! zero\n'
+                           '\n'
+                           '[Typedef]\n'
+                           'id: part_of\n'
+                           'name: part of\n'
+                           '\n'
+                           '[Term]\n'
+                           'id: UBERON:2\n'
+                           'name: two\n'
+                           'relationship: part_of UBERON:1 ! one\n'
+                           '\n'
+                           '[Term]\n'
+                           'id: UBERON:3\n'
+                           'name: three\n'
+                           'alt_id: UBERON:31\n'
+                           'is_obsolete: true\n')
+
+        assert list(OBOHelper.iter_obo_terms('terms.obo')) == [
+            {'id': ['UBERON:1'], 'name': ['one'], 'alt_id': ['UBERON:11', 'UBERON:12'], 'is_a': ['UBERON:0 ! zero']},
+            {'id': ['UBERON:2'], 'name': ['two'], 'relationship': ['part_of UBERON:1 ! one']},
+            {'id': ['UBERON:3'], 'name': ['three'], 'alt_id': ['UBERON:31'], 'is_obsolete': ['true']}]
+
+        batches = list(GenericOntologyETL(None).get_generators('terms.obo', 1, 'UBERON'))
+        assert [[(term['oid'], term['name'], term['is_obsolete']) for term in terms]
+                for terms, _, _, _, _ in batches] == [[('UBERON:1', 'one', 'false')],
+                                                      [('UBERON:2', 'two', 'false')],
+                                                      [('UBERON:3', 'three', 'true')]]
+        assert [[(altid['primary_id'], altid['secondary_id']) for altid in altids]
+                for _, _, _, _, altids in batches] == [[('UBERON:1', 'UBERON:11'), ('UBERON:1', 'UBERON:12')],
+                                                       [],
+                                                       [('UBERON:3', 'UBERON:31')]]
+        assert [(isas, partofs) for _, isas, partofs, _, _ in batches] == [
+            ([{'oid': 'UBERON:1', 'isa': 'UBERON:0'}], []),
+            ([], [{'oid': 'UBERON:2', 'partof': 'UBERON:1'}]),
+            ([], [])]
+
+    def test_get_uuid(self):
+        """Test ids are the same for the same natural key and differ by kind."""
+        xref = ETLHelper.get_xref_dict('12345', 'PMID', 'gene/references', 'gene/references',
+                                       'PMID:12345', None, 'PMID:12345gene/references')
+
+        assert xref['uuid'] == ETLHelper.get_uuid('CrossReference', 'PMID:12345gene/references', 'gene/references')
+        assert ETLHelper.get_uuid('Gene', 'MGI:1') == ETLHelper.get_uuid('Gene', 'MGI:1')
+        assert ETLHelper.get_uuid('Gene', 'MGI:1') != ETLHelper.get_uuid('Allele', 'MGI:1')
+        assert ETLHelper.get_uuid('Exon', 'a', 'bc') != ETLHelper.get_uuid('Exon', 'ab', 'c')
+
+    def test_lookup_errors_reach_run_metrics(self, tmp_path, monkeypatch):
+        """Test the lookup errors of the HTP dataset and interaction loads are recorded."""
+        self.etlh.rdh2.reset_error_counts()
+        monkeypatch.chdir(tmp_path)
+        RunMetrics.reset()
+        monkeypatch.setattr('transactors.CSVTransactor.save_file_static',
+                            lambda generators, query_and_file_list: list(generators))
+        monkeypatch.setattr('transactors.Neo4jTransactor.execute_query_batch', lambda query_and_file_list: None)
+
+        class DataTypeConfig():
+            @staticmethod
+            def get_neo4j_commit_size():
+                return 1000
+
+            @staticmethod
+            def get_generator_batch_size():
+                return 1000
+
+        class SubType():
+            @staticmethod
+            def get_data_provider():
+                return 'RGD'
+
+            @staticmethod
+            def get_filepath():
+                return 'HTPDATASET_RGD.json'
+
+        class JSONFile():
+            @staticmethod
+            def get_data(filepath):
+                return {'metaData': {'dateProduced': '2020-01-01',
+                                     'dataProvider': {'crossReference': {'id': 'RGD', 'pages': []}}},
+                        'data': [{'datasetId': {'primaryId': 'GEO:GSE1',
+                                                'crossReference': {'id': 'NOSUCHDB:1', 'pages': ['htp/dataset']}},
+                                  'publications': [{'publicationId': 'NOSUCHDB:2'}]}]}
+
+        monkeypatch.setattr('etl.htp_metadataset_etl.JSONFile', JSONFile)
+        htp_etl = HTPMetaDatasetETL(DataTypeConfig())
+        monkeypatch.setattr(htp_etl.test_object, 'using_test_data', lambda: False)
+        htp_etl._process_sub_type(SubType())
+
+        mol_int_etl = MolecularInteractionETL(DataTypeConfig())
+
+        def get_generators(filepath, batch_size):
+            mol_int_etl.etlh.rdh2.return_url_from_identifier('NOSUCHDB:3')
+            yield [], [], []
+
+        monkeypatch.setattr(mol_int_etl, 'get_generators', get_generators)
+        mol_int_etl._load_and_process_data()
+
+        sources = {record['source']: record['counts'] for record in RunMetrics.load_records()
+                   if record['type'] == 'lookup_errors'}
+        assert set(sources) == {'HTPMetaDataset-RGD:', 'MolInt:'}
+        assert all('Missing key' in counts for counts in sources.values())
+
+    def test_etl_runtimes(self, tmp_path, monkeypatch):
+        """Test each ETL of a group is reported with its own runtime."""
+        monkeypatch.chdir(tmp_path)
+        os.makedirs('tmp')
+        RunMetrics.reset()
+        clock = iter([100.0, 102.0, 200.0, 205.0])
+        monkeypatch.setattr('etl.etl.time.time', lambda: next(clock))
+        monkeypatch.setattr(ETL, '_load_and_process_data', lambda etl: None, raising=False)
+        monkeypatch.setattr(ETL, 'error_messages', lambda etl, prefix: None)
+
+        for etl_name in ['DOID', 'MI']:
+            RunMetrics.set_etl(etl_name)
+            ETL().run_etl()
+        RunMetrics.save_report([{'group': ['DOID', 'MI'], 'seconds': 7.0}], {})
+
+        with open(RunMetrics.report_file) as report_file:
+            report = json.load(report_file)
+        assert report['etl_runtimes'] == {'DOID': 2.0, 'MI': 5.0}
+        assert report['etl_group_runtimes'] == [{'group': ['DOID', 'MI'], 'seconds': 7.0}]
+
+    def test_delta_queries(self, tmp_path, monkeypatch):
+        """Test a delta load only loads the changed rows, after dropping, updating and deleting."""
+        monkeypatch.chdir(tmp_path)
+        os.mkdir('tmp')
+
+        class SubType():
+            data_type = 'BGI'
+
+            @staticmethod
+            def get_data_provider():
+                return 'MGI'
+
+        delta_groups = [{'files': {'gene_data': ['primaryId'], 'gene_synonyms': ['primary_id']},
+                         'ignore': ['loadKey'],
+                         'drop': {'gene_synonyms': 'DROP %s %s'},
+                         'update': 'UPDATE %s %s',
+                         'delete': 'DELETE %s %s'}]
+
+        def load(genes, synonyms):
+            for file_name, rows in [('gene_data_MGI.csv', genes), ('gene_synonyms_MGI.csv', synonyms)]:
+                with open(os.path.join('tmp', file_name), 'w') as csv_file:
+                    csv_writer = csv.DictWriter(csv_file, fieldnames=list(rows[0]))
+                    csv_writer.writeheader()
+                    csv_writer.writerows(rows)
+            queries = DeltaLoadHelper.get_delta_queries(
+                SubType(), [['GENES', 'gene_data_MGI.csv'], ['SYNONYMS', 'gene_synonyms_MGI.csv']],
+                delta_groups, 1000)
+            DeltaLoadHelper.commit()
+            return {query: [(row['primaryId'] if 'primaryId' in row else row['primary_id'], row.get('synonym'))
+                            for row in csv.DictReader(open(os.path.join('tmp', file_name)))]
+                    for query, file_name in queries}
+
+        assert load([{'primaryId': 'MGI:1', 'symbol': 'a', 'loadKey': '1'},
+                     {'primaryId': 'MGI:2', 'symbol': 'b', 'loadKey': '1'}],
+                    [{'primary_id': 'MGI:1', 'synonym': 'x'}]) == {'GENES': [('MGI:1', None), ('MGI:2', None)],
+                                                                   'SYNONYMS': [('MGI:1', 'x')]}
+        assert load([{'primaryId': 'MGI:1', 'symbol': 'a', 'loadKey': '2'},
+                     {'primaryId': 'MGI:2', 'symbol': 'b', 'loadKey': '2'}],
+                    [{'primary_id': 'MGI:1', 'synonym': 'x'}]) == {}
+        assert load([{'primaryId': 'MGI:1', 'symbol': 'a', 'loadKey': '3'},
+                     {'primaryId': 'MGI:3', 'symbol': 'c', 'loadKey': '3'}],
+                    [{'primary_id': 'MGI:1', 'synonym': 'y'}]) == {
+                        'DELETE 1000 gene_data_MGI_deleted.csv': [('MGI:2', None)],
+                        'DROP 1000 gene_synonyms_MGI_dropped.csv': [('MGI:1', 'x')],
+                        'UPDATE 1000 gene_data_MGI_updated.csv': [('MGI:1', None)],
+                        'GENES': [('MGI:1', None), ('MGI:3', None)],
+                        'SYNONYMS': [('MGI:1', 'y')]}
+
+    def test_get_parsed_batches(self, tmp_path):
+        """Test a text file parsed in chunks comes back in order and in batches."""
+        filename = str(tmp_path / 'lines.txt')
+        lines = ['line %s' % number for number in range(100)]
+        with open(filename, 'w') as txt_file:
+            txt_file.write('\n'.join(lines) + '\n')
+
+        for start, end in TXTFile(filename).get_chunks(50):
+            with open(filename, 'rb') as txt_file:
+                assert start == 0 or txt_file.read(start)[-1:] == b'\n'
+
+        batches = list(TXTFile(filename).get_parsed_batches(list, 30, 2, chunk_size=50))
+        assert [len(batch) for batch in batches] == [30, 30, 30, 10]
+        assert sum(batches, []) == lines
+
+    def test_gff3_attributes(self):
+        """Test GFF3 attribute values are URL unescaped and tags stripped."""
+        attributes = GFF3File.get_attributes('ID=Transcript:T1; Name=a%3Bb%2Cc;Note=two words;flag')
+        assert attributes == {'ID': 'Transcript:T1', 'Name': 'a;b,c', 'Note': 'two words'}
+
+    def test_nested_containment_list(self):
+        """Test overlap queries find the same intervals as comparing against every interval."""
+        generator = random.Random(5)
+        intervals = []
+        for number in range(500):
+            start = generator.randint(1, 10000)
+            intervals.append((start, start + generator.choice([0, 10, 100, 5000]), number))
+        index = NestedContainmentList(intervals)
+
+        for _ in range(200):
+            start = generator.randint(1, 11000)
+            end = start + generator.randint(0, 300)
+            assert sorted(index.get_overlaps(start, end)) == \
+                sorted(number for first, last, number in intervals if first <= end and last >= start)
+
+    def test_genomic_overlaps(self, tmp_path, monkeypatch):
+        """Test variants overlap the genes on the same assembly and chromosome only."""
+        monkeypatch.chdir(tmp_path)
+        GenomicIntervalIndex.add('Gene', [('MGI:1', 'GRCm38', 'chr1', 100, 200),
+                                          ('MGI:2', 'GRCm38', '1', 150, 120),
+                                          ('MGI:3', 'GRCm38', '2', 100, 200),
+                                          ('MGI:4', 'GRCm38', None, 100, 200)])
+        GenomicIntervalIndex.add('Variant', [('NC_1:g.130A>T', 'GRCm38', '1', 130, 130),
+                                             ('NC_1:g.201A>T', 'GRCm38', '1', 201, 201),
+                                             ('NC_1:g.130C>T', 'GRCz11', '1', 130, 130)])
+
+        assert sorted(GenomicIntervalIndex.get_overlaps('Variant', 'Gene')) == [('NC_1:g.130A>T', 'MGI:1'),
+                                                                                ('NC_1:g.130A>T', 'MGI:2')]
+        assert list(GenomicIntervalIndex.get_bins(99999, 200000)) == [0, 1, 2]
@@ -4,6 +4,9 @@ from contextlib import ExitStack
 import csv
 import os
 import logging
+import time
+
+from run_metrics import RunMetrics
 
 
 class CSVTransactor():
@@ -21,7 +24,11 @@ class CSVTransactor():
             CSVTransactor.logger.debug(generator_file_list)
             # Create a list with 'None' placeholder entries.
             csv_file_writer = [None] * len(open_files)
+            rows_written = [0] * len(open_files)
+            parse_time = 0
+            parse_start = time.time()
             for generator_entry in generator:
+                parse_time += time.time() - parse_start
                 for index, individual_list in enumerate(generator_entry):
                     CSVTransactor.logger.debug(individual_list)
                     current_filename = open_files[index].name  # Our current CSV output file.
@@ -52,8 +59,21 @@ class CSVTransactor():
 
                     # Write the remainder of the list
                     csv_file_writer[index].writerows(individual_list)
+                    rows_written[index] += len(individual_list)
                     # content for this iteration.
                     # logger.info("%s: Finished Writting %s entries to file: %s",
                     #             self._get_name(),
                     #             len(individual_list),
                     #             current_filename)
+                parse_start = time.time()
+            parse_time += time.time() - parse_start
+
+        RunMetrics.record('parse',
+                          files=[file_name for [query, file_name] in generator_file_list],
+                          seconds=parse_time)
+        for index, [query, file_name] in enumerate(generator_file_list):
+            RunMetrics.record('csv',
+                              file=file_name,
+                              rows=rows_written[index],
+                              bytes=os.path.getsize(os.path.join('tmp', file_name)))
+        RunMetrics.record_peak_rss()
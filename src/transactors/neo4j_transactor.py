@@ -6,7 +6,9 @@ import pickle
 import time
 from neo4j import GraphDatabase
 from etl import ETL
+from etl.helpers import QueryProfileHelper
 from loader_common import ContextInfo
+from run_metrics import RunMetrics
 
 
 class Neo4jTransactor():
@@ -56,7 +58,11 @@ class Neo4jTransactor():
                                      Neo4jTransactor.count,
                                      len(query_batch),
                                      Neo4jTransactor.queue.qsize())
-        Neo4jTransactor.queue.put((query_batch, Neo4jTransactor.count))
+        # The ETL name and enqueue time travel with the batch for the run metrics.
+        Neo4jTransactor.queue.put((query_batch,
+                                   Neo4jTransactor.count,
+                                   RunMetrics.etl_name,
+                                   time.time()))
 
     def check_for_thread_errors(self):
         """Check for Thread Errors"""
@@ -82,7 +88,7 @@ class Neo4jTransactor():
         self.logger.info("%s: Starting Neo4jTransactor Thread Runner: ", self._get_name())
         while True:
             try:
-                (query_batch, query_counter) = Neo4jTransactor.queue.get()
+                (query_batch, query_counter, etl_name, enqueued_time) = Neo4jTransactor.queue.get()
             except EOFError as error:
                 self.logger.info("Queue Closed exiting: %s", error)
                 return
@@ -92,6 +98,7 @@ class Neo4jTransactor():
                               query_counter,
                               len(query_batch))
             batch_start = time.time()
+            queue_wait = batch_start - enqueued_time
 
             total_query_counter = 0
 
@@ -105,6 +112,7 @@ class Neo4jTransactor():
                                   query_counter,
                                   Neo4jTransactor.queue.qsize())
                 start = time.time()
+                counters = None
                 try:
                     if context_info.env["USING_PICKLE"] is True:
                         # Save VIA pickle rather then NEO
@@ -117,10 +125,23 @@ class Neo4jTransactor():
                             pickle.dump(neo4j_query, file)
                     else:
                         with graph.session() as session:
-                            session.run(neo4j_query)
+                            if context_info.env["PROFILE_QUERIES"]:
+                                QueryProfileHelper.profile(session, neo4j_query, filename)
+                            counters = session.run(neo4j_query).consume().counters
 
                     end = time.time()
                     elapsed_time = end - start
+                    RunMetrics.record('query',
+                                      etl=etl_name,
+                                      file=filename,
+                                      queue_wait_seconds=queue_wait,
+                                      query_seconds=elapsed_time,
+                                      nodes_created=counters.nodes_created if counters else 0,
+                                      relationships_created=counters.relationships_created
+                                      if counters else 0,
+                                      properties_set=counters.properties_set if counters else 0)
+                    # Only the first query of a batch waited in the queue.
+                    queue_wait = 0
                     self.logger.info(\
                             "%s: Processed query for file: %s QueryNum: %s QueueSize: %s Time: %s",
                             self._get_name(),
@@ -139,7 +160,7 @@ class Neo4jTransactor():
                             filename)
                     query_batch.insert(0, (neo4j_query, filename))
                     time.sleep(12)
-                    Neo4jTransactor.queue.put((query_batch, query_counter))
+                    Neo4jTransactor.queue.put((query_batch, query_counter, etl_name, time.time()))
                     break
 
                 total_query_counter = total_query_counter + 1
@@ -151,4 +172,5 @@ class Neo4jTransactor():
                               query_counter,
                               len(query_batch),
                               time.strftime("%H:%M:%S", time.gmtime(batch_elapsed_time)))
+            RunMetrics.record_peak_rss()
             Neo4jTransactor.queue.task_done()